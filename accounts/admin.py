@@ -69,17 +69,24 @@ class TeamPermissionRequestAdmin(admin.ModelAdmin):
     deny_requests.short_description = 'Deny selected requests'
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Team, PlayerProfile, CoachProfile, DoctorProfile, EmailRoleMapping
+from .models import CustomUser, Team, PlayerProfile, CoachProfile, DoctorProfile, EmailRoleMapping, UserMedicalInfo
+
+class UserMedicalInfoInline(admin.StackedInline):
+    model = UserMedicalInfo
+    can_delete = False
+    fieldsets = (
+        ('Emergency Contact', {'fields': ('emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relationship', 'emergency_contact_email')}),
+        ('Medical Information', {'fields': ('blood_type', 'medical_conditions', 'medications', 'allergies')}),
+    )
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
     fieldsets = UserAdmin.fieldsets + (
         ('Role Information', {'fields': ('role', 'team', 'is_registration_complete')}),
         ('Personal Information', {'fields': ('phone', 'gender', 'date_of_birth', 'address', 'city', 'state', 'zip_code', 'country')}),
-        ('Emergency Contact', {'fields': ('emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relationship', 'emergency_contact_email')}),
-        ('Medical Information', {'fields': ('blood_type', 'medical_conditions', 'medications', 'allergies')}),
         ('Additional Information', {'fields': ('bio', 'profile_picture')}),
     )
+    inlines = [UserMedicalInfoInline]
     list_display = ['username', 'email', 'first_name', 'last_name', 'role', 'team', 'phone', 'is_registration_complete', 'is_active']
     list_filter = ['role', 'team', 'is_registration_complete', 'is_active', 'gender']
     search_fields = ['username', 'first_name', 'last_name', 'email', 'phone']
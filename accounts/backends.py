@@ -0,0 +1,45 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+# Personal columns of CustomUser (emergency contact and medical details are in
+# UserMedicalInfo). Only the profile page reads them, so the per-request user
+# is loaded without them.
+DEFERRED_USER_FIELDS = (
+    'phone', 'gender', 'date_of_birth', 'address', 'city', 'state', 'zip_code', 'country',
+    'bio', 'profile_picture',
+)
+
+
+class SlimUserBackend(ModelBackend):
+    """``ModelBackend`` whose request user skips the wide columns and joins ``team``.
+
+    Views check ``role`` and ``team`` on every request; the deferred columns
+    are fetched on first access, or all at once with ``load_deferred_fields``.
+    Saving a slim user writes only the columns that were loaded.
+    """
+
+    def user_queryset(self):
+        return get_user_model()._default_manager.select_related('team').defer(*DEFERRED_USER_FIELDS)
+
+    def get_user(self, user_id):
+        try:
+            user = self.user_queryset().get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # request.auser() in async views; ModelBackend's version loads the full row
+        try:
+            user = await self.user_queryset().aget(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+def load_deferred_fields(user):
+    """Fetch every deferred column of ``user`` with a single query"""
+    deferred = user.get_deferred_fields()
+    if deferred:
+        user.refresh_from_db(fields=sorted(deferred))
+    return user
@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import CustomUser, PlayerProfile, CoachProfile, DoctorProfile, Team, EmailRoleMapping, TeamPermissionRequest
+from .models import CustomUser, PlayerProfile, CoachProfile, DoctorProfile, Team, EmailRoleMapping, TeamPermissionRequest, UserMedicalInfo, MEDICAL_INFO_FIELDS
 
 class BasicRegistrationForm(UserCreationForm):
     first_name = forms.CharField(max_length=30, required=True)
@@ -209,9 +209,7 @@ class UserProfileForm(forms.ModelForm):
         model = CustomUser
         fields = [
             'first_name', 'last_name', 'email', 'phone', 'gender', 'date_of_birth',
-            'address', 'city', 'state', 'zip_code', 'country',
-            'emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relationship', 'emergency_contact_email',
-            'blood_type', 'medical_conditions', 'medications', 'allergies', 'bio'
+            'address', 'city', 'state', 'zip_code', 'country', 'bio'
         ]
         widgets = {
             'first_name': forms.TextInput(attrs={'class': 'form-control'}),
@@ -225,23 +223,45 @@ class UserProfileForm(forms.ModelForm):
             'state': forms.TextInput(attrs={'class': 'form-control'}),
             'zip_code': forms.TextInput(attrs={'class': 'form-control'}),
             'country': forms.TextInput(attrs={'class': 'form-control'}),
-            'emergency_contact_name': forms.TextInput(attrs={'class': 'form-control'}),
-            'emergency_contact_phone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '+1 (555) 123-4567'}),
-            'emergency_contact_relationship': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g., Mother, Father, Spouse'}),
-            'emergency_contact_email': forms.EmailInput(attrs={'class': 'form-control'}),
-            'blood_type': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g., A+, B-, O+, AB-'}),
-            'medical_conditions': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'List any known medical conditions'}),
-            'medications': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'List current medications and dosages'}),
-            'allergies': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'List known allergies (food, medication, environmental, etc.)'}),
             'bio': forms.Textarea(attrs={'class': 'form-control', 'rows': 4, 'placeholder': 'Tell us about yourself...'}),
         }
     
+    # Emergency contact and medical fields, stored on UserMedicalInfo
+    medical_info_widgets = {
+        'emergency_contact_name': forms.TextInput(attrs={'class': 'form-control'}),
+        'emergency_contact_phone': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '+1 (555) 123-4567'}),
+        'emergency_contact_relationship': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g., Mother, Father, Spouse'}),
+        'emergency_contact_email': forms.EmailInput(attrs={'class': 'form-control'}),
+        'blood_type': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g., A+, B-, O+, AB-'}),
+        'medical_conditions': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'List any known medical conditions'}),
+        'medications': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'List current medications and dosages'}),
+        'allergies': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'List known allergies (food, medication, environmental, etc.)'}),
+    }
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Make some fields required
         self.fields['first_name'].required = True
         self.fields['last_name'].required = True
         self.fields['email'].required = True
+        
+        medical_fields = forms.fields_for_model(
+            UserMedicalInfo, fields=MEDICAL_INFO_FIELDS, widgets=self.medical_info_widgets
+        )
+        info = self.instance.get_medical_info() if self.instance.pk else None
+        for name, field in medical_fields.items():
+            if info is not None:
+                self.initial.setdefault(name, getattr(info, name))
+            self.fields[name] = field
+        self.order_fields(self.Meta.fields[:-1] + MEDICAL_INFO_FIELDS + ['bio'])
+    
+    def save(self, commit=True):
+        # The user's compatibility accessors route these to UserMedicalInfo,
+        # which CustomUser.save() writes along with the user
+        for name in MEDICAL_INFO_FIELDS:
+            if getattr(self.instance, name) != self.cleaned_data[name]:
+                setattr(self.instance, name, self.cleaned_data[name])
+        return super().save(commit)
     
     def clean_phone(self):
         phone = self.cleaned_data.get('phone')
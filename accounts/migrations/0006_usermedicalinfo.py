@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+MEDICAL_FIELDS = [
+    'emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relationship',
+    'emergency_contact_email', 'blood_type', 'medical_conditions', 'medications', 'allergies',
+]
+BATCH_SIZE = 1000
+
+
+def copy_medical_info(apps, schema_editor):
+    """Create a UserMedicalInfo row for every user with any medical field filled in"""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    UserMedicalInfo = apps.get_model('accounts', 'UserMedicalInfo')
+    db = schema_editor.connection.alias
+    filled = models.Q()
+    for name in MEDICAL_FIELDS:
+        filled |= ~models.Q(**{name: ''})
+    rows = CustomUser.objects.using(db).filter(filled).order_by('pk').values('pk', *MEDICAL_FIELDS)
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(UserMedicalInfo(user_id=row.pop('pk'), **row))
+        if len(batch) == BATCH_SIZE:
+            UserMedicalInfo.objects.using(db).bulk_create(batch)
+            batch = []
+    UserMedicalInfo.objects.using(db).bulk_create(batch)
+
+
+def copy_medical_info_back(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    UserMedicalInfo = apps.get_model('accounts', 'UserMedicalInfo')
+    db = schema_editor.connection.alias
+    rows = UserMedicalInfo.objects.using(db).order_by('pk').values('user_id', *MEDICAL_FIELDS)
+    batch = []
+    for row in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(CustomUser(pk=row.pop('user_id'), **row))
+        if len(batch) == BATCH_SIZE:
+            CustomUser.objects.using(db).bulk_update(batch, MEDICAL_FIELDS)
+            batch = []
+    CustomUser.objects.using(db).bulk_update(batch, MEDICAL_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_teampermissionrequest_teampermission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserMedicalInfo',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='medical_info', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('emergency_contact_name', models.CharField(blank=True, help_text='Emergency contact full name', max_length=200)),
+                ('emergency_contact_phone', models.CharField(blank=True, help_text='Emergency contact phone number', max_length=20)),
+                ('emergency_contact_relationship', models.CharField(blank=True, help_text='Relationship to emergency contact', max_length=100)),
+                ('emergency_contact_email', models.EmailField(blank=True, help_text='Emergency contact email', max_length=254)),
+                ('blood_type', models.CharField(blank=True, help_text='Blood type (A+, B-, O+, etc.)', max_length=10)),
+                ('medical_conditions', models.TextField(blank=True, help_text='Any known medical conditions')),
+                ('medications', models.TextField(blank=True, help_text='Current medications')),
+                ('allergies', models.TextField(blank=True, help_text='Known allergies')),
+            ],
+        ),
+        migrations.RunPython(copy_medical_info, copy_medical_info_back),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='allergies',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='blood_type',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='emergency_contact_email',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='emergency_contact_name',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='emergency_contact_phone',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='emergency_contact_relationship',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='medical_conditions',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='medications',
+        ),
+    ]
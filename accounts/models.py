@@ -12,6 +12,25 @@ class Team(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_gender_display()})"
 
+# Roles that see the data of every team
+ALL_TEAM_ROLES = {'ADMIN', 'DOCTOR'}
+
+def medical_info_field(name):
+    """A CustomUser property reading and writing ``name`` on its UserMedicalInfo"""
+    def get(user):
+        info = user.get_medical_info()
+        return getattr(info, name) if info is not None else ''
+
+    def set(user, value):
+        info = user.get_medical_info()
+        if info is None:
+            info = UserMedicalInfo()
+            user.medical_info = info
+        setattr(info, name, value)
+        user._medical_info_changed = True
+
+    return property(get, set)
+
 class CustomUser(AbstractUser):
     ROLE_CHOICES = [
         ('ADMIN', 'Admin'),
@@ -41,22 +60,38 @@ class CustomUser(AbstractUser):
     zip_code = models.CharField(max_length=20, blank=True)
     country = models.CharField(max_length=100, blank=True, default="USA")
     
-    # Emergency Contact Information
-    emergency_contact_name = models.CharField(max_length=200, blank=True, help_text="Emergency contact full name")
-    emergency_contact_phone = models.CharField(max_length=20, blank=True, help_text="Emergency contact phone number")
-    emergency_contact_relationship = models.CharField(max_length=100, blank=True, help_text="Relationship to emergency contact")
-    emergency_contact_email = models.EmailField(blank=True, help_text="Emergency contact email")
-    
-    # Medical Information
-    blood_type = models.CharField(max_length=10, blank=True, help_text="Blood type (A+, B-, O+, etc.)")
-    medical_conditions = models.TextField(blank=True, help_text="Any known medical conditions")
-    medications = models.TextField(blank=True, help_text="Current medications")
-    allergies = models.TextField(blank=True, help_text="Known allergies")
-    
     # Additional Information
     bio = models.TextField(blank=True, help_text="Personal bio or notes")
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
 
+    # Emergency contact and medical information live in UserMedicalInfo; these
+    # accessors keep user.allergies etc. (and CustomUser(allergies=...)) working
+    emergency_contact_name = medical_info_field('emergency_contact_name')
+    emergency_contact_phone = medical_info_field('emergency_contact_phone')
+    emergency_contact_relationship = medical_info_field('emergency_contact_relationship')
+    emergency_contact_email = medical_info_field('emergency_contact_email')
+    blood_type = medical_info_field('blood_type')
+    medical_conditions = medical_info_field('medical_conditions')
+    medications = medical_info_field('medications')
+    allergies = medical_info_field('allergies')
+
+    _medical_info_changed = False
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self._medical_info_changed:
+            info = self.medical_info
+            info.user = self
+            info.save()
+            self._medical_info_changed = False
+
+    def get_medical_info(self):
+        """The user's UserMedicalInfo row, or None if there is none yet"""
+        try:
+            return self.medical_info
+        except UserMedicalInfo.DoesNotExist:
+            return None
+
     def is_coach(self):
         return self.role == 'COACH'
 
@@ -94,6 +129,45 @@ class CustomUser(AbstractUser):
             teams = Team.objects.filter(Q(id__in=list(extra)) | Q(id=getattr(self.team, 'id', None)))
         return teams.distinct()
 
+    def visible_team_ids(self):
+        """Ids of the teams whose data the user sees, or None for every team.
+
+        Admins and doctors cover all teams, players only their own, coaches
+        the teams from ``get_authorized_teams``.
+        """
+        if self.role in ALL_TEAM_ROLES:
+            return None
+        if self.role == 'PLAYER':
+            return [self.team_id] if self.team_id else []
+        return sorted(self.get_authorized_teams().values_list('id', flat=True))
+
+class UserMedicalInfo(models.Model):
+    """Emergency contact and medical details, one row per user.
+
+    Kept out of the user table, which nearly every list and dashboard joins
+    through, so those joins read a narrow row. Loaded only where shown.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='medical_info')
+
+    # Emergency Contact Information
+    emergency_contact_name = models.CharField(max_length=200, blank=True, help_text="Emergency contact full name")
+    emergency_contact_phone = models.CharField(max_length=20, blank=True, help_text="Emergency contact phone number")
+    emergency_contact_relationship = models.CharField(max_length=100, blank=True, help_text="Relationship to emergency contact")
+    emergency_contact_email = models.EmailField(blank=True, help_text="Emergency contact email")
+
+    # Medical Information
+    blood_type = models.CharField(max_length=10, blank=True, help_text="Blood type (A+, B-, O+, etc.)")
+    medical_conditions = models.TextField(blank=True, help_text="Any known medical conditions")
+    medications = models.TextField(blank=True, help_text="Current medications")
+    allergies = models.TextField(blank=True, help_text="Known allergies")
+
+    def __str__(self):
+        return f"{self.user.get_full_name() or self.user.username} Medical Info"
+
+MEDICAL_INFO_FIELDS = [
+    field.name for field in UserMedicalInfo._meta.concrete_fields if field.name != 'user'
+]
+
 class PlayerProfile(models.Model):
     # Personal Information
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE)
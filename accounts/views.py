@@ -4,7 +4,9 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from .forms import BasicRegistrationForm, PlayerProfileForm, CoachProfileForm, DoctorProfileForm, TeamSelectionForm, CoachTeamSelectionForm, UserProfileForm, TeamPermissionRequestForm
+from .backends import load_deferred_fields
 from .models import PlayerProfile, CoachProfile, DoctorProfile, TeamPermissionRequest, TeamPermission
+from lancer_project.write_queue import run_write
 
 def register_view(request):
     if request.method == 'POST':
@@ -152,7 +154,8 @@ def dashboard(request):
 
 @login_required
 def profile_view(request):
-    user = request.user
+    # The request user comes without the personal and medical columns this page shows
+    user = load_deferred_fields(request.user)
     
     if request.method == 'POST':
         form = UserProfileForm(request.POST, request.FILES, instance=user)
@@ -206,7 +209,7 @@ def request_team_access(request):
             req = form.save(commit=False)
             req.user = request.user
             req.status = 'PENDING'
-            req.save()
+            run_write(req.save)
             messages.success(request, 'Your request has been submitted for admin approval.')
             return redirect('request_team_access')
     else:
@@ -219,7 +222,7 @@ def admin_review_requests(request):
     if request.user.role != 'ADMIN':
         messages.error(request, 'Admin access required.')
         return redirect('dashboard')
-    pending = TeamPermissionRequest.objects.filter(status='PENDING')
+    pending = TeamPermissionRequest.objects.filter(status='PENDING').select_related('user', 'team')
     return render(request, 'accounts/admin_team_requests.html', {'pending': pending})
 
 @login_required
@@ -234,15 +237,19 @@ def admin_decide_request(request, req_id, decision):
     if decision not in ['approve', 'deny']:
         messages.error(request, 'Invalid decision.')
         return redirect('admin_review_requests')
-    if decision == 'approve':
-        # Create TeamPermission
-        TeamPermission.objects.get_or_create(user=req.user, team=req.team, role_scope=req.role_scope)
-        req.status = 'APPROVED'
+    req.status = 'APPROVED' if decision == 'approve' else 'DENIED'
+    req.reviewed_by = request.user
+    req.reviewed_at = timezone.now()
+
+    def record_decision():
+        if req.status == 'APPROVED':
+            # Create TeamPermission
+            TeamPermission.objects.get_or_create(user=req.user, team=req.team, role_scope=req.role_scope)
+        req.save()
+
+    run_write(record_decision)
+    if req.status == 'APPROVED':
         messages.success(request, 'Request approved and access granted.')
     else:
-        req.status = 'DENIED'
         messages.info(request, 'Request denied.')
-    req.reviewed_by = request.user
-    req.reviewed_at = timezone.now()
-    req.save()
     return redirect('admin_review_requests')
@@ -0,0 +1,146 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+
+from lancer_project.write_queue import WriteTimeout
+
+from .responses import error_response
+from .tokens import read_token
+
+
+def adapt(handler, handler_is_async, is_async):
+    """``handler`` callable in the ``is_async`` mode"""
+    if handler_is_async == is_async:
+        return handler
+    if is_async:
+        return sync_to_async(handler, thread_sensitive=True)
+    return async_to_sync(handler)
+
+
+class ApiDispatchMiddleware:
+    """Serve ``API_PREFIX`` requests through the ``API_MIDDLEWARE`` stack only.
+
+    Placed after the instrumentation middleware, so API requests are still
+    measured, it hands them to a chain of their own and returns its response.
+    They skip the rest of ``MIDDLEWARE``: no session or CSRF checks, messages
+    or clickjacking headers. Clients authenticate with bearer tokens instead
+    of cookies, so CSRF does not apply. API middleware must do its work in
+    ``__call__`` or ``process_request``/``process_response``; ``process_view``
+    hooks are not run.
+
+    The chain is built in the handler's mode, adapting middleware the way
+    Django does, so under ASGI async views are awaited directly and sync ones
+    run in a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+        handler = self._adispatch if self.is_async else self._dispatch
+        handler_is_async = self.is_async
+        for path in reversed(settings.API_MIDDLEWARE):
+            middleware = import_string(path)
+            if not getattr(middleware, 'sync_capable', True):
+                middleware_is_async = True
+            elif not getattr(middleware, 'async_capable', False):
+                middleware_is_async = False
+            else:
+                middleware_is_async = self.is_async
+            try:
+                handler = middleware(adapt(handler, handler_is_async, middleware_is_async))
+            except MiddlewareNotUsed:
+                continue
+            handler_is_async = middleware_is_async
+        self.api_handler = adapt(handler, handler_is_async, self.is_async)
+
+    def __call__(self, request):
+        if request.path_info.startswith(settings.API_PREFIX):
+            return self.api_handler(request)
+        return self.get_response(request)
+
+    def _resolve(self, request):
+        match = resolve(request.path_info)
+        request.resolver_match = match
+        return match
+
+    def _dispatch(self, request):
+        try:
+            match = self._resolve(request)
+            view = match.func
+            if iscoroutinefunction(view):
+                view = async_to_sync(view)
+            return view(request, *match.args, **match.kwargs)
+        except (Resolver404, Http404):
+            return error_response('Not found', 404)
+        except PermissionDenied:
+            return error_response('Access denied', 403)
+        except WriteTimeout as exc:
+            return error_response(str(exc), 503)
+
+    async def _adispatch(self, request):
+        try:
+            match = self._resolve(request)
+            view = match.func
+            if not iscoroutinefunction(view):
+                view = sync_to_async(view, thread_sensitive=True)
+            return await view(request, *match.args, **match.kwargs)
+        except (Resolver404, Http404):
+            return error_response('Not found', 404)
+        except PermissionDenied:
+            return error_response('Access denied', 403)
+        except WriteTimeout as exc:
+            return error_response(str(exc), 503)
+
+
+class TokenAuthenticationMiddleware:
+    """Set ``request.user`` from an ``Authorization: Bearer <token>`` header.
+
+    Requests without a token are anonymous; a forged or expired token is
+    answered with 401 straight away. Reading a token needs no database, so
+    this runs in either mode.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rejected = self.authenticate(request)
+        if rejected is not None:
+            return rejected
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        rejected = self.authenticate(request)
+        if rejected is not None:
+            return rejected
+        return await self.get_response(request)
+
+    def authenticate(self, request):
+        """Set ``request.user``; the 401 response for a bad token, else None"""
+        scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token.strip():
+            request.user = AnonymousUser()
+            return None
+        try:
+            request.user = read_token(token.strip())
+        except signing.BadSignature:
+            return error_response('Invalid or expired token', 401)
+        return None
@@ -0,0 +1,18 @@
+from django.http import JsonResponse
+
+# No spaces after separators: polling clients download these bodies a lot
+COMPACT_JSON = {'separators': (',', ':')}
+
+
+class ApiResponse(JsonResponse):
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('safe', False)
+        kwargs.setdefault('json_dumps_params', COMPACT_JSON)
+        super().__init__(data, **kwargs)
+
+
+def error_response(message, status, **kwargs):
+    response = ApiResponse({'error': message}, status=status, **kwargs)
+    if status == 401:
+        response['WWW-Authenticate'] = 'Bearer'
+    return response
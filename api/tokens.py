@@ -0,0 +1,53 @@
+"""Signed, expiring bearer tokens for the JSON API.
+
+A token is a compressed, timestamp-signed payload holding the user id, role
+and the ids of the teams the user may see, so a request is authenticated
+without a session or database lookup. Admins and doctors reach every team,
+as in the HTML views, and carry no team list.
+
+Tokens cannot be revoked individually: they expire after
+``API_TOKEN_MAX_AGE`` seconds, and ``/api/token/refresh/`` re-reads the user,
+so a role or team change (or deactivation) takes effect within one lifetime.
+Rotating ``SECRET_KEY`` invalidates every token.
+"""
+from django.conf import settings
+from django.core import signing
+
+SALT = 'api.token'
+
+
+class TokenUser:
+    """The user a valid token was issued to, as far as the token tells"""
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    def __init__(self, pk, role, team_ids):
+        self.pk = self.id = pk
+        self.role = role
+        # None means every team
+        self.team_ids = None if team_ids is None else frozenset(team_ids)
+
+    def can_access_team(self, team_id):
+        return self.team_ids is None or team_id in self.team_ids
+
+    def scope(self, queryset, team_field='team'):
+        """Limit ``queryset`` to the token's teams through ``team_field``"""
+        if self.team_ids is None:
+            return queryset
+        return queryset.filter(**{f'{team_field}__in': self.team_ids})
+
+    def __repr__(self):
+        return f'<TokenUser {self.pk} {self.role}>'
+
+
+def issue_token(user):
+    payload = {'u': user.pk, 'r': user.role, 't': user.visible_team_ids()}
+    return signing.TimestampSigner(salt=SALT).sign_object(payload, compress=True)
+
+
+def read_token(token):
+    """The ``TokenUser`` for ``token``; raises ``signing.BadSignature`` if it is forged or expired"""
+    payload = signing.TimestampSigner(salt=SALT).unsign_object(token, max_age=settings.API_TOKEN_MAX_AGE)
+    return TokenUser(payload['u'], payload['r'], payload['t'])
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('token/', views.obtain_token, name='token'),
+    path('token/refresh/', views.refresh_token, name='token_refresh'),
+    path('events/', views.events, name='events'),
+    path('players/', views.players, name='players'),
+    path('players/<int:player_id>/injuries/', views.player_injuries, name='player_injuries'),
+    path('injuries/<int:injury_id>/status/', views.injury_status, name='injury_status'),
+    path('changes/', views.changes, name='changes'),
+]
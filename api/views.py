@@ -0,0 +1,160 @@
+import json
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.shortcuts import aget_object_or_404, get_object_or_404
+
+from accounts.models import CustomUser
+from injuries.views import search_players
+from injury_tracking.changes import CursorTooOld, change_page, event_data, latest_change_id
+from injury_tracking.forms import EventQueryForm
+from injury_tracking.models import Event, InjuryRecord
+from injury_tracking.views import player_injury_history, set_injury_status
+from lancer_project.write_queue import run_write
+
+from .responses import ApiResponse, error_response
+from .tokens import issue_token
+
+
+def api_view(roles=None, methods=('GET',), login_required=True):
+    """Check the method, the bearer token and the role before calling the view.
+
+    Works on sync and async views alike; the checks themselves need no database.
+    """
+    def decorator(view):
+        def check(request):
+            if request.method not in methods:
+                return error_response('Method not allowed', 405, headers={'Allow': ', '.join(methods)})
+            if login_required and not request.user.is_authenticated:
+                return error_response('Authentication required', 401)
+            if roles and request.user.role not in roles:
+                return error_response('Access denied', 403)
+            return None
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapper(request, *args, **kwargs):
+                rejected = check(request)
+                return rejected if rejected is not None else await view(request, *args, **kwargs)
+        else:
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                rejected = check(request)
+                return rejected if rejected is not None else view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def request_data(request):
+    """The JSON object or form data posted to the view, or None if it is not valid"""
+    if request.content_type != 'application/json':
+        return request.POST
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def token_response(user):
+    return ApiResponse({
+        'token': issue_token(user),
+        'expires_in': settings.API_TOKEN_MAX_AGE,
+        'role': user.role,
+        'teams': user.visible_team_ids(),
+    })
+
+
+@api_view(methods=('POST',), login_required=False)
+def obtain_token(request):
+    """Exchange a username and password for a bearer token"""
+    data = request_data(request)
+    if data is None:
+        return error_response('Invalid JSON', 400)
+    user = authenticate(request, username=data.get('username'), password=data.get('password'))
+    if user is None:
+        return error_response('Invalid credentials', 400)
+    return token_response(user)
+
+
+@api_view(methods=('POST',))
+def refresh_token(request):
+    """A new token for the current one, with the user's role and teams re-read"""
+    user = CustomUser.objects.filter(pk=request.user.pk, is_active=True).first()
+    if user is None:
+        return error_response('Invalid or expired token', 401)
+    return token_response(user)
+
+
+@api_view(roles=['ADMIN', 'COACH'])
+async def events(request):
+    """Events of the token's teams, optionally for one ``team`` and a ``start``/``end`` range"""
+    form = EventQueryForm(request.GET)
+    if not form.is_valid():
+        return error_response(f"Invalid parameters: {', '.join(sorted(form.errors))}", 400)
+    query = form.cleaned_data
+    qs = request.user.scope(Event.objects.all())
+    if query['team']:
+        qs = qs.filter(team_id=query['team'])
+    if query['start']:
+        qs = qs.filter(end_datetime__gte=query['start'])
+    if query['end']:
+        qs = qs.filter(start_datetime__lte=query['end'])
+    return ApiResponse({'events': [event_data(ev) async for ev in qs.order_by('start_datetime')]})
+
+
+@api_view(roles=['ADMIN', 'COACH', 'DOCTOR'])
+async def players(request):
+    """Players of the token's teams whose username contains ``q``"""
+    qs = request.user.scope(CustomUser.objects.filter(role='PLAYER'))
+    return ApiResponse({'results': await search_players(qs, request.GET.get('q', ''))})
+
+
+@api_view(roles=['ADMIN', 'COACH', 'DOCTOR'])
+async def player_injuries(request, player_id):
+    player = await aget_object_or_404(CustomUser.objects.only('id', 'team_id'), id=player_id, role='PLAYER')
+    if not request.user.can_access_team(player.team_id):
+        return error_response('Access denied', 403)
+    return ApiResponse({'injuries': await player_injury_history(player)})
+
+
+@api_view(roles=['ADMIN', 'DOCTOR'], methods=('POST',))
+def injury_status(request, injury_id):
+    """Set an injury's status; ``RECOVERED`` also clears the player medically"""
+    injury = get_object_or_404(InjuryRecord.objects.select_related('player'), id=injury_id)
+    if not request.user.can_access_team(injury.player.team_id):
+        return error_response('Access denied', 403)
+    data = request_data(request)
+    new_status = data.get('status') if data is not None else None
+    if not isinstance(new_status, str) or new_status not in dict(InjuryRecord.STATUS_CHOICES):
+        return error_response('Invalid status', 400)
+    set_injury_status(injury, new_status)
+    run_write(injury.save)
+    return ApiResponse({'id': injury.id, 'status': injury.status})
+
+
+@api_view(roles=['ADMIN', 'COACH', 'DOCTOR'])
+def changes(request):
+    """Injuries, follow-ups and events changed after the ``since`` cursor.
+
+    Without ``since`` it returns only the current cursor, to start from after
+    loading the full lists. Each object appears once per page with its
+    current data, or ``deleted``. Follow ``next`` while ``more`` is true; a
+    410 means the cursor predates the retained log and the client resyncs.
+    """
+    since = request.GET.get('since')
+    if not since:
+        return ApiResponse({'changes': [], 'next': latest_change_id(), 'more': False})
+    try:
+        since = int(since)
+        limit = min(int(request.GET.get('limit', settings.CHANGE_FEED_PAGE_SIZE)), settings.CHANGE_FEED_PAGE_SIZE)
+    except ValueError:
+        return error_response('Invalid cursor or limit', 400)
+    if limit < 1:
+        return error_response('Invalid cursor or limit', 400)
+    try:
+        return ApiResponse(change_page(since, limit, request.user.team_ids))
+    except CursorTooOld:
+        return error_response('Cursor is older than the change log; resync', 410)
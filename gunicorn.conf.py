@@ -0,0 +1,31 @@
+"""Gunicorn settings; ``gunicorn -c gunicorn.conf.py`` (picked up by default from here).
+
+By default each worker runs the ASGI application on a uvicorn event loop, so
+async views (the events feed, player lookups, the /api/ reads and the live
+change stream) keep serving other connections while they wait on the
+database or a slow client. ``GUNICORN_WORKER_CLASS=gthread`` falls back to
+the WSGI application with ``GUNICORN_THREADS`` threads per worker.
+``python manage.py benchmark_asgi_concurrency`` compares the two.
+"""
+import multiprocessing
+
+from decouple import config
+
+bind = config('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = config('GUNICORN_WORKERS', default=multiprocessing.cpu_count() * 2 + 1, cast=int)
+worker_class = config('GUNICORN_WORKER_CLASS', default='uvicorn_worker.UvicornWorker')
+threads = config('GUNICORN_THREADS', default=4, cast=int)
+
+if worker_class == 'gthread':
+    wsgi_app = 'lancer_project.wsgi:application'
+else:
+    wsgi_app = 'lancer_project.asgi:application'
+
+# Event streams end after CHANGE_STREAM_MAX_SECONDS; let them finish on reload
+graceful_timeout = config('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+timeout = config('GUNICORN_TIMEOUT', default=30, cast=int)
+keepalive = config('GUNICORN_KEEPALIVE', default=5, cast=int)
+# Recycle workers now and then, staggered so they do not restart together
+max_requests = config('GUNICORN_MAX_REQUESTS', default=2000, cast=int)
+max_requests_jitter = max_requests // 10
+accesslog = '-'
@@ -42,20 +42,25 @@ def injury_list(request):
 
 
 @login_required
-def players_ajax(request):
+async def players_ajax(request):
     # simple search endpoint for Select2
-    q = request.GET.get('q', '')
-    items = []
+    user = await request.auser()
     qs = CustomUser.objects.filter(role='PLAYER')
-    if request.user.role == 'COACH' and request.user.team:
-        qs = qs.filter(team=request.user.team)
+    if user.role == 'COACH' and user.team_id:
+        qs = qs.filter(team_id=user.team_id)
+    return JsonResponse({'results': await search_players(qs, request.GET.get('q', ''))})
+
+
+async def search_players(qs, q):
+    """Up to 20 ``{'id', 'text'}`` items from the players in ``qs`` matching ``q``"""
+    items = []
     if q:
         qs = qs.filter(username__icontains=q)[:20]
     else:
         qs = qs.all()[:20]
-    for u in qs:
+    async for u in qs:
         items.append({'id': u.pk, 'text': u.get_full_name() or u.username})
-    return JsonResponse({'results': items})
+    return items
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from .forms import InjuryReportForm
@@ -86,4 +91,5 @@ def injury_list(request):
         reports = InjuryReport.objects.filter(player__team=user.team)
     else:
         reports = InjuryReport.objects.all()
+    reports = reports.select_related('player')
     return render(request, 'injuries/list.html', {'reports': reports})
@@ -0,0 +1,257 @@
+"""Chart data for the analytics page, as compact columnar JSON.
+
+``tracking:analytics_data`` serves it and ``static/js/analytics.js`` draws the
+page from it, so the HTML no longer waits on (or embeds) any aggregate. A
+query is the cleaned ``AnalyticsQueryForm``: an optional ``team``, an
+optional ``start``/``end`` range of injury dates, the ``granularity`` of the
+trend and the ``dimensions`` to break injuries down by. Queries covering
+whole months at month or year granularity (the analytics page's) are
+answered from the ``InjuryRollup`` table; others, by day or week or from mid
+month, aggregate the injury rows themselves. The ``recovery`` dimension adds
+recovery-time statistics (see ``recovery.py``). Results are cached
+per query under the data versions of what they cover, and the ETag is built
+from the same versions, so browsers revalidate an unchanged chart with a 304
+and workers share one computation.
+
+Every breakdown is a set of columns rather than a list of rows, which sends
+each key once however many labels there are::
+
+    {"v": 1,
+     "filters": {"team": 3, "start": "2026-01-01", "end": "2026-12-31", "granularity": "month"},
+     "summary": {"total": 120, "active": 14, "recovered": 98, "avg_recovery_days": 17.5},
+     "dimensions": {
+       "period": {"period": ["2026-01-01", "2026-02-01", ...], "count": [9, 12, ...]},
+       "severity": {"label": ["Mild", ...], "count": [61, ...], "color": ["#10b981", ...]}}}
+
+With ``recovery`` among the dimensions a ``"recovery"`` key is added: the
+statistics of every recovered injury in the query, under ``"overall"``, and
+the same statistics as columns by injury type, body part, severity and
+position, most outcomes first::
+
+    "recovery": {
+      "overall": {"n": 98, "mean": 17.5, "ci_low": 15.2, "ci_high": 19.8, "p25": 9.0, ...},
+      "severity": {"label": ["Mild", ...], "n": [61, ...], "p50": [8.0, ...], ...}, ...}
+
+Bump ``SCHEMA_VERSION`` (and the URL) when that shape changes incompatibly.
+"""
+from datetime import timedelta
+from functools import partial
+
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+from django.utils.http import quote_etag
+
+from .caching import GLOBAL, LOOKUPS, cached, lookup_choices, team_scope, version_tag
+from .models import BodyPart, InjuryRecord, InjuryRollup, InjurySeverity, InjuryType
+from .panels import run_panels
+from .recovery import DIMENSIONS as RECOVERY_DIMENSIONS, STATISTICS, recovery_breakdown
+
+SCHEMA_VERSION = 1
+
+# dimension: (InjuryRollup values() fields, label first; how many of the largest to send)
+DIMENSIONS = {
+    'injury_type': (['injury_type__name'], 10),
+    'body_part': (['body_part__name'], 10),
+    'severity': (['severity__name', 'severity__color_code'], None),
+    'status': (['status'], None),
+    'team': (['team__name'], None),
+}
+# The same fields on InjuryRecord, where they differ
+RECORD_FIELDS = {'team__name': 'player__team__name'}
+# "period" is the trend over time, at the query's granularity
+DEFAULT_DIMENSIONS = ['period', 'injury_type', 'body_part', 'severity']
+# Every dimension a query may name, in canonical order; "recovery" is the
+# recovery-time statistics
+QUERY_DIMENSIONS = ['period', *DIMENSIONS, 'recovery']
+# Lookup models naming the recovery statistics' groups
+RECOVERY_LABELS = {'injury_type': InjuryType, 'body_part': BodyPart, 'severity': InjurySeverity}
+GRANULARITIES = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth, 'year': TruncYear}
+# Longest trend one query may ask for
+MAX_PERIODS = 1000
+# Rough days per period, to check a range against MAX_PERIODS
+PERIOD_DAYS = {'day': 1, 'week': 7, 'month': 28, 'year': 365}
+
+
+def query_scopes(query):
+    if query['team']:
+        return [team_scope(query['team']), LOOKUPS]
+    return [GLOBAL]
+
+
+def analytics_etag(query):
+    """ETag of the query's data: its team and the data versions it covers"""
+    return quote_etag(f"analytics.{SCHEMA_VERSION}.{query['team'] or ''}.{version_tag(*query_scopes(query))}")
+
+
+def chart_data(query):
+    """The query's summary and breakdowns, cached until the data they cover changes"""
+    key = ':'.join([
+        f'analytics.{SCHEMA_VERSION}', str(query['team'] or ''),
+        query['start'].isoformat() if query['start'] else '',
+        query['end'].isoformat() if query['end'] else '',
+        query['granularity'], ','.join(query['dimensions']),
+    ])
+    return cached(key, query_scopes(query), partial(compute_chart_data, query))
+
+
+def uses_rollup(query):
+    """Whether the rollup answers the query: whole months, no finer trend"""
+    return (
+        (query['granularity'] in ('month', 'year') or 'period' not in query['dimensions'])
+        and (not query['start'] or query['start'].day == 1)
+        and (not query['end'] or (query['end'] + timedelta(days=1)).day == 1)
+    )
+
+
+def compute_chart_data(query):
+    rollup = uses_rollup(query)
+    if rollup:
+        rows = InjuryRollup.objects.all()
+        if query['team']:
+            rows = rows.filter(team_id=query['team'])
+        if query['start']:
+            rows = rows.filter(month__gte=query['start'])
+        if query['end']:
+            rows = rows.filter(month__lte=query['end'])
+    else:
+        rows = InjuryRecord.objects.all()
+        if query['team']:
+            rows = rows.filter(player__team_id=query['team'])
+        if query['start']:
+            rows = rows.filter(injury_date__gte=query['start'])
+        if query['end']:
+            rows = rows.filter(injury_date__lte=query['end'])
+
+    panels = {'summary': partial(summary, rows, rollup)}
+    for dimension in query['dimensions']:
+        if dimension == 'period':
+            panels[dimension] = partial(trend, rows, rollup, query['granularity'], query['start'], query['end'])
+        elif dimension == 'recovery':
+            panels[dimension] = partial(recovery, query)
+        else:
+            panels[dimension] = partial(breakdown, rows, rollup, dimension)
+    results = run_panels(panels)
+
+    data = {
+        'v': SCHEMA_VERSION,
+        'filters': {
+            'team': query['team'],
+            'start': query['start'] and query['start'].isoformat(),
+            'end': query['end'] and query['end'].isoformat(),
+            'granularity': query['granularity'],
+        },
+        'summary': results.pop('summary'),
+    }
+    if 'recovery' in results:
+        data['recovery'] = results.pop('recovery')
+    data['dimensions'] = results
+    return data
+
+
+def injury_count(rollup, **kwargs):
+    """Aggregate counting injuries in rollup or InjuryRecord rows"""
+    if rollup:
+        return Sum('injuries', default=0, **kwargs)
+    return Count('id', **kwargs)
+
+
+def summary(rows, rollup):
+    recovered = Q(status='RECOVERED')
+    if rollup:
+        recovery = {
+            'recovery_days': Sum('recovery_days', filter=recovered),
+            'recovery_days_count': Sum('recovery_days_count', filter=recovered),
+        }
+    else:
+        recovery = {'avg_recovery_days': Avg('actual_recovery_time', filter=recovered)}
+    totals = rows.aggregate(
+        total=injury_count(rollup),
+        active=injury_count(rollup, filter=Q(status='ACTIVE')),
+        recovered=injury_count(rollup, filter=recovered),
+        **recovery,
+    )
+    if rollup:
+        days, count = totals.pop('recovery_days'), totals.pop('recovery_days_count')
+        totals['avg_recovery_days'] = days / count if count else None
+    if totals['avg_recovery_days'] is not None:
+        totals['avg_recovery_days'] = round(totals['avg_recovery_days'], 1)
+    return totals
+
+
+def breakdown(rows, rollup, dimension):
+    """Injury counts by ``dimension``, largest first"""
+    fields, limit = DIMENSIONS[dimension]
+    if not rollup:
+        fields = [RECORD_FIELDS.get(field, field) for field in fields]
+    rows = rows.values_list(*fields).annotate(count=injury_count(rollup)).order_by('-count', fields[0])
+    if limit:
+        rows = rows[:limit]
+    rows = list(rows)
+    columns = {'label': [row[0] for row in rows], 'count': [row[-1] for row in rows]}
+    if dimension == 'severity':
+        columns['color'] = [row[1] for row in rows]
+    return columns
+
+
+def recovery(query):
+    """Recovery-time statistics overall and by each recovery dimension"""
+    stats = recovery_breakdown(query['team'], query['start'], query['end'])
+    result = {'overall': stats['overall']}
+    for dimension in RECOVERY_DIMENSIONS:
+        groups = stats[dimension]
+        names = dict(lookup_choices(RECOVERY_LABELS[dimension])) if dimension in RECOVERY_LABELS else {}
+        labels = {key: names.get(key[0], key[0] or 'Not recorded') for key in groups}
+        keys = sorted(groups, key=lambda key: (-groups[key]['n'], str(labels[key])))
+        columns = {'label': [labels[key] for key in keys]}
+        for name in STATISTICS:
+            columns[name] = [groups[key][name] for key in keys]
+        result[dimension] = columns
+    return result
+
+
+def trend(rows, rollup, granularity, start=None, end=None):
+    """Injury counts per period, with empty periods filled in.
+
+    Periods are named by their first day. Without ``start`` or ``end`` the
+    trend runs from the first to the last period with an injury, keeping the
+    latest ``MAX_PERIODS``.
+    """
+    counts = dict(
+        rows.annotate(period=GRANULARITIES[granularity]('month' if rollup else 'injury_date'))
+        .values_list('period')
+        .annotate(count=injury_count(rollup))
+        .order_by()
+    )
+    first = period_start(start, granularity) if start else min(counts, default=None)
+    last = period_start(end, granularity) if end else max(counts, default=None)
+    periods = []
+    while first is not None and last is not None and first <= last:
+        periods.append(first)
+        if first == last:
+            break
+        first = next_period(first, granularity)
+    periods = periods[-MAX_PERIODS:]
+    return {
+        'period': [period.isoformat() for period in periods],
+        'count': [counts.get(period, 0) for period in periods],
+    }
+
+
+def period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_period(day, granularity):
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return day.replace(year=day.year + day.month // 12, month=day.month % 12 + 1)
+    if granularity == 'year':
+        return day.replace(year=day.year + 1)
+    return day + timedelta(days=1)
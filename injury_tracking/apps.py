@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class InjuryTrackingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'injury_tracking'
+
+    def ready(self):
+        # Cache invalidation, change log and rollup signal handlers
+        from . import caching, changes, rollup  # noqa: F401
@@ -0,0 +1,234 @@
+"""Cached dashboard aggregates and lookup lists, invalidated by version counters.
+
+Cache keys embed the current value of one or more data-version counters:
+``injuries`` for anything site-wide, ``team:<id>`` per team and ``lookups``
+for injury types, body parts and severities. The signal handlers below bump
+the counters whenever those rows change, so stale entries are never read
+again and simply age out of the cache.
+
+Each change bumps its counters twice, once straight away and once when the
+transaction commits, so a worker that recomputes an aggregate between the
+two, from data that is not yet committed or already stale, caches it under a
+version nobody asks for afterwards. Bulk operations (``bulk_create``,
+``QuerySet.update``) send no signals; code using them calls ``invalidate``.
+
+A miss is computed once however many requests want it at the same moment:
+``cached`` takes a lock in the shared cache (``cache.add``), so across every
+worker one request computes the value while the others wait for it to
+appear, instead of all of them running the same aggregate (see
+``single_flight``).
+
+Templates cache their expensive fragments the same way, with ``{% cache %}``
+keyed by ``version_tag`` of the scopes they show (see ``fragment_context``).
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser, PlayerProfile, Team
+from .models import BodyPart, Event, InjuryFollowUp, InjuryRecord, InjurySeverity, InjuryType
+
+GLOBAL = 'injuries'
+LOOKUPS = 'lookups'
+# Seconds a cached aggregate may live; versions make it exact before that
+AGGREGATE_TIMEOUT = 300
+LOOKUP_TIMEOUT = 24 * 60 * 60
+
+
+def team_scope(team_id):
+    return f'team:{team_id}'
+
+
+def _version_key(scope):
+    return f'version:{scope}'
+
+
+def _initial_version():
+    # Start from the clock so a counter lost to eviction never reuses an old value
+    return time.time_ns() // 1000
+
+
+def data_versions(*scopes):
+    """Current version of each scope, creating missing counters"""
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(scope):
+    key = _version_key(scope)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_version(), timeout=None)
+
+
+def invalidate(*scopes):
+    """Bump the scopes now and again once the current transaction commits"""
+    scopes = [scope for scope in scopes if scope]
+    for scope in scopes:
+        bump_version(scope)
+    transaction.on_commit(lambda: [bump_version(scope) for scope in scopes])
+
+
+def version_tag(*scopes):
+    """The scopes' current versions as one string, for cache keys and ETags"""
+    return '.'.join(str(version) for version in data_versions(*scopes))
+
+
+def cached(name, scopes, compute, timeout=AGGREGATE_TIMEOUT):
+    """Return ``compute()``, cached until any of ``scopes`` changes"""
+    key = f'{name}:{version_tag(*scopes)}'
+    value = cache.get(key)
+    if value is None:
+        value = single_flight(key, compute, timeout)
+    return value
+
+
+def single_flight(key, compute, timeout=AGGREGATE_TIMEOUT):
+    """Cache ``compute()`` under ``key``, computing it once across all workers.
+
+    The caller that takes ``lock:<key>`` computes and stores the value; the
+    others poll the cache until it appears. A holder that dies leaves its
+    lock to expire after ``SINGLE_FLIGHT_LOCK_SECONDS``, and a waiter that
+    gives up after ``SINGLE_FLIGHT_WAIT_SECONDS`` computes the value itself,
+    so a lost lock slows requests down but never fails them.
+    """
+    lock_key = f'lock:{key}'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_SECONDS
+    delay = 0.01
+    while not cache.add(lock_key, token, timeout=settings.SINGLE_FLIGHT_LOCK_SECONDS):
+        if time.monotonic() >= deadline:
+            value = compute()
+            cache.set(key, value, timeout)
+            return value
+        time.sleep(delay)
+        delay = min(delay * 2, 0.2)
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    try:
+        # Another holder may have stored it between our miss and the lock
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value, timeout)
+        return value
+    finally:
+        # Leave a lock that expired and was taken over to its new holder
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def fragment_context(*scopes):
+    """Template context for ``{% cache fragment_timeout name fragment_version ... %}``.
+
+    The fragment is rendered again once any of ``scopes`` changes; vary it on
+    anything else it shows, such as the viewer's role or team.
+    """
+    return {'fragment_version': version_tag(*scopes), 'fragment_timeout': AGGREGATE_TIMEOUT}
+
+
+def lookup_choices(model):
+    """``(pk, label)`` pairs for a lookup model, for select widgets"""
+    return cached(
+        f'lookup:{model._meta.label_lower}', [LOOKUPS],
+        lambda: [(obj.pk, str(obj)) for obj in model.objects.all()],
+        timeout=LOOKUP_TIMEOUT,
+    )
+
+
+# Invalidation
+
+def injury_team_id(injury):
+    """Team of the injury's player, looked up at most once per instance"""
+    if InjuryRecord.player.is_cached(injury):
+        return injury.player.team_id
+    if not hasattr(injury, '_player_team_id'):
+        injury._player_team_id = (
+            CustomUser.objects.filter(pk=injury.player_id).values_list('team_id', flat=True).first()
+        )
+    return injury._player_team_id
+
+
+def follow_up_team_id(follow_up, origin=None):
+    """Team of the follow-up's player, looked up at most once per instance.
+
+    ``origin`` is the ``post_delete`` signal's: when the follow-up is deleted
+    along with its injury, the team comes from that injury instance, so the
+    cascade costs one lookup however many follow-ups it removes.
+    """
+    if InjuryFollowUp.injury.is_cached(follow_up):
+        return injury_team_id(follow_up.injury)
+    if isinstance(origin, InjuryRecord) and origin.pk == follow_up.injury_id:
+        return injury_team_id(origin)
+    if not hasattr(follow_up, '_player_team_id'):
+        follow_up._player_team_id = (
+            CustomUser.objects.filter(injuries=follow_up.injury_id).values_list('team_id', flat=True).first()
+        )
+    return follow_up._player_team_id
+
+
+def _injury_team_scope(injury):
+    team_id = injury_team_id(injury)
+    return team_id and team_scope(team_id)
+
+
+@receiver([post_save, post_delete], sender=InjuryRecord)
+def injury_changed(sender, instance, **kwargs):
+    invalidate(GLOBAL, _injury_team_scope(instance))
+
+
+@receiver([post_save, post_delete], sender=InjuryFollowUp)
+def follow_up_changed(sender, instance, origin=None, **kwargs):
+    # Follow-ups show on the team's and the player's pages only
+    team_id = follow_up_team_id(instance, origin)
+    invalidate(team_id and team_scope(team_id))
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, instance, **kwargs):
+    invalidate(instance.team_id and team_scope(instance.team_id))
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login only, which no aggregate shows
+    if update_fields is not None and not {'role', 'team'} & set(update_fields):
+        return
+    # A player moved between teams leaves the old team's entries to expire
+    # with AGGREGATE_TIMEOUT
+    invalidate(GLOBAL, instance.team_id and team_scope(instance.team_id))
+
+
+@receiver([post_save, post_delete], sender=PlayerProfile)
+def player_profile_changed(sender, instance, **kwargs):
+    # Positions and numbers show on the coach dashboard
+    if PlayerProfile.user.is_cached(instance):
+        team_id = instance.user.team_id
+    else:
+        team_id = CustomUser.objects.filter(pk=instance.user_id).values_list('team_id', flat=True).first()
+    invalidate(team_id and team_scope(team_id))
+
+
+@receiver([post_save, post_delete], sender=Team)
+def team_changed(sender, instance, **kwargs):
+    invalidate(GLOBAL, team_scope(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=InjuryType)
+@receiver([post_save, post_delete], sender=BodyPart)
+@receiver([post_save, post_delete], sender=InjurySeverity)
+def lookup_changed(sender, instance, **kwargs):
+    invalidate(GLOBAL, LOOKUPS)
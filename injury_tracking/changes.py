@@ -0,0 +1,169 @@
+"""Change log behind the /api/changes/ feed and the live dashboard stream.
+
+Every save and delete of an ``InjuryRecord``, ``InjuryFollowUp`` or ``Event``
+appends a ``ChangeLog`` row in the same transaction, tagged with the team
+the object belongs to; deletes are recorded as tombstones. Clients keep the
+id of the last row they have seen and ask only for the rows after it.
+
+Each write also bumps the ``changes`` data-version counter in the shared
+cache, so the live stream can poll that counter and only query the log once
+something has changed.
+
+Bulk operations send no signals; code using them calls ``record_changes``,
+as ``_record_follow_up_round`` does. ``generate_load_data`` does not log:
+clients resync from the list endpoints after a reload.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import follow_up_team_id, injury_team_id, invalidate
+from .models import ChangeLog, Event, InjuryFollowUp, InjuryRecord
+
+# Data-version scope bumped by every change
+CHANGES = 'changes'
+
+
+class CursorTooOld(Exception):
+    """The cursor predates the oldest change kept; the client must resync"""
+
+
+# JSON shapes
+
+def event_data(ev):
+    return {
+        'id': ev.id,
+        'team': ev.team_id,
+        'type': ev.event_type,
+        'title': ev.title,
+        'start': ev.start_datetime.isoformat(),
+        'end': ev.end_datetime.isoformat(),
+        'location': ev.location,
+    }
+
+
+def injury_data(injury):
+    return {
+        'id': injury.id,
+        'player': injury.player_id,
+        'player_name': injury.player.get_full_name(),
+        'team': injury.player.team_id,
+        'injury_type': injury.injury_type.name,
+        'body_part': injury.body_part.name,
+        'severity': injury.severity.name,
+        'color_code': injury.severity.color_code,
+        'status': injury.status,
+        'status_display': injury.get_status_display(),
+        'injury_date': injury.injury_date.isoformat(),
+        'medical_clearance': injury.medical_clearance,
+        'follow_up_required': injury.follow_up_required,
+        'follow_up_date': injury.follow_up_date and injury.follow_up_date.isoformat(),
+        'updated_at': injury.updated_at.isoformat(),
+    }
+
+
+def follow_up_data(follow_up):
+    return {
+        'id': follow_up.id,
+        'injury': follow_up.injury_id,
+        'follow_up_date': follow_up.follow_up_date.isoformat(),
+        'status_update': follow_up.status_update,
+        'notes': follow_up.notes,
+    }
+
+
+# Current rows and JSON shape of each change log kind
+CHANGE_KINDS = {
+    ChangeLog.INJURY: (
+        lambda: InjuryRecord.objects.select_related('player', 'injury_type', 'body_part', 'severity'),
+        injury_data,
+    ),
+    ChangeLog.FOLLOW_UP: (lambda: InjuryFollowUp.objects.all(), follow_up_data),
+    ChangeLog.EVENT: (lambda: Event.objects.all(), event_data),
+}
+
+
+# Reading
+
+def latest_change_id():
+    return ChangeLog.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def change_page(since, limit, team_ids=None):
+    """Objects changed after ``since``, for the teams in ``team_ids`` (None: all).
+
+    Returns ``{'changes', 'next', 'more'}``. Each object appears once per page,
+    at its last change, with its current data or ``deleted``. Raises
+    ``CursorTooOld`` when entries after ``since`` have been pruned.
+    """
+    oldest = ChangeLog.objects.order_by('id').values_list('id', flat=True).first()
+    if oldest is not None and since < oldest - 1:
+        raise CursorTooOld(since)
+
+    entries = ChangeLog.objects.filter(id__gt=since)
+    if team_ids is not None:
+        entries = entries.filter(team__in=team_ids)
+    if settings.CHANGE_FEED_LAG_SECONDS:
+        entries = entries.filter(
+            created_at__lte=timezone.now() - timedelta(seconds=settings.CHANGE_FEED_LAG_SECONDS)
+        )
+    rows = list(entries.order_by('id').values_list('id', 'kind', 'object_id', 'deleted')[:limit + 1])
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Keep the last entry per object, in sequence order
+    latest = {}
+    for seq, kind, object_id, deleted in rows:
+        latest.pop((kind, object_id), None)
+        latest[kind, object_id] = (seq, deleted)
+
+    current = {}
+    for kind, (queryset, _) in CHANGE_KINDS.items():
+        ids = [object_id for (k, object_id), (_, deleted) in latest.items() if k == kind and not deleted]
+        if ids:
+            current[kind] = queryset().in_bulk(ids)
+
+    changes = []
+    for (kind, object_id), (seq, _) in latest.items():
+        obj = current.get(kind, {}).get(object_id)
+        changes.append({
+            'seq': seq,
+            'type': kind,
+            'id': object_id,
+            'deleted': obj is None,
+            'data': None if obj is None else CHANGE_KINDS[kind][1](obj),
+        })
+    return {'changes': changes, 'next': rows[-1][0] if rows else since, 'more': more}
+
+
+# Recording
+
+def record_changes(changes, deleted=False):
+    """Append one entry per ``(kind, object_id, team_id)`` in ``changes``"""
+    ChangeLog.objects.bulk_create([
+        ChangeLog(kind=kind, object_id=object_id, team_id=team_id, deleted=deleted)
+        for kind, object_id, team_id in changes
+    ])
+    invalidate(CHANGES)
+
+
+@receiver([post_save, post_delete], sender=InjuryRecord)
+def injury_changed(sender, instance, signal, **kwargs):
+    deleted = signal is post_delete
+    record_changes([(ChangeLog.INJURY, instance.pk, injury_team_id(instance))], deleted)
+
+
+@receiver([post_save, post_delete], sender=InjuryFollowUp)
+def follow_up_changed(sender, instance, signal, origin=None, **kwargs):
+    deleted = signal is post_delete
+    record_changes([(ChangeLog.FOLLOW_UP, instance.pk, follow_up_team_id(instance, origin))], deleted)
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, instance, signal, **kwargs):
+    deleted = signal is post_delete
+    record_changes([(ChangeLog.EVENT, instance.pk, instance.team_id)], deleted)
@@ -1,12 +1,35 @@
+from functools import partial
+
 from django import forms
 from django.contrib.auth import get_user_model
 from .models import (
     InjuryRecord, InjuryType, BodyPart, InjurySeverity, 
     InjuryFollowUp, TeamRoster, Event
 )
+from .analytics import DEFAULT_DIMENSIONS, GRANULARITIES, MAX_PERIODS, PERIOD_DAYS, QUERY_DIMENSIONS
+from .caching import lookup_choices
+from .recovery import suggested_recovery
 
 User = get_user_model()
 
+LOOKUP_FIELDS = {'injury_type': InjuryType, 'body_part': BodyPart, 'severity': InjurySeverity}
+
+def use_cached_lookups(form):
+    """Render the lookup selects from the shared cache instead of a query each.
+
+    The choices are callables, so nothing is fetched unless the form is rendered.
+    """
+    for name, model in LOOKUP_FIELDS.items():
+        field = form.fields.get(name)
+        if field is not None:
+            field.choices = partial(_lookup_field_choices, model, field.empty_label)
+
+def _lookup_field_choices(model, empty_label):
+    choices = lookup_choices(model)
+    if empty_label is not None:
+        choices = [('', empty_label)] + choices
+    return choices
+
 class InjuryReportForm(forms.ModelForm):
     """Form for doctors to report injuries"""
     
@@ -132,6 +155,22 @@ class InjuryReportForm(forms.ModelForm):
         
         # Set the player queryset
         self.fields['player'].queryset = player_queryset
+        use_cached_lookups(self)
+        self.fields['estimated_recovery_time'].help_text = (
+            'Estimated recovery time in days; leave blank to use the median recovery of similar injuries'
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('estimated_recovery_time') is None:
+            suggestion = suggested_recovery(
+                injury_type=getattr(cleaned_data.get('injury_type'), 'pk', None),
+                body_part=getattr(cleaned_data.get('body_part'), 'pk', None),
+                severity=getattr(cleaned_data.get('severity'), 'pk', None),
+            )
+            if suggestion:
+                cleaned_data['estimated_recovery_time'] = suggestion['days']
+        return cleaned_data
 
 class InjuryUpdateForm(forms.ModelForm):
     """Form for updating injury record"""
@@ -185,6 +224,30 @@ class InjuryFollowUpForm(forms.ModelForm):
             'status_update': forms.Select(attrs={'class': 'form-control'}),
         }
 
+class FollowUpRoundForm(InjuryFollowUpForm):
+    """One row of a clinic rounds sheet; rows left blank are skipped"""
+    injury = forms.IntegerField(widget=forms.HiddenInput())
+    next_follow_up_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A row only becomes a follow-up when the doctor writes notes or picks a status
+        self.fields['notes'].required = False
+        self.fields['notes'].widget.attrs['rows'] = 2
+        self.fields['status_update'].required = False
+        self.fields['status_update'].choices = [('', 'No change')] + InjuryRecord.STATUS_CHOICES
+        self.fields['follow_up_date'].required = False
+
+    def has_entry(self):
+        """True when the row carries something worth recording"""
+        data = getattr(self, 'cleaned_data', None) or {}
+        return bool(data.get('notes') or data.get('status_update') or data.get('next_follow_up_date'))
+
+FollowUpRoundFormSet = forms.formset_factory(FollowUpRoundForm, extra=0)
+
 class PlayerProfileForm(forms.ModelForm):
     """Form for players to update their profile"""
     
@@ -257,6 +320,66 @@ class InjurySearchForm(forms.Form):
         widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
     )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        use_cached_lookups(self)
+
+class AnalyticsQueryForm(forms.Form):
+    """Query parameters of the analytics data API (see ``analytics.py``)"""
+    team = forms.IntegerField(required=False, min_value=1)
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    granularity = forms.ChoiceField(
+        choices=[(name, name) for name in GRANULARITIES], required=False
+    )
+    # Comma-separated; "period" is the trend over time, "recovery" the
+    # recovery-time statistics
+    dimensions = forms.CharField(required=False)
+
+    def clean_granularity(self):
+        return self.cleaned_data['granularity'] or 'month'
+
+    def clean_dimensions(self):
+        if 'dimensions' not in self.data:
+            return DEFAULT_DIMENSIONS
+        names = [name for name in self.cleaned_data['dimensions'].split(',') if name]
+        unknown = set(names) - set(QUERY_DIMENSIONS)
+        if unknown:
+            raise forms.ValidationError(f"Unknown dimensions: {', '.join(sorted(unknown))}")
+        # Canonical order, so equivalent queries share a cache entry
+        return sorted(set(names), key=QUERY_DIMENSIONS.index)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end:
+            if start > end:
+                raise forms.ValidationError('start must not be after end')
+            granularity = cleaned_data.get('granularity', 'month')
+            if (end - start).days // PERIOD_DAYS[granularity] > MAX_PERIODS:
+                raise forms.ValidationError(f'The range spans more than {MAX_PERIODS} periods')
+        return cleaned_data
+
+class EventQueryForm(forms.Form):
+    """Query parameters of the events API and feed: a ``team`` and ``start``/``end`` bounds"""
+    team = forms.IntegerField(required=False, min_value=1)
+    # ISO 8601, as calendar clients send them
+    start = forms.DateTimeField(required=False)
+    end = forms.DateTimeField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError('start must not be after end')
+        return cleaned_data
+
+class RecoveryEstimateForm(forms.Form):
+    """Query parameters of the recovery estimate shown on the injury report"""
+    injury_type = forms.IntegerField(required=False, min_value=1)
+    body_part = forms.IntegerField(required=False, min_value=1)
+    severity = forms.IntegerField(required=False, min_value=1)
+
 class EventForm(forms.ModelForm):
     """Form for coaches/admins to create team events"""
     class Meta:
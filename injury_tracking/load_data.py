@@ -0,0 +1,324 @@
+"""Synthetic data for benchmarks, load tests and the performance suite.
+
+``LoadDataGenerator`` creates teams, staff, players with profiles, injuries,
+follow-ups, events and injury reports with ``bulk_create`` in fixed-size
+batches. Everything is drawn from one seeded ``random.Random`` and dated
+relative to ``as_of``, so the same arguments always produce the same rows.
+"""
+import random
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser, PlayerProfile, Team
+from injuries.models import InjuryReport
+from .caching import GLOBAL, LOOKUPS, invalidate
+from .models import BodyPart, Event, InjuryFollowUp, InjuryRecord, InjurySeverity, InjuryType
+from .rollup import rebuild as rebuild_rollup
+
+DEFAULT_SEED = 20251106
+DEFAULT_BATCH_SIZE = 5000
+
+INJURY_TYPES = [
+    ('Contusion', 22), ('Sprain', 18), ('Strain', 18), ('Concussion', 10), ('Laceration', 8),
+    ('Tendonitis', 6), ('Fracture', 5), ('Muscle Tear', 4), ('Ligament Tear', 4),
+    ('Dislocation', 3), ('Bursitis', 1), ('Cartilage Damage', 1),
+]
+BODY_PARTS = [
+    ('Knee', 14), ('Shoulder', 13), ('Head', 11), ('Ankle', 10), ('Hip', 9), ('Thigh', 8),
+    ('Lower Back', 7), ('Wrist', 6), ('Hand', 5), ('Back', 4), ('Neck', 3), ('Elbow', 3),
+    ('Foot', 2), ('Chest', 2), ('Lower Leg', 2), ('Fingers', 1),
+]
+# name, weight, colour, (min, max) estimated recovery in days
+SEVERITIES = [
+    ('Mild', 55, '#10b981', (3, 14)),
+    ('Moderate', 30, '#f59e0b', (14, 42)),
+    ('Severe', 12, '#ef4444', (42, 120)),
+    ('Critical', 3, '#991b1b', (90, 240)),
+]
+TREATMENTS = [('REST', 35), ('PHYSIO', 35), ('MEDICATION', 20), ('OTHER', 10)]
+EVENT_TYPES = [('TRAINING', 60), ('GAME', 25), ('SESSION', 15)]
+POSITIONS = ['Forward', 'Forward', 'Forward', 'Defence', 'Defence', 'Goalie']
+FIRST_NAMES = [
+    'Alex', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn', 'Drew',
+    'Sam', 'Charlie', 'Emerson', 'Logan', 'Parker', 'Reese', 'Rowan', 'Sawyer', 'Skyler', 'Blake',
+]
+LAST_NAMES = [
+    'Smith', 'Brown', 'Tremblay', 'Martin', 'Roy', 'Wilson', 'Gagnon', 'Lee', 'Johnson', 'MacDonald',
+    'Taylor', 'Campbell', 'Anderson', 'Leblanc', 'Wong', 'Cote', 'Bouchard', 'Gauthier', 'White', 'Singh',
+]
+REPORT_SEVERITY = {'Mild': 'MINOR', 'Moderate': 'MODERATE', 'Severe': 'SEVERE', 'Critical': 'SEVERE'}
+# Injuries are rarer in the off-season (May to August)
+OFF_SEASON_MONTHS = {5, 6, 7, 8}
+
+
+def _weighted(pairs):
+    """Split ``(name, weight, ...)`` rows into names and cumulative weights"""
+    names = [name for name, *_ in pairs]
+    cum_weights = list(accumulate(pair[1] for pair in pairs))
+    return names, cum_weights
+
+
+class LoadDataGenerator:
+    """Bulk-create a reproducible, realistically distributed dataset.
+
+    Usernames are ``<prefix>_admin``, ``<prefix>_coach_<n>``,
+    ``<prefix>_doctor_<n>`` and ``<prefix>_player_<n>_<i>`` (``n`` is the team
+    index), so several datasets can live side by side. Users get an unusable
+    password unless ``password`` is given; it is hashed once and shared.
+    """
+
+    def __init__(self, teams=4, players_per_team=100, injuries=20000, follow_ups=5000,
+                 events_per_team=500, reports=0, history_days=3 * 365, seed=DEFAULT_SEED,
+                 prefix='load', password=None, as_of=None, batch_size=DEFAULT_BATCH_SIZE, log=None):
+        self.teams = teams
+        self.players_per_team = players_per_team
+        self.injuries = injuries
+        self.follow_ups = follow_ups
+        self.events_per_team = events_per_team
+        self.reports = reports
+        self.history_days = history_days
+        self.prefix = prefix
+        self.password = make_password(password) if password else '!'
+        self.as_of = as_of or timezone.localdate()
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.rng = random.Random(seed)
+
+    def run(self):
+        """Create everything in one transaction and return the row counts"""
+        if CustomUser.objects.filter(username__startswith=f'{self.prefix}_').exists():
+            raise ValueError(f'Users with the prefix "{self.prefix}_" already exist')
+
+        with transaction.atomic():
+            self._load_lookups()
+            team_objects = self._create_teams()
+            staff, player_ids = self._create_users(team_objects)
+            injury_count = self._create_injuries(staff, player_ids)
+            follow_up_count = self._create_follow_ups(team_objects, staff)
+            event_count = self._create_events(team_objects, staff)
+            report_count = self._create_reports(staff, player_ids)
+            # bulk_create sends no signals
+            rebuild_rollup()
+            invalidate(GLOBAL, LOOKUPS)
+        return {
+            'teams': len(team_objects),
+            'players': len(player_ids),
+            'injuries': injury_count,
+            'follow_ups': follow_up_count,
+            'events': event_count,
+            'reports': report_count,
+        }
+
+    def _batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield min(self.batch_size, total - start)
+
+    def _load_lookups(self):
+        """Reuse the lookup rows that exist and create any that are missing"""
+        def ensure(model, names, defaults=None):
+            existing = model.objects.in_bulk(names, field_name='name')
+            model.objects.bulk_create([
+                model(name=name, **(defaults or {}).get(name, {})) for name in names if name not in existing
+            ])
+            return model.objects.in_bulk(names, field_name='name')
+
+        type_names, self.type_weights = _weighted(INJURY_TYPES)
+        part_names, self.part_weights = _weighted(BODY_PARTS)
+        severity_names, self.severity_weights = _weighted(SEVERITIES)
+        types = ensure(InjuryType, type_names)
+        parts = ensure(BodyPart, part_names)
+        severities = ensure(InjurySeverity, severity_names, {
+            name: {'color_code': colour} for name, _, colour, _ in SEVERITIES
+        })
+        self.type_ids = [types[name].pk for name in type_names]
+        self.part_ids = [parts[name].pk for name in part_names]
+        self.severity_ids = [severities[name].pk for name in severity_names]
+        self.recovery_ranges = {severities[name].pk: days for name, _, _, days in SEVERITIES}
+        self.report_severity = {severities[name].pk: REPORT_SEVERITY[name] for name in severity_names}
+
+    def _create_teams(self):
+        teams = Team.objects.bulk_create([
+            Team(name=f'{self.prefix.title()} Team {n}', gender='M' if n % 2 == 0 else 'W')
+            for n in range(self.teams)
+        ])
+        self.log(f'Created {len(teams)} teams')
+        return teams
+
+    def _user(self, username, role, team=None):
+        return CustomUser(
+            username=username, password=self.password, role=role, team=team,
+            first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES),
+            email=f'{username}@example.com', is_registration_complete=True,
+        )
+
+    def _create_users(self, teams):
+        staff = [self._user(f'{self.prefix}_admin', 'ADMIN')]
+        for n, team in enumerate(teams):
+            staff.append(self._user(f'{self.prefix}_coach_{n}', 'COACH', team))
+            staff.append(self._user(f'{self.prefix}_doctor_{n}', 'DOCTOR', team))
+        CustomUser.objects.bulk_create(staff)
+
+        for n, team in enumerate(teams):
+            CustomUser.objects.bulk_create([
+                self._user(f'{self.prefix}_player_{n}_{i}', 'PLAYER', team)
+                for i in range(self.players_per_team)
+            ], batch_size=self.batch_size)
+
+        users = CustomUser.objects.filter(username__startswith=f'{self.prefix}_').order_by('id')
+        staff = {}
+        player_ids = []
+        for pk, role, team_id in users.values_list('id', 'role', 'team_id'):
+            if role == 'PLAYER':
+                player_ids.append((pk, team_id))
+            else:
+                staff.setdefault((role, team_id), pk)
+
+        rng = self.rng
+        for start in range(0, len(player_ids), self.batch_size):
+            PlayerProfile.objects.bulk_create([
+                PlayerProfile(
+                    user_id=pk, position=rng.choice(POSITIONS), number=rng.randint(1, 98),
+                    height_feet=rng.choice([5, 6]), height_inches=rng.randint(0, 11),
+                    weight_lbs=rng.randint(150, 230),
+                )
+                for pk, _ in player_ids[start:start + self.batch_size]
+            ])
+        self.log(f'Created {len(staff)} staff and {len(player_ids)} players with profiles')
+        return staff, player_ids
+
+    def _injury_date(self):
+        while True:
+            injury_date = self.as_of - timedelta(days=self.rng.randint(0, self.history_days))
+            if injury_date.month not in OFF_SEASON_MONTHS or self.rng.random() < 0.35:
+                return injury_date
+
+    def _create_injuries(self, staff, player_ids):
+        # With no players (players_per_team=0) there is nobody to injure
+        if not player_ids:
+            return 0
+        rng = self.rng
+        # Some players are far more injury-prone than others
+        player_weights = list(accumulate(rng.paretovariate(2.5) for _ in player_ids))
+        treatments, treatment_weights = _weighted(TREATMENTS)
+
+        created = 0
+        for size in self._batches(self.injuries):
+            players = rng.choices(player_ids, cum_weights=player_weights, k=size)
+            batch = []
+            for player_id, team_id in players:
+                injury_date = self._injury_date()
+                age = (self.as_of - injury_date).days
+                severity_id = rng.choices(self.severity_ids, cum_weights=self.severity_weights)[0]
+                low, high = self.recovery_ranges[severity_id]
+                estimated = rng.randint(low, high)
+                actual = max(1, round(estimated * rng.uniform(0.7, 1.5)))
+
+                if age >= actual:
+                    status = 'CHRONIC' if rng.random() < 0.03 else 'RECOVERED'
+                elif age >= estimated * 0.6:
+                    status = 'RECOVERING'
+                else:
+                    status = 'ACTIVE'
+                recovered = status == 'RECOVERED'
+                surgery = high >= 120 and rng.random() < 0.3
+                return_date = injury_date + timedelta(days=actual)
+
+                batch.append(InjuryRecord(
+                    player_id=player_id,
+                    reported_by_id=staff[('DOCTOR', team_id)],
+                    injury_date=injury_date,
+                    injury_type_id=rng.choices(self.type_ids, cum_weights=self.type_weights)[0],
+                    body_part_id=rng.choices(self.part_ids, cum_weights=self.part_weights)[0],
+                    severity_id=severity_id,
+                    status=status,
+                    description='Generated injury',
+                    treatment='SURGERY' if surgery else rng.choices(treatments, cum_weights=treatment_weights)[0],
+                    estimated_recovery_time=estimated,
+                    actual_recovery_time=actual if recovered else None,
+                    return_to_play_date=return_date if recovered else None,
+                    requires_surgery=surgery,
+                    surgery_date=injury_date + timedelta(days=rng.randint(1, 10)) if surgery else None,
+                    medical_clearance=recovered,
+                    clearance_date=return_date if recovered else None,
+                    follow_up_required=not recovered and rng.random() < 0.5,
+                    follow_up_date=None if recovered else self.as_of + timedelta(days=rng.randint(-14, 14)),
+                ))
+            InjuryRecord.objects.bulk_create(batch)
+            created += size
+            self.log(f'Created {created}/{self.injuries} injuries')
+        return created
+
+    def _create_follow_ups(self, teams, staff):
+        if not self.follow_ups:
+            return 0
+        rng = self.rng
+        injuries = list(
+            InjuryRecord.objects.filter(player__team__in=teams)
+            .order_by('id').values_list('id', 'injury_date', 'status', 'player__team_id')
+            .iterator(chunk_size=self.batch_size)
+        )
+        if not injuries:
+            return 0
+        # Follow-ups cluster on the longer, more recent injuries
+        weights = list(accumulate(
+            (3 if status != 'RECOVERED' else 1) / (1 + (self.as_of - injury_date).days / 365)
+            for _, injury_date, status, _ in injuries
+        ))
+        created = 0
+        for size in self._batches(self.follow_ups):
+            batch = []
+            for injury_id, injury_date, status, team_id in rng.choices(injuries, cum_weights=weights, k=size):
+                age = max(1, (self.as_of - injury_date).days)
+                batch.append(InjuryFollowUp(
+                    injury_id=injury_id,
+                    follow_up_date=injury_date + timedelta(days=rng.randint(1, min(age, 90))),
+                    notes='Generated follow-up',
+                    status_update=status if status != 'RECOVERED' or rng.random() < 0.5 else 'RECOVERING',
+                    created_by_id=staff[('DOCTOR', team_id)],
+                ))
+            InjuryFollowUp.objects.bulk_create(batch)
+            created += size
+        self.log(f'Created {created} follow-ups')
+        return created
+
+    def _create_events(self, teams, staff):
+        rng = self.rng
+        event_types, event_weights = _weighted(EVENT_TYPES)
+        tz = timezone.get_current_timezone()
+        events = []
+        for team in teams:
+            for _ in range(self.events_per_team):
+                event_type = rng.choices(event_types, cum_weights=event_weights)[0]
+                day = self.as_of + timedelta(days=rng.randint(-365, 365))
+                start = datetime.combine(day, time(rng.choice([7, 9, 16, 18, 19])), tzinfo=tz)
+                events.append(Event(
+                    team=team, created_by_id=staff[('COACH', team.pk)], event_type=event_type,
+                    title=f'{event_type.title()} - {team.name}',
+                    location=rng.choice(['Home Arena', 'Training Rink', 'Away']),
+                    start_datetime=start,
+                    end_datetime=start + timedelta(hours=3 if event_type == 'GAME' else 2),
+                ))
+        for start in range(0, len(events), self.batch_size):
+            Event.objects.bulk_create(events[start:start + self.batch_size])
+        self.log(f'Created {len(events)} events')
+        return len(events)
+
+    def _create_reports(self, staff, player_ids):
+        rng = self.rng
+        reports = []
+        for player_id, team_id in rng.choices(player_ids, k=self.reports) if player_ids else []:
+            severity_id = rng.choices(self.severity_ids, cum_weights=self.severity_weights)[0]
+            reports.append(InjuryReport(
+                player_id=player_id, doctor_id=staff[('DOCTOR', team_id)],
+                injury_date=self._injury_date(),
+                diagnosis='Generated report', severity=self.report_severity[severity_id],
+            ))
+        for start in range(0, len(reports), self.batch_size):
+            InjuryReport.objects.bulk_create(reports[start:start + self.batch_size])
+        if reports:
+            self.log(f'Created {len(reports)} injury reports')
+        return len(reports)
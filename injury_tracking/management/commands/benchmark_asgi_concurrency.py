@@ -0,0 +1,171 @@
+import asyncio
+import io
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from api.tokens import issue_token
+
+
+class InFlight:
+    """Counts requests being served and remembers the peak"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self.lock:
+            self.current -= 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve many concurrent slow clients from one worker, once through the WSGI handler '
+        'with a gthread-style pool and once through the ASGI handler on one event loop, and '
+        'compare connections in flight, throughput and latency'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=200, help='Concurrent clients')
+        parser.add_argument('--threads', type=int, default=4, help='Threads of the WSGI worker')
+        parser.add_argument(
+            '--client-ms', type=float, default=200,
+            help='Time each client takes to receive its response (slow network)',
+        )
+        parser.add_argument('--url-name', default='api:events', help='Read-only JSON endpoint to request')
+        parser.add_argument('--username', help='User to request as (default: the first admin)')
+
+    def handle(self, *args, **options):
+        if options['username']:
+            user = CustomUser.objects.filter(username=options['username']).first()
+        else:
+            user = CustomUser.objects.filter(role='ADMIN', is_active=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No such user; run populate_initial_data or generate_load_data first')
+
+        path = reverse(options['url_name'])
+        headers = {'host': settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'}
+        if path.startswith(settings.API_PREFIX):
+            headers['authorization'] = f'Bearer {issue_token(user)}'
+        else:
+            client = Client()
+            client.force_login(user)
+            headers['cookie'] = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        delay = options['client_ms'] / 1000
+        connections = options['connections']
+
+        self.stdout.write(
+            f"{connections} concurrent clients of {path} as {user.username}, "
+            f"each taking {options['client_ms']:.0f} ms to receive the response"
+        )
+        header = (
+            f"{'deployment':<24} {'in flight':>9} {'wall s':>7} {'req/s':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'errors':>6}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        runs = [
+            (f"WSGI, {options['threads']} threads", self._wsgi(path, headers, delay, connections, options['threads'])),
+            ('ASGI, one event loop', self._asgi(path, headers, delay, connections)),
+        ]
+        # Latency counts from the moment every client has connected, queueing included
+        for name, (peak, elapsed, latencies, errors) in runs:
+            latencies.sort()
+            self.stdout.write(
+                f"{name:<24} {peak:>9} {elapsed:>7.2f} {connections / elapsed:>7.1f} "
+                f"{statistics.median(latencies) * 1000:>8.0f} "
+                f"{latencies[int(len(latencies) * 0.95) - 1] * 1000:>8.0f} {errors:>6}"
+            )
+        self.stdout.write(
+            'A WSGI worker serves at most one connection per thread, for as long as the client '
+            'takes to read; the ASGI worker keeps every connection open while it waits on the network.'
+        )
+
+    def _wsgi(self, path, headers, delay, connections, threads):
+        handler = WSGIHandler()
+        in_flight = InFlight()
+
+        def request():
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': headers['host'], 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+                **{f"HTTP_{name.upper()}": value for name, value in headers.items()},
+            }
+            status = []
+            with in_flight:
+                response = handler(environ, lambda line, response_headers, exc_info=None: status.append(line))
+                try:
+                    for _ in response:
+                        # The thread blocks writing to the slow socket
+                        time.sleep(delay)
+                finally:
+                    response.close()
+            return time.perf_counter(), not status[0].startswith('200')
+
+        request()  # warm up
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda _: request(), range(connections)))
+        elapsed = time.perf_counter() - started
+        return in_flight.peak, elapsed, [r[0] - started for r in results], sum(r[1] for r in results)
+
+    def _asgi(self, path, headers, delay, connections):
+        handler = ASGIHandler()
+        in_flight = InFlight()
+
+        async def request():
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+                'root_path': '', 'client': ('127.0.0.1', 0), 'server': (headers['host'], 80),
+                'headers': [(name.encode(), value.encode()) for name, value in headers.items()],
+            }
+            done = asyncio.Event()
+            requested = False
+            status = []
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await done.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+                elif message['type'] == 'http.response.body':
+                    # The event loop serves other connections while this one drains
+                    await asyncio.sleep(delay)
+
+            with in_flight:
+                await handler(scope, receive, send)
+            done.set()
+            return time.perf_counter(), status[0] != 200
+
+        async def run():
+            await request()  # warm up
+            started = time.perf_counter()
+            results = await asyncio.gather(*(request() for _ in range(connections)))
+            return started, time.perf_counter() - started, results
+
+        started, elapsed, results = asyncio.run(run())
+        return in_flight.peak, elapsed, [r[0] - started for r in results], sum(r[1] for r in results)
@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+
+DB_ENGINE = 'django.contrib.sessions.backends.db'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare queries and time per request with database-backed sessions and with the '
+        'configured session engine (SESSION_ENGINE), for a page and for the health check'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page and engine')
+        parser.add_argument('--url-name', default='profile', help='Authenticated page to request')
+
+    def handle(self, *args, **options):
+        engines = [DB_ENGINE]
+        if settings.SESSION_ENGINE != DB_ENGINE:
+            engines.append(settings.SESSION_ENGINE)
+        pages = [(options['url_name'], reverse(options['url_name'])), ('healthz', reverse('healthz'))]
+
+        self.stdout.write(f"{options['requests']} requests per row, logged in as a coach")
+        header = f"{'engine':<38} {'page':<10} {'queries/req':>11} {'session q/req':>13} {'ms/req':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        baseline = {}
+        for engine in engines:
+            for name, url in pages:
+                queries, session_queries, elapsed = self._run(engine, url, options['requests'])
+                per_request = queries / options['requests']
+                baseline.setdefault(name, per_request)
+                self.stdout.write(
+                    f"{engine:<38} {name:<10} {per_request:>11.2f} "
+                    f"{session_queries / options['requests']:>13.2f} "
+                    f"{elapsed * 1000 / options['requests']:>8.2f}"
+                )
+                if engine != DB_ENGINE:
+                    self.stdout.write(f"{'':<38} {'':<10} {baseline[name] - per_request:>11.2f} fewer queries/req")
+
+    def _run(self, engine, url, requests):
+        """Log in and request ``url`` repeatedly, then roll everything back"""
+        result = []
+        try:
+            with override_settings(SESSION_ENGINE=engine), transaction.atomic():
+                user = CustomUser.objects.create_user(
+                    username='benchmark_sessions', password=None, role='COACH', is_registration_complete=True
+                )
+                client = Client()
+                client.force_login(user)
+                client.get(url)  # warm up the cache and the connection
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(requests):
+                        client.get(url)
+                    elapsed = time.perf_counter() - started
+                session_queries = sum('django_session' in query['sql'] for query in queries)
+                result = [len(queries), session_queries, elapsed]
+                client.logout()
+                raise Rollback
+        except Rollback:
+            pass
+        return result
@@ -0,0 +1,163 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lancer_project.db.sqlite3.base import DEFAULT_PRAGMAS, DEFAULT_TRANSACTION_MODE, apply_pragmas
+
+SCHEMA = """
+CREATE TABLE injury (
+    id INTEGER PRIMARY KEY, team_id INTEGER NOT NULL, status TEXT NOT NULL,
+    injury_date TEXT NOT NULL, notes TEXT NOT NULL, updated_at REAL NOT NULL
+);
+CREATE INDEX injury_team ON injury (team_id, status);
+CREATE TABLE follow_up (
+    id INTEGER PRIMARY KEY, injury_id INTEGER NOT NULL, notes TEXT NOT NULL, created_at REAL NOT NULL
+);
+"""
+STATUSES = ['ACTIVE', 'RECOVERING', 'RECOVERED', 'CHRONIC']
+TEAMS = 8
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark concurrent dashboard reads and injury writes on SQLite with Django\'s '
+        'default connection settings and with the tuned pragmas from lancer_project.db.sqlite3'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--rows', type=int, default=100000, help='Injury rows to seed')
+
+    def handle(self, *args, **options):
+        configured = settings.DATABASES['default'].get('OPTIONS', {})
+        profiles = [
+            ('default', {}, None),
+            ('tuned', {**DEFAULT_PRAGMAS, **configured.get('pragmas', {})},
+             configured.get('transaction_mode', DEFAULT_TRANSACTION_MODE)),
+        ]
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, "
+            f"{options['seconds']:.0f}s per run, {options['rows']} rows"
+        )
+        header = (
+            f"{'profile':<8} {'reads/s':>9} {'read p50':>9} {'read p99':>9} {'read max':>9} "
+            f"{'writes/s':>9} {'write p99':>10} {'locked':>7}"
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, pragmas, mode in profiles:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'bench.sqlite3')
+                self._seed(path, options['rows'])
+                result = self._run(path, pragmas, mode, options)
+            reads, writes = result['reads'], result['writes']
+            self.stdout.write(
+                f"{name:<8} {len(reads) / options['seconds']:>9.0f} "
+                f"{_percentile(reads, 50):>7.1f}ms {_percentile(reads, 99):>7.1f}ms "
+                f"{max(reads, default=0):>7.1f}ms {len(writes) / options['seconds']:>9.0f} "
+                f"{_percentile(writes, 99):>8.1f}ms {result['locked']:>7}"
+            )
+        self.stdout.write(
+            'Read latency is per query, write latency per transaction; "locked" counts '
+            'operations that failed with "database is locked".'
+        )
+
+    def _seed(self, path, rows):
+        rng = random.Random(1)
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            'INSERT INTO injury (team_id, status, injury_date, notes, updated_at) VALUES (?, ?, ?, ?, ?)',
+            (
+                (rng.randrange(TEAMS), rng.choice(STATUSES), f'2025-{rng.randint(1, 12):02d}-01',
+                 'x' * 200, time.time())
+                for _ in range(rows)
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+    def _connect(self, path, pragmas):
+        # Autocommit at the driver level, as Django uses it; transactions are explicit
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(conn, pragmas)
+        return conn
+
+    def _run(self, path, pragmas, mode, options):
+        result = {'reads': [], 'writes': [], 'locked': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['seconds']
+        rows = options['rows']
+
+        def reader(seed):
+            rng = random.Random(seed)
+            conn = self._connect(path, pragmas)
+            latencies, locked = [], 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    conn.execute(
+                        'SELECT status, COUNT(*) FROM injury WHERE team_id = ? GROUP BY status',
+                        (rng.randrange(TEAMS),),
+                    ).fetchall()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except sqlite3.OperationalError:
+                    locked += 1
+            conn.close()
+            with lock:
+                result['reads'].extend(latencies)
+                result['locked'] += locked
+
+        def writer(seed):
+            rng = random.Random(seed)
+            conn = self._connect(path, pragmas)
+            begin = f'BEGIN {mode}' if mode else 'BEGIN'
+            latencies, locked = [], 0
+            while time.perf_counter() < deadline:
+                injury_id = rng.randint(1, rows)
+                start = time.perf_counter()
+                try:
+                    conn.execute(begin)
+                    # Read-then-write, like a follow-up that updates the injury status
+                    conn.execute('SELECT status FROM injury WHERE id = ?', (injury_id,)).fetchone()
+                    conn.execute(
+                        'INSERT INTO follow_up (injury_id, notes, created_at) VALUES (?, ?, ?)',
+                        (injury_id, 'Seen in clinic', time.time()),
+                    )
+                    conn.execute(
+                        'UPDATE injury SET status = ?, updated_at = ? WHERE id = ?',
+                        (rng.choice(STATUSES), time.time(), injury_id),
+                    )
+                    conn.execute('COMMIT')
+                    latencies.append((time.perf_counter() - start) * 1000)
+                except sqlite3.OperationalError:
+                    locked += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+            conn.close()
+            with lock:
+                result['writes'].extend(latencies)
+                result['locked'] += locked
+
+        threads = [threading.Thread(target=reader, args=(n,)) for n in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(100 + n,)) for n in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return result
+
+
+def _percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
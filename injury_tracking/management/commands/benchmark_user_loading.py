@@ -0,0 +1,70 @@
+import time
+import tracemalloc
+
+from django.contrib.auth.backends import ModelBackend
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from accounts.backends import SlimUserBackend
+from accounts.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare loading the request user with ModelBackend and with SlimUserBackend: '
+        'queries, bytes of column data, memory allocated and time per request'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Users to load, most recent first')
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        user_ids = list(CustomUser.objects.order_by('-id').values_list('id', flat=True)[:options['users']])
+        if not user_ids:
+            raise CommandError('No users; run populate_initial_data or generate_load_data first')
+
+        self.stdout.write(f"{len(user_ids)} users x {options['rounds']} rounds; each load also reads user.team")
+        header = f"{'backend':<16} {'queries':>8} {'row bytes':>10} {'alloc KiB':>10} {'ms/load':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for name, backend in [('ModelBackend', ModelBackend()), ('SlimUserBackend', SlimUserBackend())]:
+            queries, row_bytes, allocated, elapsed = self._measure(backend, user_ids, options['rounds'])
+            self.stdout.write(
+                f"{name:<16} {queries:>8.2f} {row_bytes:>10.0f} {allocated / 1024:>10.1f} {elapsed * 1000:>8.3f}"
+            )
+        self.stdout.write('All figures are averages per user load.')
+
+    def _measure(self, backend, user_ids, rounds):
+        loads = len(user_ids) * rounds
+        with CaptureQueriesContext(connection) as queries:
+            for user_id in user_ids:
+                backend.get_user(user_id).team
+        row_bytes = sum(_row_bytes(backend.get_user(user_id)) for user_id in user_ids) / len(user_ids)
+
+        tracemalloc.start()
+        allocated = 0
+        for user_id in user_ids:
+            before = tracemalloc.get_traced_memory()[0]
+            user = backend.get_user(user_id)
+            user.team
+            allocated += tracemalloc.get_traced_memory()[0] - before
+            del user
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for user_id in user_ids:
+                backend.get_user(user_id).team
+        elapsed = time.perf_counter() - started
+        return len(queries) / len(user_ids), row_bytes, allocated / len(user_ids), elapsed / loads
+
+
+def _row_bytes(user):
+    """Size of the column values that were fetched for ``user``"""
+    deferred = user.get_deferred_fields()
+    return sum(
+        len(str(getattr(user, field.attname) or ''))
+        for field in user._meta.concrete_fields if field.attname not in deferred
+    )
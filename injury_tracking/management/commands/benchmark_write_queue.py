@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from lancer_project.write_queue import WriteQueue
+
+ALIAS = 'write_queue_benchmark'
+SCHEMA = """
+CREATE TABLE injury (id INTEGER PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL);
+CREATE TABLE follow_up (
+    id INTEGER PRIMARY KEY, injury_id INTEGER NOT NULL, notes TEXT NOT NULL, created_at REAL NOT NULL
+);
+"""
+STATUSES = ['ACTIVE', 'RECOVERING', 'RECOVERED', 'CHRONIC']
+ROWS = 10000
+
+
+def record_follow_up(injury_id, status):
+    """The benchmarked mutation: read the injury, add a follow-up, update the injury"""
+    with connections[ALIAS].cursor() as cursor:
+        cursor.execute('SELECT status FROM injury WHERE id = %s', [injury_id])
+        cursor.fetchone()
+        cursor.execute(
+            'INSERT INTO follow_up (injury_id, notes, created_at) VALUES (%s, %s, %s)',
+            [injury_id, 'Seen in clinic', time.time()],
+        )
+        cursor.execute(
+            'UPDATE injury SET status = %s, updated_at = %s WHERE id = %s',
+            [status, time.time(), injury_id],
+        )
+
+
+def _worker(mode, threads, seconds, lock_path, results):
+    """One "gunicorn worker": ``threads`` request threads posting follow-ups"""
+    write_queue = WriteQueue(ALIAS, lock_path=lock_path) if mode == 'queued' else None
+    deadline = time.perf_counter() + seconds
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def request_thread(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            args = (rng.randint(1, ROWS), rng.choice(STATUSES))
+            start = time.perf_counter()
+            try:
+                if write_queue:
+                    write_queue.submit(record_follow_up, *args).result()
+                else:
+                    with transaction.atomic(using=ALIAS):
+                        record_follow_up(*args)
+                mine.append((time.perf_counter() - start) * 1000)
+            except Exception:
+                failed += 1
+        connections[ALIAS].close()
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    pool = [threading.Thread(target=request_thread, args=(os.getpid() * 100 + n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((latencies, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark sustained SQLite write throughput from several processes with per-request '
+        'transactions versus the single-writer queue (SQLITE_WRITE_QUEUE)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4, help='Simulated gunicorn workers')
+        parser.add_argument('--threads', type=int, default=8, help='Request threads per process')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument(
+            '--synchronous', choices=['OFF', 'NORMAL', 'FULL'], default='FULL',
+            help='SQLite synchronous pragma; FULL fsyncs every commit, as durable medical records need',
+        )
+        parser.add_argument(
+            '--dir', help='Directory for the scratch database; use the production data disk, since '
+                          'fsync on tmpfs costs nothing (default: the system temp directory)',
+        )
+
+    def handle(self, *args, **options):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('This benchmark needs the "fork" start method (Linux or macOS)')
+        default = connections['default'].settings_dict
+        if default['ENGINE'] != 'lancer_project.db.sqlite3':
+            raise CommandError('The default database is not using the lancer_project.db.sqlite3 backend')
+
+        self.stdout.write(
+            f"{options['processes']} processes x {options['threads']} threads, "
+            f"{options['seconds']:.0f}s per run, synchronous={options['synchronous']}"
+        )
+        bench_options = dict(default['OPTIONS'])
+        bench_options['pragmas'] = {**bench_options.get('pragmas', {}), 'synchronous': options['synchronous']}
+        header = f"{'mode':<8} {'writes/s':>9} {'p50':>8} {'p99':>9} {'max':>9} {'errors':>7}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for mode in ('direct', 'queued'):
+            with tempfile.TemporaryDirectory(dir=options['dir']) as tmp:
+                path = os.path.join(tmp, 'bench.sqlite3')
+                conn = sqlite3.connect(path)
+                conn.executescript(SCHEMA)
+                conn.executemany(
+                    'INSERT INTO injury (status, updated_at) VALUES (?, ?)',
+                    (('ACTIVE', time.time()) for _ in range(ROWS)),
+                )
+                conn.commit()
+                conn.close()
+                connections.settings[ALIAS] = {**default, 'NAME': path, 'OPTIONS': bench_options}
+                latencies, errors = self._run(mode, os.path.join(tmp, 'write-lock'), options)
+            self.stdout.write(
+                f"{mode:<8} {len(latencies) / options['seconds']:>9.0f} "
+                f"{_percentile(latencies, 50):>6.1f}ms {_percentile(latencies, 99):>7.1f}ms "
+                f"{max(latencies, default=0):>7.1f}ms {errors:>7}"
+            )
+        self.stdout.write(
+            'direct: each request runs its own transaction; queued: one writer thread per '
+            'process, batches serialised across processes by a lock file.'
+        )
+
+    def _run(self, mode, lock_path, options):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(mode, options['threads'], options['seconds'], lock_path, results))
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        latencies, errors = [], 0
+        for _ in workers:
+            worker_latencies, worker_errors = results.get()
+            latencies.extend(worker_latencies)
+            errors += worker_errors
+        for worker in workers:
+            worker.join()
+        return latencies, errors
+
+
+def _percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[percent - 1]
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from injury_tracking.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete change feed entries older than CHANGE_LOG_RETENTION_DAYS; clients with an '
+        'older cursor get 410 from /api/changes/ and resync'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHANGE_LOG_RETENTION_DAYS,
+            help='Keep entries from the last DAYS days',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # The newest entry always stays, so the feed can tell a pruned cursor
+        # from a quiet one
+        newest = ChangeLog.objects.order_by('-id').values_list('id', flat=True).first()
+        if newest is None:
+            self.stdout.write('The change log is empty')
+            return
+        deleted, _ = ChangeLog.objects.filter(created_at__lt=cutoff, id__lt=newest).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} change log entries older than {options["days"]} days'))
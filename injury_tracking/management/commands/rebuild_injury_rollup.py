@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import Team
+from injury_tracking.caching import GLOBAL, invalidate, team_scope
+from injury_tracking.rollup import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount the injury rollup (team, month, type, body part, severity, status) from every '
+        'injury record; run after bulk imports or SQL that bypassed the signal handlers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted per query')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = rebuild(batch_size=options['batch_size'])
+        # Cached analytics were computed from the old rollup
+        invalidate(GLOBAL, *(team_scope(pk) for pk in Team.objects.values_list('pk', flat=True)))
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the injury rollup: {rows} rows in {time.perf_counter() - started:.2f}s'
+        ))
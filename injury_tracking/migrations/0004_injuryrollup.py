@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollup(apps, schema_editor):
+    InjuryRecord = apps.get_model('injury_tracking', 'InjuryRecord')
+    InjuryRollup = apps.get_model('injury_tracking', 'InjuryRollup')
+    rows = (
+        InjuryRecord.objects.annotate(month=TruncMonth('injury_date'))
+        .values_list('player__team_id', 'month', 'injury_type_id', 'body_part_id', 'severity_id', 'status')
+        .annotate(
+            injuries=Count('id'),
+            recovery_days=Sum('actual_recovery_time', default=0),
+            recovery_days_count=Count('actual_recovery_time'),
+        )
+        .order_by()
+    )
+    InjuryRollup.objects.bulk_create([
+        InjuryRollup(
+            team_id=team_id, month=month, injury_type_id=injury_type_id, body_part_id=body_part_id,
+            severity_id=severity_id, status=status, injuries=injuries, recovery_days=recovery_days,
+            recovery_days_count=recovery_days_count,
+        )
+        for (team_id, month, injury_type_id, body_part_id, severity_id, status,
+             injuries, recovery_days, recovery_days_count) in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_usermedicalinfo'),
+        ('injury_tracking', '0003_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InjuryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('status', models.CharField(choices=[('ACTIVE', 'Active'), ('RECOVERING', 'Recovering'), ('RECOVERED', 'Recovered'), ('CHRONIC', 'Chronic')], max_length=20)),
+                ('injuries', models.PositiveIntegerField()),
+                ('recovery_days', models.PositiveIntegerField(default=0)),
+                ('recovery_days_count', models.PositiveIntegerField(default=0)),
+                ('body_part', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='injury_tracking.bodypart')),
+                ('injury_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='injury_tracking.injurytype')),
+                ('severity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='injury_tracking.injuryseverity')),
+                ('team', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='accounts.team')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['team', 'month'], name='rollup_team_month_idx'), models.Index(fields=['month', 'injury_type', 'body_part', 'severity', 'status'], name='rollup_cell_idx')],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -181,3 +181,72 @@ class InjuryAnalytics(models.Model):
     
     def __str__(self):
         return f"{self.team.name} - {self.season_year} Analytics"
+
+class InjuryRollup(models.Model):
+    """Injury counts per team, month, injury type, body part, severity and status.
+
+    Kept in step with InjuryRecord by injury_tracking.rollup; analytics and
+    team comparisons sum these rows instead of scanning every injury.
+    ``recovery_days`` totals ``actual_recovery_time`` over the
+    ``recovery_days_count`` injuries that have one.
+    """
+    # No constraint, like ChangeLog: rows of a deleted team are recounted, not cascaded
+    team = models.ForeignKey(
+        'accounts.Team', on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+'
+    )
+    # First day of the month of the injury date
+    month = models.DateField()
+    injury_type = models.ForeignKey(InjuryType, on_delete=models.CASCADE, related_name='+')
+    body_part = models.ForeignKey(BodyPart, on_delete=models.CASCADE, related_name='+')
+    severity = models.ForeignKey(InjurySeverity, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=InjuryRecord.STATUS_CHOICES)
+    injuries = models.PositiveIntegerField()
+    recovery_days = models.PositiveIntegerField(default=0)
+    recovery_days_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['team', 'month'], name='rollup_team_month_idx'),
+            models.Index(
+                fields=['month', 'injury_type', 'body_part', 'severity', 'status'], name='rollup_cell_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} team {self.team_id}: {self.injuries} {self.get_status_display().lower()}"
+
+class ChangeLog(models.Model):
+    """One row per saved or deleted injury, follow-up or event.
+
+    The id is the sequence number of the /api/changes/ feed; the team is the
+    one the object belonged to when it changed, for role scoping.
+    """
+    INJURY = 'injury'
+    FOLLOW_UP = 'follow_up'
+    EVENT = 'event'
+    KIND_CHOICES = [
+        (INJURY, 'Injury'),
+        (FOLLOW_UP, 'Follow-up'),
+        (EVENT, 'Event'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # No constraint: entries outlive the teams they mention
+    team = models.ForeignKey(
+        'accounts.Team', on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+'
+    )
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['team', 'id'], name='changelog_team_seq_idx'),
+            models.Index(fields=['created_at'], name='changelog_created_idx'),
+        ]
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'saved'
+        return f"#{self.pk} {self.get_kind_display()} {self.object_id} {action}"
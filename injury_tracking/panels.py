@@ -0,0 +1,86 @@
+"""Run a dashboard's independent panels concurrently.
+
+A panel is a zero-argument callable returning the data for one part of a
+page: a count, a distribution, a list of recent injuries. ``run_panels``
+hands them to a bounded, process-wide thread pool (``DASHBOARD_PANEL_WORKERS``
+threads), so each runs on its own database connection and the page waits
+about as long as its slowest panel rather than the sum of them. Dashboard
+views are synchronous; under ASGI they already run in a thread, and the same
+pool serves both deployments.
+
+Panels must be read-only and return evaluated data (lists, not querysets).
+They run inline, one after another, when:
+
+- ``DASHBOARD_PANEL_WORKERS`` is 1 or there is a single panel;
+- a transaction is open, since other connections would not see its
+  uncommitted rows (this covers ``TestCase``);
+- they are started from inside another panel, which would otherwise wait on
+  the pool it occupies.
+
+The request's replica decision and its query instrumentation follow each
+panel into its thread. Pool threads keep their connections between panels
+and close them by the ``CONN_MAX_AGE`` rules, like request threads.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from lancer_project.routers import replica_reads, replica_reads_allowed
+
+_executor = None
+_executor_lock = threading.Lock()
+_state = threading.local()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.DASHBOARD_PANEL_WORKERS, thread_name_prefix='dashboard-panel',
+            )
+        return _executor
+
+
+def run_inline():
+    return (
+        getattr(_state, 'in_panel', False)
+        or any(connections[alias].in_atomic_block for alias in connections)
+    )
+
+
+def run_panels(panels):
+    """Run the callables in the ``panels`` dict; a dict of their results by name.
+
+    Returns once every panel has finished; an exception raised by one is
+    re-raised here.
+    """
+    if settings.DASHBOARD_PANEL_WORKERS <= 1 or len(panels) < 2 or run_inline():
+        return {name: panel() for name, panel in panels.items()}
+
+    wrappers = {alias: list(connections[alias].execute_wrappers) for alias in connections}
+    replica = replica_reads_allowed()
+    futures = {
+        name: executor().submit(_run_panel, panel, wrappers, replica)
+        for name, panel in panels.items()
+    }
+    wait(futures.values())
+    return {name: future.result() for name, future in futures.items()}
+
+
+def _run_panel(panel, wrappers, replica):
+    _state.in_panel = True
+    close_old_connections()
+    try:
+        with ExitStack() as stack:
+            for alias, alias_wrappers in wrappers.items():
+                for wrapper in alias_wrappers:
+                    stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            stack.enter_context(replica_reads(replica))
+            return panel()
+    finally:
+        close_old_connections()
+        _state.in_panel = False
@@ -0,0 +1,201 @@
+"""Recovery-time statistics: percentiles, means and confidence intervals.
+
+The recovery outcomes of every recovered injury (its ``actual_recovery_time``
+with its date, team, injury type, body part, severity and the player's
+position) are read with one query into NumPy column arrays, once per
+``injuries`` data version and process. Statistics for a grouping, such as
+by severity or by injury type and body part, come from one vectorised pass
+over those columns: the outcomes are sorted by group and duration, so each
+group is a contiguous run whose size, sum and sum of squares ``bincount``
+gives and whose percentiles are read by index, with no Python loop over
+injuries or groups.
+
+A group's statistics are a dict::
+
+    {"n": 37, "mean": 18.4, "ci_low": 15.9, "ci_high": 20.9,
+     "p25": 11.0, "p50": 16.0, "p75": 24.0, "p90": 33.4}
+
+``ci_low``/``ci_high`` bound the mean at 95% by the normal approximation,
+and percentiles interpolate linearly, like ``numpy.percentile``.
+
+``suggested_recovery`` estimates the recovery time of a new injury as the
+median of the most specific group of similar injuries with at least
+``MIN_SAMPLES`` outcomes. Its tables are computed once per data version
+(cached in the shared cache) and then kept in the process, so a suggestion
+costs the version lookup and a few dict lookups. Positions are edited on
+player profiles, which bump team versions only; a position change reaches
+these statistics with the next injury change or after ``AGGREGATE_TIMEOUT``.
+"""
+import threading
+
+import numpy as np
+
+from .caching import GLOBAL, cached, version_tag
+from .models import InjuryRecord
+
+# Grouping columns: outcome field
+COLUMNS = {
+    'team': 'player__team_id',
+    'injury_type': 'injury_type_id',
+    'body_part': 'body_part_id',
+    'severity': 'severity_id',
+    'position': 'player__playerprofile__position',
+}
+# What the statistics are broken down by, one grouping each
+DIMENSIONS = ['injury_type', 'body_part', 'severity', 'position']
+PERCENTILES = [25, 50, 75, 90]
+# The statistics of each group, in order
+STATISTICS = ['n', 'mean', 'ci_low', 'ci_high', *(f'p{percentile}' for percentile in PERCENTILES)]
+# Two-sided 95% quantile of the normal distribution
+CONFIDENCE_Z = 1.96
+# Fewest outcomes a group needs before its median is suggested
+MIN_SAMPLES = 5
+# Groupings a suggestion is taken from, most specific first
+SUGGESTION_LEVELS = [
+    ('injury_type', 'body_part', 'severity'),
+    ('injury_type', 'severity'),
+    ('injury_type',),
+    ('severity',),
+    (),
+]
+
+_lock = threading.Lock()
+# Process-local, keyed by the data version they were read at
+_columns = {}
+_suggestions = {}
+
+
+def outcome_columns():
+    """Recovery outcomes as NumPy columns, read once per data version"""
+    tag = version_tag(GLOBAL)
+    # One thread loads; the others in this process wait for its columns
+    with _lock:
+        columns = _columns.get(tag)
+        if columns is None:
+            columns = load_columns(InjuryRecord.objects.all())
+            _columns.clear()
+            _columns[tag] = columns
+    return columns
+
+
+def load_columns(injuries):
+    rows = list(
+        injuries.filter(status='RECOVERED', actual_recovery_time__isnull=False)
+        .values_list('actual_recovery_time', 'injury_date', *COLUMNS.values())
+        .order_by()
+    )
+    days, dates, teams, injury_types, body_parts, severities, positions = (
+        zip(*rows) if rows else ([],) * (len(COLUMNS) + 2)
+    )
+    return {
+        'days': np.array(days, dtype=np.float64),
+        'injury_date': np.array(dates, dtype='datetime64[D]'),
+        # No team is 0, which no pk is; no position is ''
+        'team': np.array([team or 0 for team in teams], dtype=np.int64),
+        'injury_type': np.array(injury_types, dtype=np.int64),
+        'body_part': np.array(body_parts, dtype=np.int64),
+        'severity': np.array(severities, dtype=np.int64),
+        'position': np.array([position or '' for position in positions], dtype=str),
+    }
+
+
+def select(columns, team=None, start=None, end=None):
+    """The outcomes of one team and/or range of injury dates"""
+    mask = np.ones(len(columns['days']), dtype=bool)
+    if team:
+        mask &= columns['team'] == team
+    if start:
+        mask &= columns['injury_date'] >= np.datetime64(start, 'D')
+    if end:
+        mask &= columns['injury_date'] <= np.datetime64(end, 'D')
+    return {name: column[mask] for name, column in columns.items()}
+
+
+def group_keys(columns, dimensions):
+    """The group of each outcome, as an index into the list of group keys"""
+    count = len(columns['days'])
+    if not count:
+        return np.zeros(0, dtype=np.int64), []
+    if not dimensions:
+        return np.zeros(count, dtype=np.int64), [()]
+    values, codes = zip(*(np.unique(columns[name], return_inverse=True) for name in dimensions))
+    shape = [len(unique) for unique in values]
+    groups, inverse = np.unique(np.ravel_multi_index(codes, shape), return_inverse=True)
+    key_columns = [unique[index].tolist() for unique, index in zip(values, np.unravel_index(groups, shape))]
+    return inverse.reshape(-1), list(zip(*key_columns))
+
+
+def group_stats(groups, days, size):
+    """Size, mean, confidence interval and percentiles of each of ``size`` groups"""
+    # Each group becomes a contiguous run of its outcomes, shortest first
+    order = np.lexsort((days, groups))
+    groups, days = groups[order], days[order]
+    n = np.bincount(groups, minlength=size)
+    starts = np.cumsum(n) - n
+    mean = np.bincount(groups, weights=days, minlength=size) / n
+    squares = np.bincount(groups, weights=days * days, minlength=size)
+    # Sample variance; a group of one has no spread to estimate
+    variance = np.where(n > 1, (squares - n * mean * mean) / np.maximum(n - 1, 1), 0.0)
+    half_width = CONFIDENCE_Z * np.sqrt(np.maximum(variance, 0.0) / n)
+    stats = {'n': n, 'mean': mean, 'ci_low': mean - half_width, 'ci_high': mean + half_width}
+    for percentile in PERCENTILES:
+        position = starts + (n - 1) * (percentile / 100)
+        below = np.floor(position).astype(np.int64)
+        above = np.ceil(position).astype(np.int64)
+        stats[f'p{percentile}'] = days[below] + (days[above] - days[below]) * (position - below)
+    return stats
+
+
+def grouped_stats(columns, dimensions):
+    """``{key: statistics}`` of the outcomes grouped by ``dimensions``"""
+    groups, keys = group_keys(columns, dimensions)
+    if not keys:
+        return {}
+    stats = group_stats(groups, columns['days'], len(keys))
+    values = {
+        name: column.tolist() if name == 'n' else np.round(column, 1).tolist()
+        for name, column in stats.items()
+    }
+    return {key: {name: column[index] for name, column in values.items()} for index, key in enumerate(keys)}
+
+
+def recovery_breakdown(team=None, start=None, end=None):
+    """Statistics overall and by each of ``DIMENSIONS``, for the analytics data"""
+    columns = select(outcome_columns(), team, start, end)
+    return {
+        'overall': grouped_stats(columns, ()).get(()),
+        **{dimension: grouped_stats(columns, (dimension,)) for dimension in DIMENSIONS},
+    }
+
+
+def compute_suggestion_tables():
+    columns = outcome_columns()
+    return {dimensions: grouped_stats(columns, dimensions) for dimensions in SUGGESTION_LEVELS}
+
+
+def suggestion_tables():
+    tag = version_tag(GLOBAL)
+    tables = _suggestions.get(tag)
+    if tables is None:
+        tables = cached('recovery_suggestions', [GLOBAL], compute_suggestion_tables)
+        _suggestions.clear()
+        _suggestions[tag] = tables
+    return tables
+
+
+def suggested_recovery(injury_type=None, body_part=None, severity=None):
+    """Typical recovery of injuries like this one, or None without enough data.
+
+    The statistics of the most specific group with ``MIN_SAMPLES`` outcomes,
+    plus ``days``, its median rounded to whole days, and ``basis``, the
+    dimensions that group shares with the injury.
+    """
+    given = {'injury_type': injury_type, 'body_part': body_part, 'severity': severity}
+    tables = suggestion_tables()
+    for dimensions in SUGGESTION_LEVELS:
+        if any(given[name] is None for name in dimensions):
+            continue
+        stats = tables[dimensions].get(tuple(given[name] for name in dimensions))
+        if stats and stats['n'] >= MIN_SAMPLES:
+            return {**stats, 'days': round(stats['p50']), 'basis': list(dimensions)}
+    return None
@@ -0,0 +1,189 @@
+"""Maintain ``InjuryRollup``, injury counts by team, month and category.
+
+A cell is one (month, injury type, body part, severity, status) combination,
+across every team. Writes never adjust counts in place: the cells an injury
+leaves and enters are deleted and recounted from InjuryRecord, grouped by
+team, so the rollup cannot drift from the rows it summarises and a player
+moving team is handled like any other change. Refreshing a cell reads only
+that month's injuries of one type, body part, severity and status.
+
+The signal handlers below refresh cells as injuries, players and teams
+change. Bulk operations (``bulk_create``, ``bulk_update``, ``QuerySet.update``)
+send no signals; code using them calls ``refresh_cells`` with the cells of
+the rows before and after, or ``rebuild``. ``manage.py rebuild_injury_rollup``
+rebuilds the whole table.
+
+Two transactions refreshing the same cell must not overlap: under READ
+COMMITTED the second one's delete would miss the rows the first inserted
+while its recount includes the first one's injury, and the cell would be
+counted twice. On Postgres each refresh takes a transaction-level advisory
+lock per cell first; SQLite already runs one write transaction at a time.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser, Team
+from .models import InjuryRecord, InjuryRollup
+
+CELL_FIELDS = ['month', 'injury_type_id', 'body_part_id', 'severity_id', 'status']
+# Cells recounted per query
+REFRESH_BATCH = 100
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def injury_cell(injury):
+    # The date may still be the string it was assigned as
+    injury_date = InjuryRecord._meta.get_field('injury_date').to_python(injury.injury_date)
+    return (
+        month_start(injury_date), injury.injury_type_id, injury.body_part_id,
+        injury.severity_id, injury.status,
+    )
+
+
+def injury_cells(injuries):
+    """Cells of the injuries in a queryset"""
+    return {
+        (month_start(injury_date), *rest)
+        for injury_date, *rest in injuries.values_list(
+            'injury_date', 'injury_type_id', 'body_part_id', 'severity_id', 'status'
+        ).distinct()
+    }
+
+
+def rollup_rows(injuries):
+    """Unsaved InjuryRollup rows summarising a queryset of injuries"""
+    rows = (
+        injuries.annotate(month=TruncMonth('injury_date'))
+        .values_list('player__team_id', 'month', 'injury_type_id', 'body_part_id', 'severity_id', 'status')
+        .annotate(
+            injuries=Count('id'),
+            recovery_days=Sum('actual_recovery_time', default=0),
+            recovery_days_count=Count('actual_recovery_time'),
+        )
+        .order_by()
+    )
+    return [
+        InjuryRollup(
+            team_id=team_id, month=month, injury_type_id=injury_type_id, body_part_id=body_part_id,
+            severity_id=severity_id, status=status, injuries=injuries, recovery_days=recovery_days,
+            recovery_days_count=recovery_days_count,
+        )
+        for (team_id, month, injury_type_id, body_part_id, severity_id, status,
+             injuries, recovery_days, recovery_days_count) in rows
+    ]
+
+
+def cell_lock_key(cell):
+    """A signed 64-bit advisory lock key for a cell"""
+    month, *rest = cell
+    text = ':'.join(['injury_rollup', month.isoformat(), *map(str, rest)])
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def lock_cells(cells, using):
+    """Wait for other transactions refreshing any of the cells to finish"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        # Always in the same order, so two refreshes cannot deadlock
+        for key in sorted({cell_lock_key(cell) for cell in cells}):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+
+
+def refresh_cells(cells):
+    """Recount the given cells from InjuryRecord"""
+    cells = list(set(cells))
+    if not cells:
+        return
+    using = router.db_for_write(InjuryRollup)
+    # Part of the write that changed them; no savepoint of its own
+    with transaction.atomic(using=using, savepoint=False):
+        lock_cells(cells, using)
+        for start in range(0, len(cells), REFRESH_BATCH):
+            batch = cells[start:start + REFRESH_BATCH]
+            rollup_filter = Q()
+            injury_filter = Q()
+            for month, injury_type_id, body_part_id, severity_id, status in batch:
+                rollup_filter |= Q(
+                    month=month, injury_type_id=injury_type_id, body_part_id=body_part_id,
+                    severity_id=severity_id, status=status,
+                )
+                injury_filter |= Q(
+                    injury_date__gte=month, injury_date__lt=(month + timedelta(days=32)).replace(day=1),
+                    injury_type_id=injury_type_id, body_part_id=body_part_id,
+                    severity_id=severity_id, status=status,
+                )
+            InjuryRollup.objects.filter(rollup_filter).delete()
+            InjuryRollup.objects.bulk_create(rollup_rows(InjuryRecord.objects.filter(injury_filter)))
+
+
+def rebuild(batch_size=1000):
+    """Replace the whole rollup with a recount of every injury; the number of rows"""
+    with transaction.atomic():
+        InjuryRollup.objects.all().delete()
+        rows = InjuryRollup.objects.bulk_create(rollup_rows(InjuryRecord.objects.all()), batch_size=batch_size)
+    return len(rows)
+
+
+# Maintenance
+
+@receiver(pre_save, sender=InjuryRecord)
+def remember_injury_cell(sender, instance, raw=False, **kwargs):
+    # The cell the injury is leaving, read before the row changes
+    if instance.pk and not raw:
+        previous = InjuryRecord.objects.filter(pk=instance.pk).values_list(
+            'injury_date', 'injury_type_id', 'body_part_id', 'severity_id', 'status'
+        ).first()
+        if previous:
+            instance._rollup_previous_cell = (month_start(previous[0]), *previous[1:])
+
+
+@receiver(post_save, sender=InjuryRecord)
+def injury_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cells = {injury_cell(instance)}
+    previous = getattr(instance, '_rollup_previous_cell', None)
+    if previous:
+        cells.add(previous)
+    refresh_cells(cells)
+
+
+@receiver(post_delete, sender=InjuryRecord)
+def injury_deleted(sender, instance, **kwargs):
+    refresh_cells([injury_cell(instance)])
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_user_team(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Logins save last_login only
+    if instance.pk and not raw and (update_fields is None or 'team' in update_fields):
+        instance._rollup_previous_team_id = (
+            CustomUser.objects.filter(pk=instance.pk).values_list('team_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, raw=False, **kwargs):
+    # Injuries count for their player's current team, whatever the user's
+    # role is now
+    previous = vars(instance).pop('_rollup_previous_team_id', instance.team_id)
+    if raw or previous == instance.team_id:
+        return
+    refresh_cells(injury_cells(InjuryRecord.objects.filter(player=instance)))
+
+
+@receiver(post_delete, sender=Team)
+def team_deleted(sender, instance, **kwargs):
+    # Its players are left without a team, by a bulk update that sends no signals
+    refresh_cells(InjuryRollup.objects.filter(team_id=instance.pk).values_list(*CELL_FIELDS).distinct())
@@ -0,0 +1,171 @@
+"""Declarative seed data applied by ``populate_initial_data``.
+
+Each ``SeedTable`` lists the rows of one model keyed by a natural key. Applying
+it costs one read of the existing keys and one ``bulk_create`` for the missing
+rows, however many rows are declared. Existing rows are left alone, so edits
+made in the admin (a severity's colour, an email mapping's role, a changed
+password) survive every deploy. Applied with ``sync=True``
+(``populate_initial_data --sync``), rows whose ``sync`` fields differ from
+the declared values are reset to them with one ``bulk_update``. Values may
+be callables, evaluated only when the row is created, or ``Ref`` objects
+pointing at another seeded row.
+"""
+from django.contrib.auth.hashers import make_password
+
+from accounts.models import CustomUser, EmailRoleMapping, Team
+from .models import BodyPart, InjurySeverity, InjuryType
+
+
+class Ref:
+    """A foreign key given by the natural key of the target row"""
+
+    def __init__(self, model, key, value):
+        self.model = model
+        self.key = key
+        self.value = value
+
+
+class SeedPlan:
+    """What applying a ``SeedTable`` creates and updates"""
+
+    def __init__(self, table):
+        self.table = table
+        self.create = []
+        self.update = []
+        self.update_fields = set()
+        self.unchanged = 0
+        self.changes = []
+
+    def summary(self):
+        return (
+            f'{self.table.model.__name__}: {len(self.create)} created, {len(self.update)} updated, '
+            f'{self.unchanged} unchanged'
+        )
+
+
+class SeedTable:
+    """The declared rows of one model, identified by ``key``"""
+
+    def __init__(self, model, key, rows, sync=()):
+        self.model = model
+        self.key = key
+        self.rows = rows
+        self.sync = tuple(sync)
+
+    def plan(self, sync=False):
+        """Diff the declared rows against the database with a single query"""
+        plan = SeedPlan(self)
+        keys = [row[self.key] for row in self.rows]
+        existing = {}
+        for obj in self.model.objects.filter(**{f'{self.key}__in': keys}).order_by('pk'):
+            existing.setdefault(getattr(obj, self.key), obj)
+
+        for row in self.rows:
+            obj = existing.get(row[self.key])
+            if obj is None:
+                plan.create.append(row)
+                plan.changes.append(f'+ {self.model.__name__} {row[self.key]!r}')
+                continue
+            drift = {field: row[field] for field in self.sync if sync and getattr(obj, field) != row[field]}
+            if not drift:
+                plan.unchanged += 1
+                continue
+            for field, value in drift.items():
+                plan.changes.append(
+                    f'~ {self.model.__name__} {row[self.key]!r}: {field} {getattr(obj, field)!r} -> {value!r}'
+                )
+                setattr(obj, field, value)
+            plan.update.append(obj)
+            plan.update_fields.update(drift)
+        return plan
+
+    def apply(self, dry_run=False, sync=False):
+        plan = self.plan(sync)
+        if dry_run:
+            return plan
+        if plan.create:
+            self.model.objects.bulk_create(
+                [self.model(**values) for values in _build(plan.create)], ignore_conflicts=True
+            )
+        if plan.update:
+            self.model.objects.bulk_update(plan.update, sorted(plan.update_fields))
+        return plan
+
+
+def _build(rows):
+    """Evaluate callables and resolve ``Ref`` values, one query per referenced model"""
+    wanted = {}
+    for row in rows:
+        for value in row.values():
+            if isinstance(value, Ref):
+                wanted.setdefault((value.model, value.key), set()).add(value.value)
+    resolved = {}
+    for (model, key), values in wanted.items():
+        for obj in model.objects.filter(**{f'{key}__in': values}).order_by('pk'):
+            resolved.setdefault((model, key, getattr(obj, key)), obj)
+
+    built = []
+    for row in rows:
+        values = {}
+        for field, value in row.items():
+            if isinstance(value, Ref):
+                value = resolved.get((value.model, value.key, value.value))
+            elif callable(value):
+                value = value()
+            values[field] = value
+        built.append(values)
+    return built
+
+
+def _password(raw):
+    # Hashing is slow, so only do it for users that are actually created
+    return lambda: make_password(raw)
+
+
+MENS_HOCKEY = "Men's Ice Hockey"
+WOMENS_HOCKEY = "Women's Ice Hockey"
+
+SEED = [
+    SeedTable(Team, 'name', [
+        {'name': MENS_HOCKEY, 'gender': 'M'},
+        {'name': WOMENS_HOCKEY, 'gender': 'W'},
+    ], sync=['gender']),
+    SeedTable(InjuryType, 'name', [{'name': name} for name in [
+        'Concussion', 'Sprain', 'Strain', 'Fracture', 'Dislocation', 'Contusion',
+        'Laceration', 'Tendonitis', 'Bursitis', 'Muscle Tear', 'Ligament Tear', 'Cartilage Damage',
+    ]]),
+    SeedTable(BodyPart, 'name', [{'name': name} for name in [
+        'Head', 'Neck', 'Shoulder', 'Upper Arm', 'Elbow', 'Forearm', 'Wrist', 'Hand', 'Fingers',
+        'Chest', 'Back', 'Lower Back', 'Hip', 'Thigh', 'Knee', 'Lower Leg', 'Ankle', 'Foot', 'Toes',
+    ]]),
+    SeedTable(InjurySeverity, 'name', [
+        {'name': 'Mild', 'color_code': '#10b981', 'description': 'Minor injury, quick recovery expected'},
+        {'name': 'Moderate', 'color_code': '#f59e0b', 'description': 'Moderate injury, requires treatment'},
+        {'name': 'Severe', 'color_code': '#ef4444', 'description': 'Serious injury, extended recovery time'},
+        {'name': 'Critical', 'color_code': '#991b1b',
+         'description': 'Critical injury, immediate medical attention required'},
+    ], sync=['color_code', 'description']),
+    SeedTable(EmailRoleMapping, 'email_pattern', [
+        {'email_pattern': '@lancer.com', 'role': 'PLAYER', 'is_active': True},
+        {'email_pattern': '@lancer.coach.com', 'role': 'COACH', 'is_active': True},
+        {'email_pattern': '@lancer.medical.com', 'role': 'DOCTOR', 'is_active': True},
+        {'email_pattern': '@lancer.admin.com', 'role': 'ADMIN', 'is_active': True},
+    ], sync=['role']),
+    SeedTable(CustomUser, 'username', [
+        {'username': 'admin', 'email': 'admin@lancer.admin.com', 'password': _password('admin123'),
+         'first_name': 'System', 'last_name': 'Administrator', 'role': 'ADMIN',
+         'is_staff': True, 'is_superuser': True, 'is_registration_complete': True},
+        {'username': 'coach1', 'email': 'coach1@lancer.coach.com', 'password': _password('coach123'),
+         'first_name': 'John', 'last_name': 'Smith', 'role': 'COACH',
+         'team': Ref(Team, 'name', MENS_HOCKEY), 'is_registration_complete': True},
+        {'username': 'doctor1', 'email': 'doctor1@lancer.medical.com', 'password': _password('doctor123'),
+         'first_name': 'Dr. Sarah', 'last_name': 'Johnson', 'role': 'DOCTOR',
+         'is_registration_complete': True},
+        {'username': 'player1', 'email': 'player1@lancer.com', 'password': _password('player123'),
+         'first_name': 'Mike', 'last_name': 'Wilson', 'role': 'PLAYER',
+         'team': Ref(Team, 'name', MENS_HOCKEY), 'is_registration_complete': True},
+        {'username': 'player2', 'email': 'player2@lancer.com', 'password': _password('player123'),
+         'first_name': 'Emma', 'last_name': 'Davis', 'role': 'PLAYER',
+         'team': Ref(Team, 'name', WOMENS_HOCKEY), 'is_registration_complete': True},
+    ]),
+]
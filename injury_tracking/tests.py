@@ -1,3 +1,1379 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from accounts.models import CustomUser, Team, TeamPermissionRequest, UserMedicalInfo
+from api.tokens import issue_token
+from lancer_project.cache import SQLiteCache
+from lancer_project.db.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from lancer_project.middleware import wrap_connections
+from lancer_project.nplusone import RepeatedQueryDetector, fingerprint, is_allowed
+from lancer_project.routers import PIN_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from lancer_project.sessions import SessionStore, flush_pending
+from lancer_project.write_queue import WriteQueue, WriteTimeout, run_write
+from .analytics import compute_chart_data, uses_rollup
+from .caching import GLOBAL, cached, single_flight
+from .forms import InjuryReportForm
+from .load_data import LoadDataGenerator
+from .models import ChangeLog, Event, InjuryFollowUp, InjuryRecord, InjuryRollup, InjurySeverity, InjuryType
+from .panels import run_panels
+from .recovery import load_columns, suggested_recovery
+from .rollup import rollup_rows
+from .views import _record_follow_up_round
+
+# Seed volumes. "ci" keeps the default test run quick; "full" is the realistic
+# release-check volume (LANCER_PERF_VOLUME=full python manage.py test).
+PERF_VOLUMES = {
+    'ci': {
+        'teams': 4, 'players_per_team': 100, 'injuries': 20000,
+        'follow_ups': 5000, 'events_per_team': 500, 'reports': 500,
+    },
+    'full': {
+        'teams': 6, 'players_per_team': 700, 'injuries': 300000,
+        'follow_ups': 60000, 'events_per_team': 5000, 'reports': 5000,
+    },
+}
+PERF_VOLUME = os.environ.get('LANCER_PERF_VOLUME', 'ci')
+# Scales every wall-clock threshold, e.g. 3 on a slow CI box
+PERF_TIME_FACTOR = float(os.environ.get('LANCER_PERF_TIME_FACTOR', '1'))
+PERF_REPORT = Path(os.environ.get('LANCER_PERF_REPORT', settings.BASE_DIR / 'perf_report.json'))
+
+# Default wall-clock threshold per request, in milliseconds, by volume
+DEFAULT_MAX_MS = {'ci': 1500, 'full': 3000}[PERF_VOLUME]
+
+
+def seed_perf_data(volume):
+    """Generate the perf dataset and the pending team requests the admin reviews"""
+    LoadDataGenerator(prefix='perf', **volume).run()
+    teams = list(Team.objects.filter(name__startswith='Perf Team').order_by('id'))
+    doctors = CustomUser.objects.filter(role='DOCTOR', username__startswith='perf_').order_by('id')
+    TeamPermissionRequest.objects.bulk_create([
+        TeamPermissionRequest(user=doctor, team=teams[n % len(teams)], role_scope='DOCTOR')
+        for n, doctor in enumerate(doctors)
+    ])
+    return teams
+
+
+class QueryInstrumentationTests(TestCase):
+    """Every request's query count and SQL time are logged and sent as Server-Timing"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            username='instrumented', password='x', role='COACH', is_registration_complete=True
+        )
+        self.client.force_login(self.user)
+
+    def test_record_and_server_timing(self):
+        # The test runner keeps the per-request lines out of the test output
+        self.assertFalse(logging.getLogger('lancer.performance').isEnabledFor(logging.INFO))
+        with self.assertLogs('lancer.performance', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        [record] = logs.records
+        self.assertEqual((record.view, record.method, record.status), ('profile', 'GET', 200))
+        self.assertEqual(record.queries, len(queries))
+        self.assertIn(f'desc="{len(queries)} queries"', response['Server-Timing'])
+        self.assertIn('app;dur=', response['Server-Timing'])
+
+    def test_budget_exceeded(self):
+        with override_settings(QUERY_BUDGETS={'profile': 0}), \
+                self.assertLogs('lancer.performance', 'WARNING') as logs:
+            self.client.get(reverse('profile'))
+        [warning] = logs.records
+        self.assertIn('Query budget exceeded for profile', warning.getMessage())
+        self.assertEqual(warning.budget_queries, 0)
+
+    @override_settings(QUERY_INSTRUMENTATION=False)
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('profile')))
+
+
+class NPlusOneDetectorTests(TestCase):
+    """Fingerprinting, thresholds, call sites and the allowlist of the N+1 detector"""
+
+    def run_queries(self, detector, sql, params_list):
+        for params in params_list:
+            detector(lambda *args: None, sql, params, False, {})
+
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint('SELECT "a"."id" FROM "a"\n  WHERE "a"."team_id" = 5 AND "a"."id" IN (%s, %s,%s) LIMIT 21'),
+            'SELECT "a"."id" FROM "a" WHERE "a"."team_id" = ? AND "a"."id" IN (...) LIMIT ?',
+        )
+        self.assertEqual(fingerprint('SELECT 1 WHERE x IN (%s)'), fingerprint('SELECT 2 WHERE x IN (%s, %s)'))
+        # Column names containing digits are not values
+        self.assertEqual(fingerprint('SELECT "col2" FROM "t1"'), 'SELECT "col2" FROM "t1"')
+
+    def test_threshold(self):
+        detector = RepeatedQueryDetector()
+        sql = 'SELECT * FROM "injury" WHERE "player_id" = %s'
+        self.run_queries(detector, sql, [(1,), (2,)])
+        self.assertEqual(detector.findings(3), [])
+        self.run_queries(detector, sql, [(3,)])
+        [finding] = detector.findings(3)
+        self.assertEqual((finding['count'], finding['sql']), (3, sql))
+        # The same statement with the same parameters is a cache miss, not an N+1
+        detector = RepeatedQueryDetector()
+        self.run_queries(detector, sql, [(1,)] * 5)
+        self.assertEqual(detector.findings(3), [])
+
+    def test_call_site_skips_infrastructure(self):
+        detector = RepeatedQueryDetector()
+        with wrap_connections(detector):
+            load_columns(InjuryRecord.objects.all())
+        [sites] = detector.sites.values()
+        [(python_site, template_site)] = sites
+        self.assertRegex(python_site, r'^injury_tracking/recovery\.py:\d+ in load_columns$')
+        self.assertIsNone(template_site)
+        # Without application code on the stack the test that ran the query is named
+        detector = RepeatedQueryDetector()
+        with wrap_connections(detector):
+            Team.objects.count()
+        [sites] = detector.sites.values()
+        [(python_site, _)] = sites
+        self.assertRegex(python_site, r'^injury_tracking/tests\.py:\d+ in test_call_site_skips_infrastructure$')
+
+    def test_allowlist(self):
+        finding = {
+            'python_site': 'injury_tracking/views.py:312 in coach_dashboard',
+            'template_site': 'accounts/coach_dashboard.html:142 {{ player.total_injuries }}',
+        }
+        with override_settings(NPLUSONE_ALLOWLIST=['tracking:coach_dashboard']):
+            self.assertTrue(is_allowed('tracking:coach_dashboard', finding))
+            self.assertFalse(is_allowed('tracking:injury_list', finding))
+        with override_settings(NPLUSONE_ALLOWLIST=['injury_tracking/views.py:312']):
+            self.assertTrue(is_allowed('tracking:injury_list', finding))
+        with override_settings(NPLUSONE_ALLOWLIST=['coach_dashboard.html:142']):
+            self.assertTrue(is_allowed('tracking:injury_list', finding))
+        with override_settings(NPLUSONE_ALLOWLIST=['injury_tracking/views.py:313']):
+            self.assertFalse(is_allowed('tracking:injury_list', finding))
+
+
+class PerformanceBudgetTests(TestCase):
+    """Query-count and wall-clock budgets for every view, as every role.
+
+    Query budgets must not grow with the seeded volume, so a view that starts
+    querying per row fails here (and in the N+1 detector) long before it
+    reaches production. Results are written to ``perf_report.json`` (or
+    ``LANCER_PERF_REPORT``) for tracking between releases.
+    """
+
+    results = []
+
+    @classmethod
+    def setUpTestData(cls):
+        started = time.perf_counter()
+        cls.volume = PERF_VOLUMES[PERF_VOLUME]
+        cls.teams = seed_perf_data(cls.volume)
+        cls.seed_seconds = time.perf_counter() - started
+
+        team = cls.teams[0]
+        cls.users = {
+            'ADMIN': CustomUser.objects.get(username='perf_admin'),
+            'COACH': CustomUser.objects.get(username='perf_coach_0'),
+            'DOCTOR': CustomUser.objects.get(username='perf_doctor_0'),
+            'PLAYER': CustomUser.objects.filter(role='PLAYER', team=team).order_by('id').first(),
+        }
+        cls.player = cls.users['PLAYER']
+        cls.injury = InjuryRecord.objects.filter(player__team=team).order_by('id').first()
+        cls.player_injury = InjuryRecord.objects.filter(player=cls.player).order_by('id').first() or cls.injury
+        cls.event = Event.objects.filter(team=team).order_by('id').first()
+        cls.open_injury = InjuryRecord.objects.filter(
+            player__team=team, status='ACTIVE', medical_clearance=False
+        ).order_by('id').first()
+
+    def setUp(self):
+        # Cached aggregates would otherwise outlive the rolled-back test data
+        cache.clear()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        report = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'volume_name': PERF_VOLUME,
+            'volume': PERF_VOLUMES[PERF_VOLUME],
+            'database': connection.vendor,
+            'seed_seconds': round(getattr(cls, 'seed_seconds', 0), 2),
+            'results': sorted(cls.results, key=lambda r: (r['view'], r['role'])),
+        }
+        PERF_REPORT.write_text(json.dumps(report, indent=2))
+
+    def measure(self, role, url_name, max_queries, max_ms=DEFAULT_MAX_MS,
+                method='get', data=None, expect=(200,), **kwargs):
+        self.client.force_login(self.users[role])
+        url = reverse(url_name, **kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if method == 'post' and isinstance(data, str):
+                response = self.client.post(url, data, content_type='application/json')
+            else:
+                response = getattr(self.client, method)(url, data or {})
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        limit_ms = max_ms * PERF_TIME_FACTOR
+        self.results.append({
+            'view': url_name,
+            'role': role,
+            'method': method.upper(),
+            'status': response.status_code,
+            'queries': len(queries),
+            'max_queries': max_queries,
+            'elapsed_ms': round(elapsed_ms, 2),
+            'max_ms': limit_ms,
+        })
+        self.assertIn(response.status_code, expect, f'{url_name} as {role}')
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{url_name} as {role} ran {len(queries)} queries:\n' +
+            '\n'.join(q['sql'][:200] for q in queries.captured_queries)
+        )
+        self.assertLessEqual(elapsed_ms, limit_ms, f'{url_name} as {role} took {elapsed_ms:.0f} ms')
+        return response
+
+    # injury_tracking dashboards
+    def test_dashboard_redirects(self):
+        for role in ['ADMIN', 'COACH', 'DOCTOR', 'PLAYER']:
+            self.measure(role, 'tracking:dashboard', 3, expect=(302,))
+
+    def test_admin_dashboard(self):
+        self.measure('ADMIN', 'tracking:admin_dashboard', 12)
+        self.measure('COACH', 'tracking:admin_dashboard', 3, expect=(302,))
+
+    def test_coach_dashboard(self):
+        self.measure('COACH', 'tracking:coach_dashboard', 12)
+        self.measure('PLAYER', 'tracking:coach_dashboard', 3, expect=(302,))
+
+    def test_doctor_dashboard(self):
+        self.measure('DOCTOR', 'tracking:doctor_dashboard', 10)
+        self.measure('ADMIN', 'tracking:doctor_dashboard', 10)
+
+    def test_player_dashboard(self):
+        self.measure('PLAYER', 'tracking:player_dashboard', 10)
+
+    def test_dashboard_cache(self):
+        cold = self.measure('ADMIN', 'tracking:admin_dashboard', 30)
+        self.measure('ADMIN', 'tracking:admin_dashboard', 6)
+        panel = {'kwargs': {'panel': 'admin-team-stats'}}
+        cold_stats = self.measure('ADMIN', 'tracking:dashboard_panel', 30, **panel)
+        warm_stats = self.measure('ADMIN', 'tracking:dashboard_panel', 6, **panel)
+        self.assertEqual(warm_stats.context['team_stats'], cold_stats.context['team_stats'])
+        coach_cold = self.measure('COACH', 'tracking:coach_dashboard', 30)
+        self.measure('COACH', 'tracking:coach_dashboard', 8)
+
+        # Saving an injury bumps the site-wide and team versions
+        self.open_injury.status = 'RECOVERED'
+        self.open_injury.save()
+        admin = self.measure('ADMIN', 'tracking:admin_dashboard', 30)
+        self.assertEqual(admin.context['active_injuries'], cold.context['active_injuries'] - 1)
+        coach = self.measure('COACH', 'tracking:coach_dashboard', 30)
+        self.assertEqual(coach.context['active_count'], coach_cold.context['active_count'] - 1)
+
+    def test_dashboard_panels(self):
+        # The shells render from cached counts only
+        self.measure('ADMIN', 'tracking:admin_dashboard', 6)
+        self.measure('COACH', 'tracking:coach_dashboard', 6)
+        for role, panel in [
+            ('ADMIN', 'admin-team-stats'), ('ADMIN', 'admin-recent-injuries'),
+            ('ADMIN', 'admin-distributions'), ('COACH', 'team-availability'),
+            ('COACH', 'team-recent-injuries'),
+        ]:
+            self.measure(role, 'tracking:dashboard_panel', 10, kwargs={'panel': panel})
+        self.measure('COACH', 'tracking:dashboard_panel', 3, expect=(403,), kwargs={'panel': 'admin-team-stats'})
+        self.measure('PLAYER', 'tracking:dashboard_panel', 3, expect=(403,), kwargs={'panel': 'team-availability'})
+        self.measure('ADMIN', 'tracking:dashboard_panel', 3, expect=(404,), kwargs={'panel': 'nothing'})
+
+    def test_dashboard_panel_revalidation(self):
+        url = reverse('tracking:dashboard_panel', kwargs={'panel': 'team-availability'})
+        self.client.force_login(self.users['COACH'])
+        response = self.client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        # Only the session and user: the panel's own queries are skipped
+        self.assertLessEqual(len(queries), 2)
+
+        self.open_injury.status = 'RECOVERED'
+        self.open_injury.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_dashboard_fragment_cache(self):
+        def render(role, url_name, **kwargs):
+            self.client.force_login(self.users[role])
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(url_name, **kwargs))
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        pages = [
+            ('DOCTOR', 'tracking:doctor_dashboard', {}),
+            ('ADMIN', 'tracking:doctor_dashboard', {}),
+            ('PLAYER', 'tracking:player_dashboard', {}),
+            ('COACH', 'tracking:dashboard_panel', {'kwargs': {'panel': 'team-availability'}}),
+            ('ADMIN', 'tracking:dashboard_panel', {'kwargs': {'panel': 'admin-team-stats'}}),
+        ]
+        for role, url_name, kwargs in pages:
+            self.assertGreater(render(role, url_name, **kwargs), 2)
+            # Only the session and user: the fragment comes from the cache
+            self.assertLessEqual(render(role, url_name, **kwargs), 2)
+
+        # Injury, follow-up and event writes each render the team's fragments again
+        coach = self.users['COACH']
+        writes = [
+            lambda: self.open_injury.save(),
+            lambda: InjuryFollowUp.objects.create(
+                injury=self.open_injury, follow_up_date=timezone.now().date(),
+                notes='Checked', status_update='ACTIVE', created_by=coach,
+            ),
+            lambda: Event.objects.create(
+                team=coach.team, created_by=coach, event_type='TRAINING',
+                title='Training', start_datetime=timezone.now(),
+                end_datetime=timezone.now() + timedelta(hours=1),
+            ),
+        ]
+        for write in writes:
+            write()
+            self.assertGreater(render('COACH', 'tracking:dashboard_panel', kwargs={'panel': 'team-availability'}), 2)
+            self.assertLessEqual(render('COACH', 'tracking:dashboard_panel', kwargs={'panel': 'team-availability'}), 2)
+
+    def test_analytics(self):
+        # The page renders without the chart aggregates, which analytics_data serves
+        self.measure('ADMIN', 'tracking:analytics', 8)
+        self.measure('COACH', 'tracking:analytics', 6)
+        self.measure('DOCTOR', 'tracking:analytics', 3, expect=(302,))
+
+    def test_analytics_data(self):
+        year = timezone.now().year
+        trend = {'dimensions': 'period', 'start': f'{year}-01-01', 'end': f'{year}-12-31'}
+        data = self.measure('ADMIN', 'tracking:analytics_data', 12).json()
+        self.assertEqual(data['v'], 1)
+        self.assertEqual(list(data['dimensions']), ['period', 'injury_type', 'body_part', 'severity'])
+        self.assertEqual(data['summary']['total'], InjuryRecord.objects.count())
+        severity = data['dimensions']['severity']
+        self.assertEqual(len(severity['label']), len(severity['count']))
+        self.assertEqual(len(severity['label']), len(severity['color']))
+        self.assertEqual(sum(severity['count']), data['summary']['total'])
+        self.assertLessEqual(len(data['dimensions']['injury_type']['label']), 10)
+
+        data = self.measure('ADMIN', 'tracking:analytics_data', 6, data=trend).json()
+        months = data['dimensions']['period']
+        self.assertEqual(months['period'], [f'{year}-{month:02d}-01' for month in range(1, 13)])
+        self.assertEqual(sum(months['count']), InjuryRecord.objects.filter(injury_date__year=year).count())
+        data = self.measure('ADMIN', 'tracking:analytics_data', 6, data=dict(trend, granularity='week')).json()
+        self.assertTrue(all(
+            datetime.fromisoformat(week).weekday() == 0 for week in data['dimensions']['period']['period']
+        ))
+
+        # Coaches get their own team, and no other
+        team = self.users['COACH'].team_id
+        data = self.measure('COACH', 'tracking:analytics_data', 12, data={'dimensions': 'team,status'}).json()
+        self.assertEqual(data['filters']['team'], team)
+        self.assertEqual(list(data['dimensions']), ['status', 'team'])
+        self.assertEqual(data['summary']['total'], InjuryRecord.objects.filter(player__team=team).count())
+        self.measure('COACH', 'tracking:analytics_data', 3, expect=(403,), data={'team': self.teams[1].pk})
+        self.measure('DOCTOR', 'tracking:analytics_data', 3, expect=(403,))
+        for invalid in [
+            {'granularity': 'hour'}, {'dimensions': 'period,weather'},
+            {'start': f'{year}-02-01', 'end': f'{year}-01-01'},
+            {'start': '1900-01-01', 'end': f'{year}-01-01', 'granularity': 'day'},
+        ]:
+            self.measure('ADMIN', 'tracking:analytics_data', 3, expect=(400,), data=invalid)
+
+    def test_analytics_data_revalidation(self):
+        url = reverse('tracking:analytics_data')
+        self.client.force_login(self.users['COACH'])
+        response = self.client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn(b'": ', response.content)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertLessEqual(len(queries), 2)
+
+        self.open_injury.status = 'RECOVERED'
+        self.open_injury.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_recovery_statistics(self):
+        recovered = InjuryRecord.objects.filter(status='RECOVERED', actual_recovery_time__isnull=False)
+        data = self.measure('ADMIN', 'tracking:analytics_data', 10, data={'dimensions': 'severity,recovery'}).json()
+        recovery = data['recovery']
+        self.assertEqual(recovery['overall']['n'], recovered.count())
+        self.assertEqual(recovery['overall']['p50'], round(float(np.median(
+            list(recovered.values_list('actual_recovery_time', flat=True))
+        )), 1))
+        severity = recovery['severity']
+        self.assertEqual(sum(severity['n']), recovery['overall']['n'])
+        self.assertEqual(severity['n'], sorted(severity['n'], reverse=True))
+        for label, n, mean, low, high in zip(
+            severity['label'], severity['n'], severity['mean'], severity['ci_low'], severity['ci_high']
+        ):
+            days = list(recovered.filter(severity__name=label).values_list('actual_recovery_time', flat=True))
+            self.assertEqual(n, len(days))
+            self.assertEqual(mean, round(float(np.mean(days)), 1))
+            self.assertLessEqual(low, mean)
+            self.assertGreaterEqual(high, mean)
+        self.assertEqual(sum(recovery['position']['n']), recovery['overall']['n'])
+
+    def test_recovery_estimate(self):
+        injury = InjuryRecord.objects.filter(status='RECOVERED').order_by('id').first()
+        similar = {'injury_type': injury.injury_type_id, 'severity': injury.severity_id}
+        estimate = self.measure('DOCTOR', 'tracking:recovery_estimate', 3, data=similar).json()['estimate']
+        days = list(InjuryRecord.objects.filter(
+            status='RECOVERED', actual_recovery_time__isnull=False, **similar,
+        ).values_list('actual_recovery_time', flat=True))
+        self.assertEqual(estimate['basis'], ['injury_type', 'severity'])
+        self.assertEqual(estimate['n'], len(days))
+        self.assertEqual(estimate['days'], round(float(np.median(days))))
+        self.measure('COACH', 'tracking:recovery_estimate', 3, data=similar, expect=(403,))
+        # Later suggestions are served from the process without a query
+        with self.assertNumQueries(0):
+            self.assertEqual(suggested_recovery(**similar), estimate)
+
+        # A report left without an estimate gets the suggested one
+        form = InjuryReportForm(data={
+            'player': self.player.pk, 'injury_date': timezone.localdate(), 'description': 'Twisted on landing',
+            'treatment': InjuryRecord.TREATMENT_CHOICES[0][0], 'injury_type': injury.injury_type_id,
+            'body_part': injury.body_part_id, 'severity': injury.severity_id,
+        }, user=self.users['ADMIN'])
+        self.assertTrue(form.is_valid(), form.errors)
+        expected = suggested_recovery(injury.injury_type_id, injury.body_part_id, injury.severity_id)
+        self.assertEqual(form.cleaned_data['estimated_recovery_time'], expected['days'])
+
+    # injury_tracking injury management
+    def test_injury_list(self):
+        for role in ['ADMIN', 'COACH', 'DOCTOR', 'PLAYER']:
+            self.measure(role, 'tracking:injury_list', 12)
+
+    def test_injury_export(self):
+        # One streamed query however many rows; the coach exports a whole team
+        response = self.measure('COACH', 'tracking:injury_list', 5, data={'export': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.measure('ADMIN', 'tracking:injury_list', 5, data={'export': 'csv', 'status': 'ACTIVE'})
+
+    def test_injury_detail(self):
+        self.measure('ADMIN', 'tracking:injury_detail', 8, kwargs={'pk': self.injury.pk})
+        self.measure('COACH', 'tracking:injury_detail', 8, kwargs={'pk': self.injury.pk})
+        self.measure('DOCTOR', 'tracking:injury_detail', 8, kwargs={'pk': self.injury.pk})
+        self.measure('PLAYER', 'tracking:injury_detail', 8, kwargs={'pk': self.player_injury.pk})
+
+    def test_injury_forms(self):
+        self.measure('DOCTOR', 'tracking:injury_create', 12)
+        self.measure('ADMIN', 'tracking:injury_create', 12)
+        self.measure('DOCTOR', 'tracking:injury_update', 8, kwargs={'pk': self.injury.pk})
+        self.measure('COACH', 'tracking:injury_create', 3, expect=(403,))
+
+    def test_injury_actions(self):
+        self.measure('DOCTOR', 'tracking:delete_injury', 6, kwargs={'injury_id': self.injury.pk})
+        # Saves also recount the injury's rollup cells: 4 queries
+        self.measure('DOCTOR', 'tracking:mark_as_recovered', 12, method='post',
+                     expect=(302,), kwargs={'injury_id': self.injury.pk})
+        self.measure('DOCTOR', 'tracking:update_injury_status', 12, method='post',
+                     data={'status': 'RECOVERING'}, kwargs={'injury_id': self.injury.pk})
+        self.measure('PLAYER', 'tracking:update_injury_status', 3, method='post',
+                     data={'status': 'RECOVERING'}, expect=(403,), kwargs={'injury_id': self.injury.pk})
+
+    def test_player_injuries_api(self):
+        for role in ['ADMIN', 'COACH', 'DOCTOR']:
+            self.measure(role, 'tracking:player_injuries_api', 6, kwargs={'player_id': self.player.pk})
+
+    def test_follow_up_rounds(self):
+        team = self.teams[0].pk
+        self.measure('DOCTOR', 'tracking:follow_up_rounds', 10, data={'team': team})
+        self.measure('DOCTOR', 'tracking:follow_up_rounds', 6, data={'team': 'abc'}, expect=(404,))
+        self.measure('DOCTOR', 'tracking:follow_up_round_api', 14, method='post', data=json.dumps({
+            'follow_ups': [{'injury': self.open_injury.pk, 'notes': 'Seen in clinic', 'status_update': 'RECOVERING'}],
+        }))
+
+    # injury_tracking events
+    def test_events(self):
+        self.measure('COACH', 'tracking:events_calendar', 6)
+        self.measure('ADMIN', 'tracking:events_calendar', 6)
+        self.measure('COACH', 'tracking:event_create', 8)
+        self.measure('COACH', 'tracking:event_detail', 8, kwargs={'pk': self.event.pk})
+        self.measure('ADMIN', 'tracking:event_detail', 8, kwargs={'pk': self.event.pk})
+
+    def test_events_feed(self):
+        # FullCalendar sends offset-aware ISO timestamps
+        now = timezone.now()
+        window = {'start': now.isoformat(), 'end': (now + timedelta(days=31)).isoformat()}
+        self.measure('COACH', 'tracking:events_feed', 6, data=window)
+        self.measure('ADMIN', 'tracking:events_feed', 6, data=dict(window, team=self.teams[0].pk))
+        # Rejected like the events API
+        self.measure('ADMIN', 'tracking:events_feed', 6, data=dict(window, team='abc'), expect=(400,))
+        self.measure('COACH', 'tracking:events_feed', 6, data={'start': 'yesterday'}, expect=(400,))
+
+    # accounts
+    def test_accounts_pages(self):
+        for role in ['ADMIN', 'COACH', 'DOCTOR', 'PLAYER']:
+            self.measure(role, 'dashboard', 3, expect=(302,))
+            self.measure(role, 'profile', 8)
+        self.measure('COACH', 'request_team_access', 8)
+        self.measure('DOCTOR', 'request_team_access', 8)
+        self.measure('ADMIN', 'admin_review_requests', 8)
+
+    def test_anonymous_accounts_pages(self):
+        for url_name in ['login', 'register', 'password_reset']:
+            self.client.logout()
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(url_name))
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(queries), 2)
+            self.assertLessEqual((time.perf_counter() - started) * 1000, DEFAULT_MAX_MS * PERF_TIME_FACTOR)
+
+    # injuries (legacy app)
+    def test_injuries_app(self):
+        self.measure('DOCTOR', 'submit_report', 6)
+        for role in ['ADMIN', 'COACH', 'DOCTOR', 'PLAYER']:
+            self.measure(role, 'injury_list', 6)
+        self.measure('COACH', 'players_ajax', 4, data={'q': 'perf'})
+        self.measure('ADMIN', 'players_ajax', 4)
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class ReplicaRoutingTests(SimpleTestCase):
+    """Which alias the router picks for a request; no queries are run"""
+
+    def route(self, method, url_name, cookies=None, **kwargs):
+        """Send a request through the middleware and return (read alias, response)"""
+        request = RequestFactory().generic(method, reverse(url_name, kwargs=kwargs))
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = resolve(request.path_info)
+        seen = {}
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            seen['alias'] = PrimaryReplicaRouter().db_for_read(InjuryRecord)
+            seen['session'] = PrimaryReplicaRouter().db_for_read(Session)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        response = middleware(request)
+        return seen, response
+
+    def test_read_views_use_replica(self):
+        url_kwargs = {'tracking:dashboard_panel': {'panel': 'admin-team-stats'}}
+        for url_name in settings.REPLICA_VIEWS:
+            seen, response = self.route('GET', url_name, **url_kwargs.get(url_name, {}))
+            self.assertEqual(seen['alias'], 'replica', url_name)
+            self.assertEqual(seen['session'], 'default')
+            self.assertNotIn(PIN_COOKIE, response.cookies)
+        # The decision does not outlive the request
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(InjuryRecord), 'default')
+
+    def test_other_views_and_writes_use_primary(self):
+        seen, _ = self.route('GET', 'tracking:injury_create')
+        self.assertEqual(seen['alias'], 'default')
+        seen, _ = self.route('POST', 'tracking:analytics')
+        self.assertEqual(seen['alias'], 'default')
+        self.assertEqual(PrimaryReplicaRouter().db_for_write(InjuryRecord), 'default')
+
+    def test_writes_pin_reads_to_primary(self):
+        _, response = self.route('POST', 'tracking:event_create')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], settings.REPLICA_PIN_SECONDS)
+        seen, _ = self.route('GET', 'tracking:coach_dashboard', cookies={PIN_COOKIE: '1'})
+        self.assertEqual(seen['alias'], 'default')
+
+    @override_settings(DATABASE_REPLICA=None)
+    def test_without_replica(self):
+        seen, _ = self.route('GET', 'tracking:analytics')
+        self.assertEqual(seen['alias'], 'default')
+        _, response = self.route('POST', 'tracking:event_create')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+@skipUnless(
+    settings.DATABASE_REPLICA and not settings.DATABASES[settings.DATABASE_REPLICA].get('TEST', {}).get('MIRROR'),
+    'needs an unmirrored replica, e.g. DB_REPLICA_NAME=replica.sqlite3 python manage.py test',
+)
+class ReplicaReadYourWritesTests(TransactionTestCase):
+    """Two SQLite databases standing in for a primary and a lagging replica"""
+
+    databases = {'default', settings.DATABASE_REPLICA or 'default'}
+
+    def setUp(self):
+        # The replica has the coach but has not caught up with anything else
+        team = Team(pk=1, name='Replica Team', gender='M')
+        coach = CustomUser(pk=1, username='replica_coach', role='COACH', team=team, is_registration_complete=True)
+        coach.set_password('x')
+        for alias in self.databases:
+            team.save(using=alias)
+            coach.save(using=alias)
+        self.client.force_login(coach)
+
+    def feed_titles(self):
+        response = self.client.get(reverse('tracking:events_feed'))
+        self.assertEqual(response.status_code, 200)
+        return [event['title'] for event in response.json()]
+
+    def test_pinned_after_write(self):
+        Event.objects.create(
+            team_id=1, created_by_id=1, event_type='GAME', title='Unreplicated',
+            start_datetime=timezone.now(), end_datetime=timezone.now() + timedelta(hours=2),
+        )
+        self.assertEqual(self.feed_titles(), [])
+
+        start = timezone.localtime() + timedelta(days=1)
+        response = self.client.post(reverse('tracking:event_create'), {
+            'event_type': 'TRAINING', 'title': 'Just created',
+            'start_datetime': start.strftime('%Y-%m-%dT%H:%M'),
+            'end_datetime': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.feed_titles(), ['Unreplicated', 'Just created'])
+
+        del self.client.cookies[PIN_COOKIE]
+        self.assertEqual(self.feed_titles(), [])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'tests the SQLite backend')
+class SQLiteBackendTests(TransactionTestCase):
+    """Pragmas and the BEGIN mode of lancer_project.db.sqlite3 reach every connection"""
+
+    def open(self, **options):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        wrapper = SQLiteDatabaseWrapper(
+            {**connection.settings_dict, 'NAME': f'{tmp.name}/backend.sqlite3', 'OPTIONS': options},
+            alias='backend_test',
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        wrapper = self.open(pragmas={'busy_timeout': 1234})
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        wrapper = self.open(pragmas={'busy_timeout': '1; DROP TABLE x'})
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.ensure_connection()
+
+    def test_transaction_mode(self):
+        # The test database itself starts transactions with BEGIN IMMEDIATE
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            Team.objects.count()
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+        wrapper = self.open(transaction_mode='exclusive')
+        with CaptureQueriesContext(wrapper) as queries:
+            # How atomic() opens a transaction on SQLite
+            wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+            wrapper.rollback()
+            wrapper.set_autocommit(True)
+        self.assertEqual(queries[0]['sql'], 'BEGIN EXCLUSIVE')
+        with self.assertRaises(ImproperlyConfigured):
+            self.open(transaction_mode='LAZY').ensure_connection()
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    """Two backend instances on one file behave like two workers on a host"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'cache.sqlite3')
+        self.worker_a = self.backend()
+        self.worker_b = self.backend()
+
+    def backend(self, **options):
+        return SQLiteCache(self.path, {'TIMEOUT': 60, 'OPTIONS': options})
+
+    def test_shared_between_workers(self):
+        self.worker_a.set('stats', {'active': 3})
+        self.assertEqual(self.worker_b.get('stats'), {'active': 3})
+        self.worker_b.delete('stats')
+        self.assertIsNone(self.worker_a.get('stats'))
+        self.worker_a.set_many({'a': 1, 'b': [2]})
+        self.assertEqual(self.worker_b.get_many(['a', 'b', 'c']), {'a': 1, 'b': [2]})
+
+    def test_add_and_counters(self):
+        self.assertTrue(self.worker_a.add('version', 1))
+        self.assertFalse(self.worker_b.add('version', 100))
+        self.assertEqual(self.worker_b.incr('version'), 2)
+        self.assertEqual(self.worker_a.decr('version', 2), 0)
+        with self.assertRaises(ValueError):
+            self.worker_a.incr('missing')
+        self.worker_a.set('name', 'x')
+        with self.assertRaises(TypeError):
+            self.worker_a.incr('name')
+
+    def test_expiry(self):
+        self.worker_a.set('short', 'x', timeout=0.05)
+        self.worker_a.set('gone', 'x', timeout=0)
+        self.assertTrue(self.worker_b.has_key('short'))
+        self.assertFalse(self.worker_b.has_key('gone'))
+        time.sleep(0.1)
+        self.assertIsNone(self.worker_b.get('short'))
+        # An expired key can be added again
+        self.assertTrue(self.worker_b.add('short', 'y'))
+
+    def test_lru_eviction(self):
+        small = self.backend(MAX_ENTRIES=10, CULL_FREQUENCY=2, ACCESS_RESOLUTION=0)
+        for n in range(10):
+            small.set(f'key{n}', n)
+        small.get('key0')
+        small.set('key10', 10)
+        keys = [f'key{n}' for n in range(11)]
+        self.assertEqual(sorted(small.get_many(keys)), ['key0', 'key10', 'key6', 'key7', 'key8', 'key9'])
+
+
+class SingleFlightTests(SimpleTestCase):
+    """Concurrent misses of one cached aggregate compute it once"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        barrier = threading.Barrier(8)
+
+        def compute():
+            calls.append(threading.current_thread().name)
+            time.sleep(0.2)
+            return {'active': 3}
+
+        def request():
+            barrier.wait()
+            return cached('team_stats', [GLOBAL], compute)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: request(), range(8)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'active': 3}] * 8)
+
+    @override_settings(SINGLE_FLIGHT_WAIT_SECONDS=0.1)
+    def test_abandoned_lock(self):
+        # A worker that died holding the lock delays others, it does not stop them
+        cache.add('lock:stats', 'dead worker')
+        started = time.perf_counter()
+        self.assertEqual(single_flight('stats', lambda: 5), 5)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertEqual(cache.get('lock:stats'), 'dead worker')
+
+    def test_failed_compute_releases_lock(self):
+        with self.assertRaises(ZeroDivisionError):
+            single_flight('stats', lambda: 1 / 0)
+        self.assertIsNone(cache.get('lock:stats'))
+        self.assertEqual(single_flight('stats', lambda: 5), 5)
+
+
+class SessionStorageTests(TestCase):
+    """Sessions come from the shared cache and reach the database in batches"""
+
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user(
+            username='session_user', password='x', role='COACH', is_registration_complete=True
+        )
+        self.client.force_login(user)
+        self.key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def test_requests_skip_session_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([q['sql'] for q in queries if 'django_session' in q['sql']], [])
+
+    def test_write_behind(self):
+        store = SessionStore(self.key)
+        store['injury_filter'] = 'ACTIVE'
+        with CaptureQueriesContext(connection) as queries:
+            store.save()
+        self.assertEqual(len(queries), 0)
+        self.assertNotIn('injury_filter', Session.objects.get(pk=self.key).get_decoded())
+        self.assertEqual(SessionStore(self.key)['injury_filter'], 'ACTIVE')
+
+        self.assertEqual(flush_pending(force=True), 1)
+        self.assertEqual(Session.objects.get(pk=self.key).get_decoded()['injury_filter'], 'ACTIVE')
+        # Evicted from the cache, the session is read back from the database
+        cache.clear()
+        self.assertEqual(SessionStore(self.key)['injury_filter'], 'ACTIVE')
+
+    def test_exempt_paths(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('healthz'))
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+
+@override_settings(SQLITE_WRITE_QUEUE=True, SQLITE_WRITE_QUEUE_TIMEOUT=0.1)
+class WriteQueueTimeoutTests(TransactionTestCase):
+    """A write the queue gives up on is cancelled, so a resubmit cannot duplicate it"""
+
+    def setUp(self):
+        self.write_queue = WriteQueue()
+        patcher = patch.dict('lancer_project.write_queue._queues', {'default': self.write_queue})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_queued_write_is_cancelled(self):
+        started, release = threading.Event(), threading.Event()
+        busy = self.write_queue.submit(lambda: started.set() or release.wait(5))
+        self.assertTrue(started.wait(5))
+        written = []
+        with self.assertRaises(WriteTimeout):
+            run_write(written.append, 'late')
+        release.set()
+        busy.result(5)
+        # Once the writer is free again the cancelled write is skipped
+        self.write_queue.submit(lambda: None).result(5)
+        self.assertEqual(written, [])
+
+    def test_started_write_is_awaited(self):
+        self.assertEqual(run_write(lambda: time.sleep(0.3) or 'saved'), 'saved')
+
+    def test_timeout_answers_503(self):
+        team = Team.objects.create(name='Queue Team', gender='M')
+        coach = CustomUser.objects.create_user(
+            username='queue_coach', password='x', role='COACH', team=team, is_registration_complete=True
+        )
+        self.client.force_login(coach)
+        start = timezone.localtime() + timedelta(days=1)
+        with patch('injury_tracking.views.run_write', side_effect=WriteTimeout):
+            response = self.client.post(reverse('tracking:event_create'), {
+                'event_type': 'TRAINING', 'title': 'Busy',
+                'start_datetime': start.strftime('%Y-%m-%dT%H:%M'),
+                'end_datetime': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+            })
+        self.assertEqual(response.status_code, 503)
+        self.assertIn(b'not saved', response.content)
+
+
+class SlimUserTests(TestCase):
+    """The request user is loaded without the wide personal and medical columns"""
+
+    def setUp(self):
+        team = Team.objects.create(name='Slim Team', gender='M')
+        self.user = CustomUser.objects.create_user(
+            username='slim_player', password='x', role='PLAYER', team=team, is_registration_complete=True,
+            phone='555-0100', medical_conditions='Asthma ' * 200, allergies='Penicillin',
+        )
+        self.client.force_login(self.user)
+
+    def user_queries(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in queries if 'FROM "accounts_customuser"' in q['sql']]
+
+    def test_request_user_is_slim(self):
+        _, queries = self.user_queries('tracking:player_dashboard')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('medical_conditions', queries[0])
+        self.assertIn('"accounts_team"."name"', queries[0])
+
+    def test_profile_loads_deferred_fields_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'))
+        user_queries = [q['sql'] for q in queries if 'FROM "accounts_customuser"' in q['sql']]
+        medical_queries = [q['sql'] for q in queries if 'FROM "accounts_usermedicalinfo"' in q['sql']]
+        self.assertEqual(len(user_queries), 2)
+        self.assertEqual(len(medical_queries), 1)
+        self.assertContains(response, '555-0100')
+        self.assertContains(response, 'Penicillin')
+
+    def test_medical_fields_live_in_their_own_table(self):
+        columns = [field.column for field in CustomUser._meta.concrete_fields]
+        self.assertNotIn('allergies', columns)
+        info = UserMedicalInfo.objects.get(user=self.user)
+        self.assertEqual(info.allergies, 'Penicillin')
+        user = CustomUser.objects.get(pk=self.user.pk)
+        self.assertEqual(user.blood_type, '')
+        user.blood_type = 'O+'
+        user.save()
+        self.assertEqual(UserMedicalInfo.objects.get(user=self.user).blood_type, 'O+')
+        self.assertEqual(CustomUser.objects.create_user(username='no_medical', password=None).allergies, '')
+        self.assertFalse(UserMedicalInfo.objects.filter(user__username='no_medical').exists())
+
+
+class LoadDataTests(TestCase):
+    """The synthetic data generator copes with degenerate volumes"""
+
+    def test_teams_without_players(self):
+        counts = LoadDataGenerator(
+            prefix='empty', teams=2, players_per_team=0, injuries=10, follow_ups=5, events_per_team=1, reports=3,
+        ).run()
+        self.assertEqual((counts['players'], counts['injuries']), (0, 0))
+        self.assertFalse(InjuryRecord.objects.exists())
+
+
+class SeedDataTests(TestCase):
+    """populate_initial_data adds missing rows and keeps admin edits"""
+
+    def test_keeps_admin_edits_unless_synced(self):
+        call_command('populate_initial_data', stdout=StringIO())
+        mild = InjurySeverity.objects.get(name='Mild')
+        mild.color_code = '#123456'
+        mild.save()
+        InjuryType.objects.filter(name='Bursitis').delete()
+        call_command('populate_initial_data', stdout=StringIO())
+        self.assertEqual(InjurySeverity.objects.get(name='Mild').color_code, '#123456')
+        self.assertTrue(InjuryType.objects.filter(name='Bursitis').exists())
+        call_command('populate_initial_data', '--sync', stdout=StringIO())
+        self.assertEqual(InjurySeverity.objects.get(name='Mild').color_code, '#10b981')
+
+
+class ApiTests(TestCase):
+    """The /api/ stack: bearer tokens scoped to a role and its teams, no session"""
+
+    @classmethod
+    def setUpTestData(cls):
+        LoadDataGenerator(
+            prefix='api', password='api-password', teams=2, players_per_team=5, injuries=40,
+            follow_ups=0, events_per_team=5, reports=0,
+        ).run()
+        cls.teams = list(Team.objects.filter(name__startswith='Api Team').order_by('id'))
+        cls.coach = CustomUser.objects.get(username='api_coach_0')
+        cls.doctor = CustomUser.objects.get(username='api_doctor_0')
+        cls.other_player = CustomUser.objects.filter(role='PLAYER', team=cls.teams[1]).first()
+
+    def api(self, method, url_name, user=None, token=None, data=None, **kwargs):
+        if user is not None:
+            token = issue_token(user)
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        url = reverse(f'api:{url_name}', **kwargs)
+        if method == 'post':
+            return self.client.post(url, json.dumps(data or {}), content_type='application/json', headers=headers)
+        return self.client.get(url, data or {}, headers=headers)
+
+    def test_obtain_token(self):
+        response = self.api('post', 'token', data={'username': 'api_coach_0', 'password': 'api-password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['teams'], [self.teams[0].pk])
+        response = self.api('post', 'token', data={'username': 'api_coach_0', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_minimal_stack(self):
+        token = issue_token(self.coach)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api('get', 'events', token=token)
+        self.assertEqual(response.status_code, 200)
+        # Only the events query: no session or user lookup
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn(b'": ', response.content)
+        self.assertFalse(response.cookies)
+        self.assertNotIn('Vary', response)
+        self.assertNotIn('X-Frame-Options', response)
+        self.assertIn('Server-Timing', response)
+        events = response.json()['events']
+        self.assertEqual(len(events), 5)
+        self.assertEqual({event['team'] for event in events}, {self.teams[0].pk})
+
+    def test_rejects_missing_and_bad_tokens(self):
+        response = self.api('get', 'events')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        self.assertEqual(self.api('get', 'events', token=issue_token(self.coach) + 'x').status_code, 401)
+        with override_settings(API_TOKEN_MAX_AGE=-1):
+            self.assertEqual(self.api('get', 'events', user=self.coach).status_code, 401)
+        self.assertEqual(self.api('get', 'events', user=self.doctor).status_code, 403)
+
+    def test_invalid_parameters(self):
+        for params in [{'team': 'abc'}, {'start': 'yesterday'}, {'start': '2026-02-01', 'end': '2026-01-01'}]:
+            response = self.api('get', 'events', user=self.coach, data=params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+        response = self.api('get', 'events', user=self.coach, data={
+            'team': self.teams[0].pk, 'start': '2000-01-01T00:00:00+00:00', 'end': '2100-01-01',
+        })
+        self.assertEqual(len(response.json()['events']), 5)
+
+    def test_team_scope(self):
+        response = self.api('get', 'player_injuries', user=self.coach, kwargs={'player_id': self.other_player.pk})
+        self.assertEqual(response.status_code, 403)
+        response = self.api('get', 'player_injuries', user=self.doctor, kwargs={'player_id': self.other_player.pk})
+        self.assertEqual(response.status_code, 200)
+        players = self.api('get', 'players', user=self.coach).json()['results']
+        self.assertEqual(len(players), 5)
+        self.assertNotIn(self.other_player.pk, [player['id'] for player in players])
+
+    def test_injury_status(self):
+        injury = InjuryRecord.objects.filter(status='ACTIVE').first()
+        kwargs = {'injury_id': injury.pk}
+        self.assertEqual(self.api('post', 'injury_status', user=self.coach, data={'status': 'RECOVERED'},
+                                  kwargs=kwargs).status_code, 403)
+        self.assertEqual(self.api('get', 'injury_status', user=self.doctor, kwargs=kwargs).status_code, 405)
+        for data in ({'status': 'HEALED'}, {}, {'status': ['RECOVERED']}, {'status': {'RECOVERED': 1}}):
+            self.assertEqual(self.api('post', 'injury_status', user=self.doctor, data=data,
+                                      kwargs=kwargs).status_code, 400, data)
+        # Empty form data rather than JSON
+        response = self.client.post(reverse('api:injury_status', kwargs=kwargs), {},
+                                    headers={'Authorization': f'Bearer {issue_token(self.doctor)}'})
+        self.assertEqual(response.status_code, 400)
+        response = self.api('post', 'injury_status', user=self.doctor, data={'status': 'RECOVERED'}, kwargs=kwargs)
+        self.assertEqual(response.json(), {'id': injury.pk, 'status': 'RECOVERED'})
+        injury.refresh_from_db()
+        self.assertTrue(injury.medical_clearance)
+
+    def test_refresh_rereads_user(self):
+        token = issue_token(self.coach)
+        CustomUser.objects.filter(pk=self.coach.pk).update(team=self.teams[1])
+        response = self.api('post', 'token_refresh', token=token)
+        self.assertEqual(response.json()['teams'], [self.teams[1].pk])
+        CustomUser.objects.filter(pk=self.coach.pk).update(is_active=False)
+        self.assertEqual(self.api('post', 'token_refresh', token=token).status_code, 401)
+
+    def test_change_feed(self):
+        cursor = self.api('get', 'changes', user=self.coach).json()['next']
+        own, other = (
+            InjuryRecord.objects.filter(player__team=team).order_by('id').first() for team in self.teams
+        )
+        self.api('post', 'injury_status', user=self.doctor, data={'status': 'RECOVERING'},
+                 kwargs={'injury_id': own.pk})
+        own_pk = own.pk
+        own.delete()
+        other.status = 'CHRONIC'
+        other.save()
+        event = Event.objects.filter(team=self.teams[0]).first()
+        event.title = 'Moved practice'
+        event.save()
+
+        token = issue_token(self.coach)
+        with CaptureQueriesContext(connection) as queries:
+            feed = self.api('get', 'changes', token=token, data={'since': cursor}).json()
+        self.assertLessEqual(len(queries), 4)
+        # The coach sees only team 0, and the saved-then-deleted injury once
+        self.assertEqual(
+            [(change['type'], change['id'], change['deleted']) for change in feed['changes']],
+            [('injury', own_pk, True), ('event', event.pk, False)],
+        )
+        self.assertEqual(feed['changes'][1]['data']['title'], 'Moved practice')
+        self.assertFalse(feed['more'])
+
+        feed = self.api('get', 'changes', user=self.doctor, data={'since': cursor, 'limit': 1}).json()
+        self.assertTrue(feed['more'])
+        feed = self.api('get', 'changes', user=self.doctor, data={'since': feed['next']}).json()
+        self.assertIn(('injury', other.pk, False), [(c['type'], c['id'], c['deleted']) for c in feed['changes']])
+
+        self.assertEqual(self.api('get', 'changes', user=self.coach, data={'since': 'x'}).status_code, 400)
+        ChangeLog.objects.filter(id__lt=feed['next']).delete()
+        self.assertEqual(self.api('get', 'changes', user=self.coach, data={'since': cursor}).status_code, 410)
+
+    def test_cascaded_tombstones(self):
+        injury = InjuryRecord.objects.filter(player__team=self.teams[0]).first()
+        for days in range(3):
+            InjuryFollowUp.objects.create(
+                injury=injury, follow_up_date=injury.injury_date + timedelta(days=days + 1),
+                notes='Seen', status_update='RECOVERING', created_by=self.doctor,
+            )
+        follow_up_ids = set(injury.follow_ups.values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            injury.delete()
+        # The player's team is read once, for the injury and all its follow-ups
+        self.assertEqual(len([q for q in queries if 'accounts_customuser' in q['sql']]), 1)
+        tombstones = ChangeLog.objects.filter(kind=ChangeLog.FOLLOW_UP, deleted=True)
+        self.assertEqual(set(tombstones.values_list('object_id', flat=True)), follow_up_ids)
+        self.assertEqual(set(tombstones.values_list('team', flat=True)), {self.teams[0].pk})
+
+    def test_async_views_under_asgi(self):
+        # Every middleware runs in the handler's mode, so ASGI never drops to a thread for it
+        for path in settings.MIDDLEWARE + settings.API_MIDDLEWARE:
+            self.assertTrue(getattr(import_string(path), 'async_capable', False), path)
+
+        client = AsyncClient()
+        client.force_login(self.coach)
+        token = issue_token(self.coach)
+        player = CustomUser.objects.filter(role='PLAYER', team=self.teams[0]).first()
+        requests = [
+            (reverse('api:events'), {'Authorization': f'Bearer {token}'}),
+            (reverse('api:player_injuries', kwargs={'player_id': player.pk}), {'Authorization': f'Bearer {token}'}),
+            (reverse('tracking:events_feed'), {}),
+            (reverse('tracking:player_injuries_api', kwargs={'player_id': player.pk}), {}),
+            (reverse('players_ajax'), {}),
+        ]
+        self.client.force_login(self.coach)
+        for url, headers in requests:
+            with CaptureQueriesContext(connection) as sync_queries:
+                expected = self.client.get(url, headers=headers)
+            with CaptureQueriesContext(connection) as async_queries:
+                response = async_to_sync(client.get)(url, headers=headers)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json(), expected.json(), url)
+            self.assertEqual(len(async_queries), len(sync_queries), url)
+            # The instrumentation sees the queries run on the ORM's thread
+            self.assertIn(f'desc="{len(async_queries)} queries"', response['Server-Timing'], url)
+        response = async_to_sync(client.get)(reverse('tracking:player_injuries_api', kwargs={
+            'player_id': self.other_player.pk,
+        }))
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(CHANGE_STREAM_POLL_SECONDS=0.01, CHANGE_STREAM_MAX_SECONDS=0.2)
+class ChangeStreamTests(TestCase):
+    """Server-sent change events for the live dashboards"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teams = [Team.objects.create(name=f'Stream Team {n}', gender='M') for n in range(2)]
+        cls.coach = CustomUser.objects.create_user(
+            username='stream_coach', password=None, role='COACH', team=cls.teams[0], is_registration_complete=True
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def add_event(self, team, title):
+        now = timezone.now()
+        return Event.objects.create(
+            team=team, created_by=self.coach, event_type='TRAINING', title=title,
+            start_datetime=now, end_datetime=now + timedelta(hours=1),
+        )
+
+    def stream(self, user, **params):
+        client = AsyncClient()
+        client.force_login(user)
+
+        async def read():
+            response = await client.get(reverse('tracking:change_stream'), params)
+            if not response.streaming:
+                return response, response.content.decode()
+            body = b''.join([chunk async for chunk in response.streaming_content])
+            return response, body.decode()
+        return async_to_sync(read)()
+
+    def test_streams_team_changes(self):
+        first = self.add_event(self.teams[0], 'Before')
+        since = ChangeLog.objects.get(kind='event', object_id=first.pk).pk
+        own = self.add_event(self.teams[0], 'Video session')
+        self.add_event(self.teams[1], 'Other team')
+        response, body = self.stream(self.coach, since=since)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('event: change', body)
+        self.assertIn('Video session', body)
+        self.assertNotIn('Other team', body)
+        self.assertNotIn('"Before"', body)
+        seq = ChangeLog.objects.get(kind='event', object_id=own.pk).pk
+        self.assertIn(f'id: {seq}\n', body)
+
+    def test_resync_and_access(self):
+        pruned = self.add_event(self.teams[0], 'Pruned')
+        self.add_event(self.teams[0], 'Kept')
+        entry = ChangeLog.objects.get(kind='event', object_id=pruned.pk).pk
+        ChangeLog.objects.filter(pk=entry).delete()
+        _, body = self.stream(self.coach, since=entry - 1)
+        self.assertIn('event: resync', body)
+        player = CustomUser.objects.create_user(username='stream_player', password=None, role='PLAYER')
+        response, _ = self.stream(player)
+        self.assertEqual(response.status_code, 403)
+        # Under WSGI the stream would hold a worker thread for minutes
+        self.client.force_login(self.coach)
+        self.assertEqual(self.client.get(reverse('tracking:change_stream')).status_code, 503)
+
+
+class InjuryRollupTests(TestCase):
+    """InjuryRollup kept equal to a recount of the injuries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        LoadDataGenerator(
+            teams=2, players_per_team=10, injuries=400, follow_ups=0, events_per_team=0, prefix='rollup',
+        ).run()
+        cls.doctor = CustomUser.objects.create_user(
+            username='rollup_doctor', password=None, role='DOCTOR', is_registration_complete=True
+        )
+
+    def assertRollupCurrent(self):
+        def key(row):
+            return (row.team_id, row.month, row.injury_type_id, row.body_part_id, row.severity_id, row.status,
+                    row.injuries, row.recovery_days, row.recovery_days_count)
+        self.assertEqual(
+            sorted(map(key, InjuryRollup.objects.all()), key=repr),
+            sorted(map(key, rollup_rows(InjuryRecord.objects.all())), key=repr),
+        )
+
+    def test_maintained_on_write(self):
+        self.assertRollupCurrent()
+        injury = InjuryRecord.objects.filter(status='ACTIVE').first()
+        injury.status = 'RECOVERED'
+        injury.actual_recovery_time = 12
+        injury.save()
+        self.assertRollupCurrent()
+        injury.injury_date = injury.injury_date - timedelta(days=40)
+        injury.save()
+        self.assertRollupCurrent()
+        injury.delete()
+        self.assertRollupCurrent()
+
+        teams = list(Team.objects.filter(name__startswith='Rollup Team'))
+        player = CustomUser.objects.filter(role='PLAYER', team=teams[0], injuries__isnull=False).first()
+        player.team = teams[1]
+        player.save()
+        self.assertRollupCurrent()
+        # Injuries stay counted for their player's team after a role change
+        former = CustomUser.objects.filter(
+            role='PLAYER', team=teams[0], injuries__isnull=False,
+        ).exclude(pk=player.pk).first()
+        former.role = 'COACH'
+        former.save()
+        former.team = teams[1]
+        former.save(update_fields=['team'])
+        self.assertRollupCurrent()
+        teams[0].delete()
+        self.assertRollupCurrent()
+
+    def test_follow_up_round_and_rebuild(self):
+        injuries = InjuryRecord.objects.filter(status='ACTIVE')[:5]
+        _record_follow_up_round(self.doctor, [
+            {'injury': injury.pk, 'status_update': 'RECOVERED'} for injury in injuries
+        ])
+        self.assertRollupCurrent()
+        InjuryRollup.objects.filter(status='RECOVERED').delete()
+        call_command('rebuild_injury_rollup', stdout=StringIO())
+        self.assertRollupCurrent()
+
+    def test_analytics_from_rollup(self):
+        # The rollup answers whole-month queries exactly as the injury rows do
+        start = timezone.localdate().replace(month=1, day=1)
+        query = {
+            'team': Team.objects.filter(name__startswith='Rollup Team').first().pk,
+            'start': start, 'end': start.replace(month=12, day=31),
+            'granularity': 'month', 'dimensions': ['period', 'injury_type', 'body_part', 'severity', 'status'],
+        }
+        self.assertTrue(uses_rollup(query))
+        from_rollup = compute_chart_data(query)
+        self.assertGreater(from_rollup['summary']['total'], 0)
+        with patch('injury_tracking.analytics.uses_rollup', return_value=False):
+            self.assertEqual(compute_chart_data(query), from_rollup)
+        self.assertFalse(uses_rollup({**query, 'granularity': 'week'}))
+        self.assertFalse(uses_rollup({**query, 'start': start.replace(day=2)}))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'needs concurrent writers, e.g. DB_ENGINE=postgres python manage.py test')
+class InjuryRollupConcurrencyTests(TransactionTestCase):
+    """Concurrent saves in one rollup cell, each in its own transaction"""
+
+    def test_concurrent_saves_in_one_cell(self):
+        LoadDataGenerator(
+            teams=1, players_per_team=8, injuries=1, follow_ups=0, events_per_team=0, prefix='race',
+        ).run()
+        first = InjuryRecord.objects.get()
+        cell = {
+            'injury_date': first.injury_date, 'injury_type_id': first.injury_type_id,
+            'body_part_id': first.body_part_id, 'severity_id': first.severity_id, 'status': first.status,
+            'treatment': first.treatment, 'description': 'Reported at the same moment',
+        }
+        players = list(CustomUser.objects.filter(role='PLAYER', username__startswith='race_'))
+        barrier = threading.Barrier(len(players))
+
+        def report(player):
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    InjuryRecord.objects.create(player=player, **cell)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(len(players)) as pool:
+            list(pool.map(report, players))
+        # Overlapping refreshes would count some injuries twice
+        self.assertEqual(
+            InjuryRollup.objects.aggregate(total=Sum('injuries'))['total'], InjuryRecord.objects.count()
+        )
+
+
+class DashboardPanelTests(TransactionTestCase):
+    """Dashboard panels on the thread pool, each with its own connection"""
+
+    def setUp(self):
+        cache.clear()
+        LoadDataGenerator(
+            prefix='panel', password=None, teams=2, players_per_team=3, injuries=20,
+            follow_ups=0, events_per_team=0, reports=0,
+        ).run()
+        self.client.force_login(CustomUser.objects.get(username='panel_admin'))
+
+    def test_panels_run_concurrently(self):
+        def panel():
+            time.sleep(0.1)
+            return threading.current_thread().name
+
+        started = time.perf_counter()
+        threads = run_panels({'a': panel, 'b': panel, 'c': panel})
+        self.assertLess(time.perf_counter() - started, 0.25)
+        self.assertEqual(len(set(threads.values())), 3)
+        self.assertTrue(all(name.startswith('dashboard-panel') for name in threads.values()))
+
+        with self.assertRaises(ZeroDivisionError):
+            run_panels({'ok': lambda: 1, 'fails': lambda: 1 / 0})
+
+    def test_inline_in_transactions_and_nested_panels(self):
+        current = threading.current_thread().name
+        with transaction.atomic():
+            threads = run_panels({'a': lambda: threading.current_thread().name, 'b': lambda: 0})
+        self.assertEqual(threads['a'], current)
+
+        def outer():
+            inner = run_panels({'a': lambda: threading.current_thread().name, 'b': lambda: 0})
+            return inner['a'] == threading.current_thread().name
+        self.assertTrue(run_panels({'outer': outer, 'other': lambda: 0})['outer'])
+
+    def dashboard(self, url_name, workers, **kwargs):
+        cache.clear()
+        with override_settings(DASHBOARD_PANEL_WORKERS=workers):
+            response = self.client.get(reverse(url_name, **kwargs))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_dashboards_match_serial_rendering(self):
+        serial = self.dashboard('tracking:admin_dashboard', 1)
+        concurrent = self.dashboard('tracking:admin_dashboard', 4)
+        for key in ['total_players', 'total_injuries', 'active_injuries', 'recovered_injuries']:
+            self.assertEqual(concurrent.context[key], serial.context[key], key)
+        # Queries run in panel threads are still instrumented
+        self.assertEqual(concurrent['Server-Timing'].split('"')[1], serial['Server-Timing'].split('"')[1])
+
+        panel = {'kwargs': {'panel': 'admin-distributions'}}
+        serial = self.dashboard('tracking:dashboard_panel', 1, **panel)
+        concurrent = self.dashboard('tracking:dashboard_panel', 4, **panel)
+        for key in ['injury_type_stats', 'body_part_stats']:
+            self.assertEqual(concurrent.context[key], serial.context[key], key)
+
+        serial = self.dashboard('tracking:analytics_data', 1)
+        concurrent = self.dashboard('tracking:analytics_data', 4)
+        self.assertEqual(concurrent.json(), serial.json())
@@ -10,15 +10,18 @@ urlpatterns = [
     path('coach/', views.coach_dashboard, name='coach_dashboard'),
     path('doctor/', views.doctor_dashboard, name='doctor_dashboard'),
     path('player/', views.player_dashboard, name='player_dashboard'),
+    path('dashboard/panels/<slug:panel>/', views.dashboard_panel, name='dashboard_panel'),
     
     # Injury management
     path('injuries/', views.InjuryListView.as_view(), name='injury_list'),
     path('injuries/<int:pk>/', views.InjuryDetailView.as_view(), name='injury_detail'),
     path('injuries/create/', views.InjuryCreateView.as_view(), name='injury_create'),
     path('injuries/<int:pk>/update/', views.InjuryUpdateView.as_view(), name='injury_update'),
+    path('injuries/recovery-estimate/', views.recovery_estimate, name='recovery_estimate'),
     
     # Analytics
     path('analytics/', views.analytics_dashboard, name='analytics'),
+    path('analytics/data/v1/', views.analytics_data, name='analytics_data'),
     
     # API endpoints
     path('api/player/<int:player_id>/injuries/', views.get_player_injuries, name='player_injuries_api'),
@@ -28,9 +31,16 @@ urlpatterns = [
     path('injuries/<int:injury_id>/recover/', views.mark_as_recovered, name='mark_as_recovered'),
     path('injuries/<int:injury_id>/delete/', views.delete_injury, name='delete_injury'),
 
+    # Clinic rounds (batch follow-ups)
+    path('follow-ups/rounds/', views.follow_up_rounds, name='follow_up_rounds'),
+    path('api/follow-ups/round/', views.follow_up_round_api, name='follow_up_round_api'),
+
     # Events (Coach Calendar)
     path('events/', views.events_calendar, name='events_calendar'),
     path('events/create/', views.event_create, name='event_create'),
     path('events/<int:pk>/', views.event_detail, name='event_detail'),
     path('events/feed/', views.events_feed, name='events_feed'),
+
+    # Live dashboard updates (server-sent events, ASGI only)
+    path('changes/stream/', views.change_stream, name='change_stream'),
 ]
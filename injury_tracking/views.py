@@ -1,25 +1,45 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
-from django.db.models import Q, Count, Avg
-from django.http import JsonResponse
+from django.db import transaction
+from django.db.models import Q, Count, Avg, Sum
+from django.conf import settings
+from django.http import Http404, HttpResponseForbidden, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import quote_etag, urlencode
+from asgiref.sync import sync_to_async
 from datetime import datetime, timedelta
+import asyncio
+import csv
 import json
+import time
 
 from .models import (
     InjuryRecord, InjuryType, BodyPart, InjurySeverity, 
-    InjuryFollowUp, TeamRoster, InjuryAnalytics, Event
+    InjuryFollowUp, TeamRoster, InjuryAnalytics, Event, ChangeLog, InjuryRollup
 )
 from .forms import (
     InjuryReportForm, InjuryUpdateForm, InjuryFollowUpForm,
-    PlayerProfileForm, TeamRosterForm, InjurySearchForm, EventForm
+    PlayerProfileForm, TeamRosterForm, InjurySearchForm, EventForm,
+    FollowUpRoundForm, FollowUpRoundFormSet, AnalyticsQueryForm, RecoveryEstimateForm, EventQueryForm
 )
+from .analytics import analytics_etag, chart_data
+from .caching import (
+    GLOBAL, LOOKUPS, cached, data_versions, fragment_context, invalidate, team_scope,
+)
+from .changes import CHANGES, CursorTooOld, change_page, latest_change_id, record_changes
+from .panels import run_panels
+from .recovery import suggested_recovery
+from .rollup import injury_cell, refresh_cells
 from accounts.models import CustomUser, Team
+from lancer_project.write_queue import run_write
 
 # Permission mixins
 class AdminRequiredMixin(UserPassesTestMixin):
@@ -60,38 +80,34 @@ def events_calendar(request):
     })
 
 @login_required
-def events_feed(request):
+async def events_feed(request):
     """JSON feed for FullCalendar events for the coach's team"""
-    if request.user.role not in ['ADMIN', 'COACH']:
+    user = await request.auser()
+    if user.role not in ['ADMIN', 'COACH']:
         return JsonResponse({'error': 'Access denied'}, status=403)
 
+    # The same parameters as the events API: a team and FullCalendar's ISO range
+    form = EventQueryForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid parameters', 'fields': form.errors}, status=400)
+    query = form.cleaned_data
+
     team = None
-    if request.user.role == 'COACH':
-        team = request.user.team
+    if user.role == 'COACH':
+        team = user.team
         if not team:
             return JsonResponse({'events': []})
-    else:
+    elif query['team']:
         # Admin can pass team id
-        team_id = request.GET.get('team')
-        if team_id:
-            team = get_object_or_404(Team, id=team_id)
+        team = await aget_object_or_404(Team, id=query['team'])
 
     qs = Event.objects.all()
     if team:
         qs = qs.filter(team=team)
-
-    # Optional range filtering by FullCalendar (start/end ISO strings)
-    start = request.GET.get('start')
-    end = request.GET.get('end')
-    try:
-        if start:
-            start_dt = datetime.fromisoformat(start)
-            qs = qs.filter(end_datetime__gte=start_dt)
-        if end:
-            end_dt = datetime.fromisoformat(end)
-            qs = qs.filter(start_datetime__lte=end_dt)
-    except Exception:
-        pass
+    if query['start']:
+        qs = qs.filter(end_datetime__gte=query['start'])
+    if query['end']:
+        qs = qs.filter(start_datetime__lte=query['end'])
 
     events = []
     type_to_color = {
@@ -99,7 +115,7 @@ def events_feed(request):
         'SESSION': '#10b981',
         'GAME': '#f59e0b',
     }
-    for ev in qs.order_by('start_datetime'):
+    async for ev in qs.order_by('start_datetime'):
         events.append({
             'id': ev.id,
             'title': ev.title,
@@ -132,7 +148,7 @@ def event_create(request):
                 if auth_teams is not None and selected_team and selected_team not in list(auth_teams):
                     messages.error(request, 'You do not have permission to create events for the selected team.')
                     return render(request, 'injury_tracking/event_form.html', {'form': form})
-            event = form.save()
+            event = run_write(form.save)
             messages.success(request, 'Event created successfully.')
             return redirect('tracking:event_detail', pk=event.id)
     else:
@@ -172,7 +188,7 @@ def event_detail(request, pk):
         player__team=event.team,
         status__in=['ACTIVE', 'RECOVERING', 'CHRONIC'],
         injury_date__lte=event.end_datetime.date()
-    ).select_related('player', 'injury_type', 'severity')
+    ).select_related('player', 'injury_type', 'body_part', 'severity')
 
     # If return_to_play_date exists and is before event start, they should be available
     missing_players = []
@@ -188,6 +204,75 @@ def event_detail(request, pk):
     }
     return render(request, 'injury_tracking/event_detail.html', context)
 
+def team_injury_stats():
+    """Per-team injury and player counts from two grouped queries plus the team list"""
+    injury_counts = {
+        row['team']: row
+        for row in InjuryRollup.objects.values('team').annotate(
+            total_injuries=Sum('injuries'),
+            active_injuries=Sum('injuries', filter=Q(status='ACTIVE'), default=0),
+            recovered_injuries=Sum('injuries', filter=Q(status='RECOVERED'), default=0),
+        )
+    }
+    player_counts = dict(
+        CustomUser.objects.filter(role='PLAYER').values_list('team').annotate(count=Count('id'))
+    )
+
+    team_stats = []
+    for team in Team.objects.all():
+        counts = injury_counts.get(team.id, {})
+        team_stats.append({
+            'team': team,
+            'total_injuries': counts.get('total_injuries', 0),
+            'active_injuries': counts.get('active_injuries', 0),
+            'recovered_injuries': counts.get('recovered_injuries', 0),
+            'players': player_counts.get(team.id, 0),
+        })
+    return team_stats
+
+def admin_headline_counts():
+    """Player and injury totals for the admin dashboard shell, in a cacheable form"""
+    panels = run_panels({
+        'total_players': lambda: CustomUser.objects.filter(role='PLAYER').count(),
+        'injury_counts': lambda: InjuryRollup.objects.aggregate(
+            total=Sum('injuries', default=0),
+            active=Sum('injuries', filter=Q(status='ACTIVE'), default=0),
+            recovered=Sum('injuries', filter=Q(status='RECOVERED'), default=0),
+        ),
+    })
+    injury_counts = panels['injury_counts']
+    return {
+        'total_players': panels['total_players'],
+        'total_injuries': injury_counts['total'],
+        'active_injuries': injury_counts['active'],
+        'recovered_injuries': injury_counts['recovered'],
+    }
+
+def injury_distributions():
+    """Top five injury types and body parts, site-wide"""
+    return run_panels({
+        'injury_type_stats': lambda: list(
+            InjuryRollup.objects.values('injury_type__name').annotate(count=Sum('injuries')).order_by('-count')[:5]
+        ),
+        'body_part_stats': lambda: list(
+            InjuryRollup.objects.values('body_part__name').annotate(count=Sum('injuries')).order_by('-count')[:5]
+        ),
+    })
+
+def team_injury_counts(team):
+    """Player count, injury totals per player and active/recovered counts for one team"""
+    team_injuries = InjuryRecord.objects.filter(player__team=team)
+    counts = InjuryRollup.objects.filter(team=team).aggregate(
+        active=Sum('injuries', filter=Q(status='ACTIVE'), default=0),
+        recovered=Sum('injuries', filter=Q(status='RECOVERED'), default=0),
+    )
+    counts['totals_by_player'] = dict(team_injuries.values_list('player').annotate(total=Count('id')))
+    counts['players'] = CustomUser.objects.filter(role='PLAYER', team=team).count()
+    return counts
+
+def cached_team_injury_counts(team):
+    return cached(f'team_counts:{team.pk}', [team_scope(team.pk)], lambda: team_injury_counts(team))
+
 # Dashboard Views
 @login_required
 def dashboard(request):
@@ -199,13 +284,13 @@ def dashboard(request):
         return redirect('complete_registration')
     
     if user.role == 'ADMIN':
-        return redirect('admin_dashboard')
+        return redirect('tracking:admin_dashboard')
     elif user.role == 'COACH':
-        return redirect('coach_dashboard')
+        return redirect('tracking:coach_dashboard')
     elif user.role == 'DOCTOR':
-        return redirect('doctor_dashboard')
+        return redirect('tracking:doctor_dashboard')
     elif user.role == 'PLAYER':
-        return redirect('player_dashboard')
+        return redirect('tracking:player_dashboard')
     else:
         return redirect('login')
 
@@ -220,48 +305,9 @@ def admin_dashboard(request):
         messages.error(request, "Access denied. Admin privileges required.")
         return redirect('dashboard')
     
-    # Get analytics data
-    total_players = CustomUser.objects.filter(role='PLAYER').count()
-    total_injuries = InjuryRecord.objects.count()
-    active_injuries = InjuryRecord.objects.filter(status='ACTIVE').count()
-    recovered_injuries = InjuryRecord.objects.filter(status='RECOVERED').count()
-    
-    # Recent injuries
-    recent_injuries = InjuryRecord.objects.select_related(
-        'player', 'injury_type', 'severity'
-    ).order_by('-reported_date')[:10]
-    
-    # Team-wise statistics
-    team_stats = []
-    for team in Team.objects.all():
-        team_injuries = InjuryRecord.objects.filter(player__team=team)
-        team_stats.append({
-            'team': team,
-            'total_injuries': team_injuries.count(),
-            'active_injuries': team_injuries.filter(status='ACTIVE').count(),
-            'players': CustomUser.objects.filter(role='PLAYER', team=team).count()
-        })
-    
-    # Injury type distribution
-    injury_type_stats = InjuryRecord.objects.values('injury_type__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:5]
-    
-    # Body part distribution
-    body_part_stats = InjuryRecord.objects.values('body_part__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:5]
-    
-    context = {
-        'total_players': total_players,
-        'total_injuries': total_injuries,
-        'active_injuries': active_injuries,
-        'recovered_injuries': recovered_injuries,
-        'recent_injuries': recent_injuries,
-        'team_stats': team_stats,
-        'injury_type_stats': injury_type_stats,
-        'body_part_stats': body_part_stats,
-    }
+    # Headline counts, shared by all workers until an injury, player or team
+    # changes; the heavier panels load afterwards from dashboard_panel
+    context = cached('admin_headline', [GLOBAL], admin_headline_counts)
     
     return render(request, 'accounts/admin_dashboard.html', context)
 
@@ -276,23 +322,63 @@ def coach_dashboard(request):
         messages.error(request, "Access denied. Coach privileges required.")
         return redirect('dashboard')
     
-    user = request.user
-    team = user.team
+    team = request.user.team
     
     if not team:
         messages.error(request, "No team assigned. Please contact administrator.")
         return redirect('dashboard')
     
-    # Get team players with their injury status
-    players = CustomUser.objects.filter(role='PLAYER', team=team).select_related('playerprofile')
+    # Team statistics from the cache; the player status and recent injuries
+    # panels load afterwards from dashboard_panel
+    counts = cached_team_injury_counts(team)
+    
+    context = {
+        'team': team,
+        'active_count': counts['active'],
+        'recovered_count': counts['recovered'],
+        'total_players': counts['players'],
+    }
+    
+    return render(request, 'accounts/coach_dashboard.html', context)
+
+# Dashboard panels, loaded by static/js/dashboard_panels.js after the shell.
+# Their templates cache the rendered fragment, so data is fetched lazily and
+# only when the fragment has to be rendered again.
+def admin_team_stats_panel(user):
+    return {'team_stats': SimpleLazyObject(lambda: cached('admin_team_stats', [GLOBAL], team_injury_stats))}
+
+def admin_recent_injuries_panel(user):
+    return {
+        'recent_injuries': InjuryRecord.objects.select_related(
+            'player', 'player__team', 'injury_type', 'body_part', 'severity'
+        ).order_by('-reported_date')[:10],
+    }
+
+def admin_distributions_panel(user):
+    return cached('admin_distributions', [GLOBAL], injury_distributions)
+
+def team_availability_panel(user):
+    # Cached too, so coaches opening it together compute it once between them
+    return {'player_status': SimpleLazyObject(lambda: cached(
+        f'team_player_status:{user.team_id}', team_scopes(user), lambda: team_player_status(user.team),
+    ))}
+
+def team_player_status(team):
+    """Each player of the team with their active injuries and status colour"""
+    players = list(CustomUser.objects.filter(role='PLAYER', team=team).select_related('playerprofile'))
+    
+    # Active injuries (newest first) and injury totals for the whole roster at once
+    active_by_player = {}
+    for injury in InjuryRecord.objects.filter(player__team=team, status='ACTIVE').select_related(
+        'injury_type', 'body_part', 'severity'
+    ):
+        active_by_player.setdefault(injury.player_id, []).append(injury)
+    totals_by_player = cached_team_injury_counts(team)['totals_by_player']
     
     player_status = []
     for player in players:
-        active_injuries = InjuryRecord.objects.filter(
-            player=player, status='ACTIVE'
-        ).select_related('injury_type', 'severity')
-        
-        latest_injury = active_injuries.first()
+        active_injuries = active_by_player.get(player.id, [])
+        latest_injury = active_injuries[0] if active_injuries else None
         
         # Determine status color
         if latest_injury:
@@ -310,29 +396,79 @@ def coach_dashboard(request):
             'active_injuries': active_injuries,
             'latest_injury': latest_injury,
             'status_color': status_color,
-            'total_injuries': InjuryRecord.objects.filter(player=player).count()
+            'total_injuries': totals_by_player.get(player.id, 0)
         })
-    
-    # Team injury statistics
-    team_injuries = InjuryRecord.objects.filter(player__team=team)
-    active_count = team_injuries.filter(status='ACTIVE').count()
-    recovered_count = team_injuries.filter(status='RECOVERED').count()
-    
+    return player_status
+
+def team_recent_injuries_panel(user):
     # Recent team injuries (last 10)
-    recent_injuries = team_injuries.select_related(
-        'player', 'injury_type', 'body_part', 'severity', 'reported_by'
-    ).order_by('-injury_date')[:10]
-    
-    context = {
-        'team': team,
-        'player_status': player_status,
-        'active_count': active_count,
-        'recovered_count': recovered_count,
-        'total_players': players.count(),
-        'recent_injuries': recent_injuries,
+    return {
+        'recent_injuries': InjuryRecord.objects.filter(player__team=user.team).select_related(
+            'player', 'player__playerprofile', 'injury_type', 'body_part', 'severity', 'reported_by'
+        ).order_by('-injury_date')[:10],
     }
-    
-    return render(request, 'accounts/coach_dashboard.html', context)
+
+def site_scopes(user):
+    return [GLOBAL]
+
+def team_scopes(user):
+    # Team pages show lookup names too, and player profiles (which bump the team);
+    # injuries of a player without a team bump the global scope only
+    if not user.team_id:
+        return [GLOBAL]
+    return [team_scope(user.team_id), LOOKUPS]
+
+# name: (roles, needs a team, data-version scopes, context, template)
+DASHBOARD_PANELS = {
+    'admin-team-stats': (
+        ['ADMIN'], False, site_scopes, admin_team_stats_panel,
+        'injury_tracking/panels/admin_team_stats.html',
+    ),
+    'admin-recent-injuries': (
+        ['ADMIN'], False, site_scopes, admin_recent_injuries_panel,
+        'injury_tracking/panels/admin_recent_injuries.html',
+    ),
+    'admin-distributions': (
+        ['ADMIN'], False, site_scopes, admin_distributions_panel,
+        'injury_tracking/panels/admin_distributions.html',
+    ),
+    'team-availability': (
+        ['ADMIN', 'COACH'], True, team_scopes, team_availability_panel,
+        'injury_tracking/panels/team_availability.html',
+    ),
+    'team-recent-injuries': (
+        ['ADMIN', 'COACH'], True, team_scopes, team_recent_injuries_panel,
+        'injury_tracking/panels/team_recent_injuries.html',
+    ),
+}
+
+@login_required
+def dashboard_panel(request, panel):
+    """One dashboard panel as an HTML fragment.
+
+    The ETag is built from the data versions the panel depends on, so a
+    browser revalidating an unchanged panel gets a 304 without any of its
+    queries running. Other viewers of the same role (and team) are served
+    the fragment cached by the panel template until those versions change.
+    """
+    if panel not in DASHBOARD_PANELS:
+        raise Http404('No such panel')
+    roles, needs_team, scopes, panel_context, template = DASHBOARD_PANELS[panel]
+    user = request.user
+    if not user.is_registration_complete or user.role not in roles:
+        return HttpResponseForbidden('Access denied')
+    if needs_team and not user.team_id:
+        raise Http404('No team assigned')
+    
+    context = fragment_context(*scopes(user))
+    etag = quote_etag(f"{panel}.{user.pk}.{context['fragment_version']}")
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        context.update(panel_context(user))
+        response = render(request, template, context)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required
 def doctor_dashboard(request):
@@ -350,7 +486,9 @@ def doctor_dashboard(request):
     recent_injuries = InjuryRecord.objects.filter(
         status__in=['ACTIVE', 'RECOVERING'],
         medical_clearance=False  # Only show injuries that haven't been cleared
-    ).select_related('player', 'injury_type', 'severity').order_by('-reported_date')[:10]
+    ).select_related(
+        'player', 'player__team', 'injury_type', 'body_part', 'severity'
+    ).order_by('-reported_date')[:10]
     
     # Get follow-ups due
     # Exclude injuries that have been medically cleared
@@ -360,18 +498,22 @@ def doctor_dashboard(request):
         follow_up_date__lte=today,
         status__in=['ACTIVE', 'RECOVERING'],
         medical_clearance=False  # Only show injuries that haven't been cleared
-    ).select_related('player', 'injury_type')
+    ).select_related('player', 'player__team', 'injury_type', 'body_part')
     
     # Get pending clearances (injuries marked as RECOVERED but not yet medically cleared)
     pending_clearances = InjuryRecord.objects.filter(
         status='RECOVERED',
         medical_clearance=False
-    ).select_related('player', 'injury_type')
+    ).select_related('player', 'player__team', 'injury_type', 'body_part')
     
+    # The querysets run only when the template's cached fragment has expired
+    # or an injury has changed; "overdue" depends on the day as well
     context = {
         'recent_injuries': recent_injuries,
         'follow_ups_due': follow_ups_due,
         'pending_clearances': pending_clearances,
+        'today': today,
+        **fragment_context(GLOBAL),
     }
     
     return render(request, 'accounts/doctor_dashboard.html', context)
@@ -391,24 +533,26 @@ def player_dashboard(request):
     
     # Get player's injury history
     injuries = InjuryRecord.objects.filter(player=user).select_related(
-        'injury_type', 'severity', 'reported_by'
+        'injury_type', 'body_part', 'severity', 'reported_by'
     ).order_by('-injury_date')
     
     # Get active injuries
     active_injuries = injuries.filter(status='ACTIVE')
     
-    # Get recovery statistics
+    # Get recovery statistics; like the querysets, these are evaluated by the
+    # template only when its cached fragment is rendered again, after an
+    # injury of the team changes or the day (and so "days since") does
     recovered_injuries = injuries.filter(status='RECOVERED')
-    total_injuries = injuries.count()
-    avg_recovery_time = recovered_injuries.aggregate(
-        avg_time=Avg('actual_recovery_time')
-    )['avg_time']
     
     context = {
         'injuries': injuries,
         'active_injuries': active_injuries,
-        'total_injuries': total_injuries,
-        'avg_recovery_time': avg_recovery_time,
+        'total_injuries': injuries.count,
+        'avg_recovery_time': lambda: recovered_injuries.aggregate(
+            avg_time=Avg('actual_recovery_time')
+        )['avg_time'],
+        'today': timezone.now().date(),
+        **fragment_context(*team_scopes(user)),
     }
     
     return render(request, 'accounts/player_dashboard.html', context)
@@ -423,7 +567,7 @@ class InjuryListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         queryset = InjuryRecord.objects.select_related(
-            'player', 'injury_type', 'body_part', 'severity', 'reported_by'
+            'player', 'player__team', 'injury_type', 'body_part', 'severity', 'reported_by'
         ).order_by('-injury_date')
         
         # Apply role-based filtering
@@ -463,6 +607,67 @@ class InjuryListView(LoginRequiredMixin, ListView):
         context['search_form'] = InjurySearchForm(self.request.GET)
         return context
 
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('export') == 'csv':
+            return self.export_csv()
+        return super().get(request, *args, **kwargs)
+
+    def export_csv(self):
+        """Stream the filtered list as CSV without loading it into memory.
+
+        ``iterator()`` reads the rows in ``EXPORT_CHUNK_SIZE`` chunks through a
+        server-side cursor on Postgres, so exporting every injury costs the
+        same memory as exporting one page.
+        """
+        # Plain tuples rather than model instances: several times cheaper per row
+        rows = self.get_queryset().values_list(*INJURY_EXPORT_FIELDS).iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+        statuses = dict(InjuryRecord.STATUS_CHOICES)
+        treatments = dict(InjuryRecord.TREATMENT_CHOICES)
+        writer = csv.writer(_Echo())
+
+        def lines():
+            yield writer.writerow(INJURY_EXPORT_HEADER)
+            for (injury_date, first_name, last_name, team, injury_type, body_part, severity, status,
+                 treatment, estimated, actual, cleared, reporter_first, reporter_last) in rows:
+                yield writer.writerow([
+                    injury_date,
+                    f'{first_name} {last_name}'.strip(),
+                    team or '',
+                    injury_type,
+                    body_part,
+                    severity,
+                    statuses.get(status, status),
+                    treatments.get(treatment, treatment),
+                    estimated,
+                    actual or '',
+                    'Yes' if cleared else 'No',
+                    f'{reporter_first} {reporter_last}'.strip(),
+                ])
+
+        response = StreamingHttpResponse(lines(), content_type='text/csv')
+        filename = f'injuries-{timezone.now():%Y-%m-%d}.csv'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+INJURY_EXPORT_FIELDS = [
+    'injury_date', 'player__first_name', 'player__last_name', 'player__team__name',
+    'injury_type__name', 'body_part__name', 'severity__name', 'status', 'treatment',
+    'estimated_recovery_time', 'actual_recovery_time', 'medical_clearance',
+    'reported_by__first_name', 'reported_by__last_name',
+]
+INJURY_EXPORT_HEADER = [
+    'Injury Date', 'Player', 'Team', 'Injury Type', 'Body Part', 'Severity', 'Status',
+    'Treatment', 'Estimated Recovery (days)', 'Actual Recovery (days)', 'Medical Clearance',
+    'Reported By',
+]
+
+class _Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer"""
+    def write(self, value):
+        return value
+
 class InjuryDetailView(LoginRequiredMixin, DetailView):
     """Detail view for individual injuries"""
     model = InjuryRecord
@@ -471,7 +676,8 @@ class InjuryDetailView(LoginRequiredMixin, DetailView):
     
     def get_queryset(self):
         queryset = InjuryRecord.objects.select_related(
-            'player', 'injury_type', 'body_part', 'severity', 'reported_by'
+            'player', 'player__team', 'player__playerprofile',
+            'injury_type', 'body_part', 'severity', 'reported_by'
         )
         
         # Apply role-based filtering
@@ -497,8 +703,9 @@ class InjuryCreateView(DoctorRequiredMixin, CreateView):
     
     def form_valid(self, form):
         form.instance.reported_by = self.request.user
+        self.object = run_write(form.save)
         messages.success(self.request, 'Injury report created successfully.')
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
     
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -511,6 +718,11 @@ class InjuryUpdateView(DoctorRequiredMixin, UpdateView):
     form_class = InjuryUpdateForm
     template_name = 'injury_tracking/injury_update_form.html'
     
+    def get_queryset(self):
+        return InjuryRecord.objects.select_related(
+            'player', 'injury_type', 'body_part', 'severity', 'reported_by'
+        )
+    
     def form_valid(self, form):
         # Get medical clearance status from form
         medical_clearance = form.cleaned_data.get('medical_clearance', False)
@@ -535,7 +747,8 @@ class InjuryUpdateView(DoctorRequiredMixin, UpdateView):
                 injury.clearance_date = timezone.now().date()
         
         # Save the form (this will save the modified instance)
-        response = super().form_valid(form)
+        self.object = run_write(form.save)
+        response = HttpResponseRedirect(self.get_success_url())
         
         # Prepare success messages
         messages.success(self.request, f'Injury record for {injury.player.get_full_name()} has been updated successfully.')
@@ -548,6 +761,240 @@ class InjuryUpdateView(DoctorRequiredMixin, UpdateView):
         from django.urls import reverse
         return reverse('tracking:injury_detail', kwargs={'pk': self.object.pk})
 
+# Clinic Rounds (batch follow-ups)
+OPEN_INJURY_STATUSES = ['ACTIVE', 'RECOVERING', 'CHRONIC']
+
+def _record_follow_up_round(user, entries):
+    """Create follow-ups for a whole clinic round and propagate status updates.
+
+    ``entries`` are cleaned ``FollowUpRoundForm`` rows. Everything happens in one
+    transaction: one locking read of the injuries, one ``bulk_create`` for the
+    follow-ups and one ``bulk_update`` for the parent records. Raises
+    ``InjuryRecord.DoesNotExist`` (and writes nothing) if an injury is missing.
+    """
+    if not entries:
+        return []
+
+    today = timezone.now().date()
+    now = timezone.now()
+    with transaction.atomic():
+        injuries = InjuryRecord.objects.select_for_update().in_bulk(
+            {entry['injury'] for entry in entries}
+        )
+        missing = {entry['injury'] for entry in entries} - set(injuries)
+        if missing:
+            raise InjuryRecord.DoesNotExist(
+                f"Injury record(s) not found: {', '.join(str(pk) for pk in sorted(missing))}"
+            )
+        previous_cells = {injury_cell(injury) for injury in injuries.values()}
+
+        follow_ups = []
+        for entry in entries:
+            injury = injuries[entry['injury']]
+            status = entry.get('status_update') or injury.status
+            follow_ups.append(InjuryFollowUp(
+                injury=injury,
+                follow_up_date=entry.get('follow_up_date') or today,
+                notes=entry.get('notes') or '',
+                status_update=status,
+                created_by=user,
+            ))
+
+            injury.status = status
+            # Same recovery-time rule as InjuryUpdateView
+            if status == 'RECOVERED' and not injury.actual_recovery_time:
+                recovery_days = (today - injury.injury_date).days
+                if recovery_days > 0:
+                    injury.actual_recovery_time = recovery_days
+
+            # This visit satisfies the due follow-up unless the next one is booked
+            next_date = entry.get('next_follow_up_date')
+            injury.follow_up_required = bool(next_date)
+            if next_date:
+                injury.follow_up_date = next_date
+            # bulk_update() bypasses auto_now
+            injury.updated_at = now
+
+        InjuryFollowUp.objects.bulk_create(follow_ups)
+        InjuryRecord.objects.bulk_update(
+            injuries.values(),
+            ['status', 'actual_recovery_time', 'follow_up_required', 'follow_up_date', 'updated_at'],
+        )
+
+        # The bulk writes send no signals
+        teams = dict(InjuryRecord.objects.filter(pk__in=injuries).values_list('pk', 'player__team_id'))
+        record_changes(
+            [(ChangeLog.INJURY, pk, teams[pk]) for pk in injuries]
+            + [(ChangeLog.FOLLOW_UP, f.pk, teams[f.injury_id]) for f in follow_ups]
+        )
+        invalidate(GLOBAL, *(team_scope(team_id) for team_id in set(teams.values()) if team_id))
+        refresh_cells(previous_cells | {injury_cell(injury) for injury in injuries.values()})
+    return follow_ups
+
+@login_required
+def follow_up_rounds(request):
+    """Clinic rounds sheet: record follow-ups for many open injuries in one post"""
+    if request.user.role not in ['ADMIN', 'DOCTOR']:
+        messages.error(request, "Access denied. Doctor privileges required.")
+        return redirect('dashboard')
+
+    team_filter = None
+    if request.GET.get('team'):
+        try:
+            team_id = int(request.GET['team'])
+        except ValueError:
+            raise Http404('No such team')
+        team_filter = get_object_or_404(Team, id=team_id)
+    # 'due' (default) lists follow-ups due today or overdue; 'open' lists every open injury
+    scope = 'open' if request.GET.get('scope') == 'open' else 'due'
+    today = timezone.now().date()
+
+    open_injuries = InjuryRecord.objects.filter(
+        status__in=OPEN_INJURY_STATUSES,
+        medical_clearance=False
+    ).select_related(
+        'player', 'player__team', 'injury_type', 'body_part', 'severity'
+    ).order_by('player__last_name', 'player__first_name', '-injury_date')
+    if team_filter:
+        open_injuries = open_injuries.filter(player__team=team_filter)
+    if scope == 'due':
+        open_injuries = open_injuries.filter(follow_up_required=True, follow_up_date__lte=today)
+    open_injuries = list(open_injuries)
+
+    if request.method == 'POST':
+        formset = FollowUpRoundFormSet(request.POST)
+        if formset.is_valid():
+            entries = [form.cleaned_data for form in formset if form.has_entry()]
+            try:
+                follow_ups = run_write(_record_follow_up_round, request.user, entries)
+            except InjuryRecord.DoesNotExist as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(request, f'Recorded {len(follow_ups)} follow-up(s).')
+                return redirect(request.get_full_path())
+    else:
+        formset = FollowUpRoundFormSet(initial=[
+            {'injury': injury.pk, 'follow_up_date': today} for injury in open_injuries
+        ])
+
+    # Pair each row with its injury by id so a re-rendered POST keeps its alignment
+    injuries_by_id = {injury.pk: injury for injury in open_injuries}
+    rows = []
+    for form in formset:
+        try:
+            injury = injuries_by_id.get(int(form['injury'].value()))
+        except (TypeError, ValueError):
+            injury = None
+        if injury is not None:
+            rows.append({'injury': injury, 'form': form})
+
+    context = {
+        'formset': formset,
+        'rows': rows,
+        'selected_team': team_filter,
+        'scope': scope,
+        'teams': Team.objects.all(),
+    }
+    return render(request, 'injury_tracking/follow_up_rounds.html', context)
+
+@login_required
+def follow_up_round_api(request):
+    """Record a clinic round posted as JSON: {"follow_ups": [{"injury": 1, ...}, ...]}"""
+    if request.user.role not in ['ADMIN', 'DOCTOR']:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+
+    try:
+        rows = json.loads(request.body).get('follow_ups')
+    except (ValueError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    if not isinstance(rows, list):
+        return JsonResponse({'error': 'Expected a "follow_ups" list'}, status=400)
+
+    entries = []
+    errors = {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[index] = {'__all__': [{'message': 'Expected an object', 'code': 'invalid'}]}
+            continue
+        form = FollowUpRoundForm(data=row)
+        if not form.is_valid():
+            errors[index] = form.errors.get_json_data()
+        elif form.has_entry():
+            entries.append(form.cleaned_data)
+    if errors:
+        return JsonResponse({'error': 'Invalid follow-ups', 'errors': errors}, status=400)
+
+    try:
+        follow_ups = run_write(_record_follow_up_round, request.user, entries)
+    except InjuryRecord.DoesNotExist as exc:
+        return JsonResponse({'error': str(exc)}, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'created': len(follow_ups),
+        'ids': [follow_up.id for follow_up in follow_ups],
+    })
+
+# Live updates (server-sent events)
+async def change_stream(request):
+    """Push injury, follow-up and event changes for the viewer's teams as server-sent events.
+
+    Each event carries a ``/api/changes/`` entry, with the change sequence as
+    its id, so a reconnecting ``EventSource`` resumes from ``Last-Event-ID``.
+    The loop polls the ``changes`` version counter in the shared cache and
+    only reads the change log when it moves. Connections close after
+    ``CHANGE_STREAM_MAX_SECONDS`` and the browser reconnects. Needs the ASGI
+    server: under WSGI the stream would hold a worker thread for its lifetime.
+    """
+    user = await request.auser()
+    if not user.is_authenticated or user.role not in ['ADMIN', 'COACH', 'DOCTOR']:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Live updates need the ASGI server'}, status=503)
+
+    team_ids = await sync_to_async(user.visible_team_ids)()
+    try:
+        since = int(request.headers.get('Last-Event-ID') or request.GET.get('since') or -1)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    if since < 0:
+        since = await sync_to_async(latest_change_id)()
+
+    async def events():
+        cursor = since
+        seen_version = None
+        last_sent = time.monotonic()
+        deadline = last_sent + settings.CHANGE_STREAM_MAX_SECONDS
+        yield f'retry: {settings.CHANGE_STREAM_RETRY_MS}\n\n'
+        while time.monotonic() < deadline:
+            [version] = await sync_to_async(data_versions)(CHANGES)
+            if version != seen_version:
+                try:
+                    page = await sync_to_async(change_page)(cursor, settings.CHANGE_FEED_PAGE_SIZE, team_ids)
+                except CursorTooOld:
+                    yield 'event: resync\ndata: {}\n\n'
+                    return
+                for change in page['changes']:
+                    yield f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change)}\n\n"
+                    last_sent = time.monotonic()
+                cursor = page['next']
+                if page['more']:
+                    continue
+                seen_version = version
+            if time.monotonic() - last_sent >= settings.CHANGE_STREAM_KEEPALIVE_SECONDS:
+                # Comment line: keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+                last_sent = time.monotonic()
+            await asyncio.sleep(settings.CHANGE_STREAM_POLL_SECONDS)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 # Analytics Views
 @login_required
 def analytics_dashboard(request):
@@ -563,98 +1010,134 @@ def analytics_dashboard(request):
     # Get current year
     current_year = timezone.now().year
     
-    # Get team filter
+    # Get team filter; coaches see their own team only
     team_filter = None
-    if request.user.role == 'COACH' and request.user.team:
+    if request.user.role == 'COACH':
         team_filter = request.user.team
+        if not team_filter:
+            messages.error(request, "No team assigned. Please contact administrator.")
+            return redirect('dashboard')
     elif request.GET.get('team'):
         team_filter = get_object_or_404(Team, id=request.GET.get('team'))
     
-    # Build base queryset
-    if team_filter:
-        injuries_queryset = InjuryRecord.objects.filter(player__team=team_filter)
-    else:
-        injuries_queryset = InjuryRecord.objects.all()
-    
-    # Monthly injury trends
-    monthly_data = []
-    for month in range(1, 13):
-        month_injuries = injuries_queryset.filter(
-            injury_date__year=current_year,
-            injury_date__month=month
-        ).count()
-        monthly_data.append({
-            'month': month,
-            'count': month_injuries
-        })
-    
-    # Injury type distribution
-    injury_type_data = injuries_queryset.values('injury_type__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    
-    # Body part distribution
-    body_part_data = injuries_queryset.values('body_part__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    
-    # Severity distribution
-    severity_data = injuries_queryset.values('severity__name', 'severity__color_code').annotate(
-        count=Count('id')
-    ).order_by('-count')
-    
-    # Recovery time analysis
-    recovered_injuries = injuries_queryset.filter(
-        status='RECOVERED',
-        actual_recovery_time__isnull=False
-    )
-    avg_recovery_time = recovered_injuries.aggregate(avg_time=Avg('actual_recovery_time'))['avg_time']
+    # The charts fetch their data from analytics_data once the page is shown:
+    # this year's monthly trend, and the all-time distributions, summary and
+    # recovery-time statistics
+    data_url = reverse('tracking:analytics_data')
+    team_param = {'team': team_filter.pk} if team_filter else {}
+    trend_url = data_url + '?' + urlencode({
+        **team_param, 'dimensions': 'period', 'granularity': 'month',
+        'start': f'{current_year}-01-01', 'end': f'{current_year}-12-31',
+    })
+    breakdown_url = data_url + '?' + urlencode({
+        **team_param, 'dimensions': 'injury_type,body_part,severity,recovery',
+    })
     
-    # Team comparison (for admins)
     team_comparison = []
+    teams = None
     if request.user.role == 'ADMIN':
-        for team in Team.objects.all():
-            team_injuries = InjuryRecord.objects.filter(player__team=team)
-            team_comparison.append({
-                'team': team.name,
-                'total_injuries': team_injuries.count(),
-                'active_injuries': team_injuries.filter(status='ACTIVE').count(),
-                'recovered_injuries': team_injuries.filter(status='RECOVERED').count(),
-            })
+        # Team comparison and filter (for admins), shared with the admin dashboard
+        team_stats = cached('admin_team_stats', [GLOBAL], team_injury_stats)
+        team_comparison = [
+            {
+                'team': stats['team'].name,
+                'total_injuries': stats['total_injuries'],
+                'active_injuries': stats['active_injuries'],
+                'recovered_injuries': stats['recovered_injuries'],
+            }
+            for stats in team_stats
+        ]
+        teams = [stats['team'] for stats in team_stats]
     
     context = {
-        'monthly_data': json.dumps(monthly_data),
-        'injury_type_data': json.dumps(list(injury_type_data)),
-        'body_part_data': json.dumps(list(body_part_data)),
-        'severity_data': json.dumps(list(severity_data)),
-        'avg_recovery_time': avg_recovery_time,
+        'trend_url': trend_url,
+        'breakdown_url': breakdown_url,
         'team_comparison': team_comparison,
         'current_year': current_year,
         'selected_team': team_filter,
-        'teams': Team.objects.all() if request.user.role == 'ADMIN' else None,
+        'teams': teams,
     }
     
     return render(request, 'injury_tracking/analytics.html', context)
 
+@login_required
+async def analytics_data(request):
+    """Analytics chart data as compact columnar JSON (see analytics.py).
+
+    Served with an ETag of the data versions it covers and ``no-cache``, so
+    the browser keeps the body and revalidates it with a 304 until an
+    injury, player or team it counts changes.
+    """
+    user = await request.auser()
+    if not user.is_registration_complete or user.role not in ['ADMIN', 'COACH']:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    form = AnalyticsQueryForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid parameters', 'fields': form.errors}, status=400)
+    query = form.cleaned_data
+    
+    # Coaches see their own team only
+    if user.role == 'COACH':
+        if not user.team_id or query['team'] not in (None, user.team_id):
+            return JsonResponse({'error': 'Access denied'}, status=403)
+        query['team'] = user.team_id
+    elif query['team'] and not await Team.objects.filter(pk=query['team']).aexists():
+        return JsonResponse({'error': 'No such team'}, status=404)
+    
+    etag = await sync_to_async(analytics_etag)(query)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(
+            await sync_to_async(chart_data)(query),
+            # No spaces after separators; the columns are the bulk of the body
+            json_dumps_params={'separators': (',', ':')},
+        )
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@login_required
+async def recovery_estimate(request):
+    """Suggested recovery time for the injury being reported (see recovery.py).
+
+    Answers ``{"estimate": null}`` while there are too few similar recoveries.
+    """
+    user = await request.auser()
+    if user.role not in ['ADMIN', 'DOCTOR']:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    form = RecoveryEstimateForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': 'Invalid parameters', 'fields': form.errors}, status=400)
+    
+    estimate = await sync_to_async(suggested_recovery)(**form.cleaned_data)
+    return JsonResponse({'estimate': estimate})
+
 # API Views for AJAX
 @login_required
-def get_player_injuries(request, player_id):
+async def get_player_injuries(request, player_id):
     """Get player's injury history for AJAX requests"""
-    if request.user.role not in ['ADMIN', 'COACH', 'DOCTOR']:
+    user = await request.auser()
+    if user.role not in ['ADMIN', 'COACH', 'DOCTOR']:
         return JsonResponse({'error': 'Access denied'}, status=403)
     
-    player = get_object_or_404(CustomUser, id=player_id, role='PLAYER')
+    player = await aget_object_or_404(CustomUser.objects.only('id', 'team_id'), id=player_id, role='PLAYER')
     
     # Check permissions
-    if request.user.role == 'COACH' and request.user.team != player.team:
+    if user.role == 'COACH' and user.team_id != player.team_id:
         return JsonResponse({'error': 'Access denied'}, status=403)
     
+    return JsonResponse({'injuries': await player_injury_history(player)})
+
+async def player_injury_history(player):
+    """A player's injuries, newest first, as JSON-ready dicts"""
     injuries = InjuryRecord.objects.filter(player=player).select_related(
-        'injury_type', 'severity'
+        'injury_type', 'body_part', 'severity'
     ).order_by('-injury_date')
     
     data = []
-    for injury in injuries:
+    async for injury in injuries:
         data.append({
             'id': injury.id,
             'injury_type': injury.injury_type.name,
@@ -665,8 +1148,23 @@ def get_player_injuries(request, player_id):
             'description': injury.description,
             'color_code': injury.severity.color_code,
         })
+    return data
+
+def set_injury_status(injury, new_status):
+    """Set ``injury.status`` (unsaved); recovering clears the player medically"""
+    injury.status = new_status
     
-    return JsonResponse({'injuries': data})
+    # When marking as recovered, automatically set medical clearance
+    if new_status == 'RECOVERED':
+        injury.medical_clearance = True
+        if not injury.clearance_date:
+            injury.clearance_date = timezone.now().date()
+        
+        # Calculate actual recovery time if not set
+        if not injury.actual_recovery_time:
+            recovery_days = (timezone.now().date() - injury.injury_date).days
+            if recovery_days > 0:
+                injury.actual_recovery_time = recovery_days
 
 @login_required
 def update_injury_status(request, injury_id):
@@ -679,21 +1177,8 @@ def update_injury_status(request, injury_id):
     if request.method == 'POST':
         new_status = request.POST.get('status')
         if new_status in dict(InjuryRecord.STATUS_CHOICES):
-            injury.status = new_status
-            
-            # When marking as recovered, automatically set medical clearance
-            if new_status == 'RECOVERED':
-                injury.medical_clearance = True
-                if not injury.clearance_date:
-                    injury.clearance_date = timezone.now().date()
-                
-                # Calculate actual recovery time if not set
-                if not injury.actual_recovery_time:
-                    recovery_days = (timezone.now().date() - injury.injury_date).days
-                    if recovery_days > 0:
-                        injury.actual_recovery_time = recovery_days
-            
-            injury.save()
+            set_injury_status(injury, new_status)
+            run_write(injury.save)
             return JsonResponse({'success': True, 'status': new_status})
     
     return JsonResponse({'error': 'Invalid request'}, status=400)
@@ -718,7 +1203,7 @@ def mark_as_recovered(request, injury_id):
             if recovery_days > 0:
                 injury.actual_recovery_time = recovery_days
         
-        injury.save()
+        run_write(injury.save)
         messages.success(request, f'Injury for {injury.player.get_full_name()} has been marked as recovered with medical clearance.')
         return redirect('tracking:injury_detail', pk=injury.id)
     
@@ -735,7 +1220,7 @@ def delete_injury(request, injury_id):
     player_name = injury.player.get_full_name()
     
     if request.method == 'POST':
-        injury.delete()
+        run_write(injury.delete)
         messages.success(request, f'Injury record for {player_name} has been deleted.')
         return redirect('tracking:injury_list')
     
@@ -0,0 +1,218 @@
+"""Shared cache backend stored in a local SQLite file.
+
+Every gunicorn worker on the host opens the same file, so a value computed by
+one worker is served to all of them and a deleted key or bumped version is
+seen everywhere at once, without running Redis or memcached:
+
+* integers are stored as SQLite integers, so ``incr``/``decr`` are a single
+  ``UPDATE ... RETURNING`` and stay atomic across processes (the data-version
+  counters in ``injury_tracking.caching`` rely on this);
+* ``add`` is a single upsert that only replaces an expired row;
+* expired rows are never returned and are purged when the table is culled;
+  beyond ``MAX_ENTRIES`` the least recently used ``1/CULL_FREQUENCY`` of the
+  rows is evicted. To keep reads from writing, the access time is refreshed at
+  most every ``ACCESS_RESOLUTION`` seconds (OPTIONS, default 60), so the LRU
+  order is approximate at that granularity.
+
+Other values are pickled, as with Django's database and file caches, so the
+file must be writable only by the application user (it is created 0600).
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from lancer_project.db.sqlite3.base import apply_pragmas
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+"""
+# Losing the last moments of cache writes in a power cut is harmless
+PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'OFF', 'busy_timeout': 5000}
+# Keys per statement in get_many/delete_many, below SQLite's variable limit
+CHUNK_SIZE = 500
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = str(location)
+        options = params.get('OPTIONS', {})
+        self.access_resolution = options.get('ACCESS_RESOLUTION', 60)
+        self._local = threading.local()
+
+    # Connections
+
+    def _connection(self):
+        # One connection per thread, reopened in a forked worker
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            if not os.path.exists(self.path):
+                os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            apply_pragmas(conn, PRAGMAS)
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Encoding
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        return {key_map[key]: value for key, value in self._get_many(list(key_map)).items()}
+
+    def _get_many(self, keys):
+        conn = self._connection()
+        now = time.time()
+        found, stale = {}, []
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[start:start + CHUNK_SIZE]
+            rows = conn.execute(
+                f"SELECT key, value, accessed FROM cache WHERE key IN ({', '.join('?' * len(chunk))}) "
+                f"AND (expires IS NULL OR expires > ?)",
+                [*chunk, now],
+            ).fetchall()
+            for key, value, accessed in rows:
+                found[key] = self._decode(value)
+                if now - accessed > self.access_resolution:
+                    stale.append((now, key))
+        if stale:
+            conn.executemany('UPDATE cache SET accessed = ? WHERE key = ?', stale)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._set_many({key: value}, self.get_backend_timeout(timeout))
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        data = {self.make_and_validate_key(key, version=version): value for key, value in data.items()}
+        self._set_many(data, self.get_backend_timeout(timeout))
+        return []
+
+    def _set_many(self, data, expires):
+        conn = self._connection()
+        now = time.time()
+        if expires is not None and expires <= now:
+            self._delete_many(list(data))
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires, accessed = excluded.accessed',
+                [(key, self._encode(value), expires, now) for key, value in data.items()],
+            )
+            self._cull(conn, now)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires = excluded.expires, accessed = excluded.accessed '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= excluded.accessed',
+            (key, self._encode(value), expires, now),
+        )
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "UPDATE cache SET value = value + ?, accessed = ? WHERE key = ? AND typeof(value) = 'integer' "
+            "AND (expires IS NULL OR expires > ?) RETURNING value",
+            (delta, now, key, now),
+        ).fetchone()
+        if row is None:
+            if self._has_key(key):
+                raise TypeError(f"Value for key '{key}' is not an integer.")
+            raise ValueError(f"Key '{key}' not found.")
+        return row[0]
+
+    def has_key(self, key, version=None):
+        return self._has_key(self.make_and_validate_key(key, version=version))
+
+    def _has_key(self, key):
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        return self._delete_many([self.make_and_validate_key(key, version=version)])
+
+    def delete_many(self, keys, version=None):
+        self._delete_many([self.make_and_validate_key(key, version=version) for key in keys])
+
+    def _delete_many(self, keys):
+        conn = self._connection()
+        deleted = 0
+        for start in range(0, len(keys), CHUNK_SIZE):
+            chunk = keys[start:start + CHUNK_SIZE]
+            deleted += conn.execute(
+                f"DELETE FROM cache WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+            ).rowcount
+        return bool(deleted)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are per thread and kept between requests
+        pass
+
+    def _cull(self, conn, now):
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        count -= conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (now,)).rowcount
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            conn.execute('DELETE FROM cache')
+            return
+        conn.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
@@ -0,0 +1,266 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.sessions import middleware as session_middleware
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .nplusone import NPlusOneError, RepeatedQueryDetector, describe, is_allowed
+from .write_queue import WriteTimeout
+
+logger = logging.getLogger('lancer.performance')
+
+# Longest SQL text kept for the "slowest statement" field
+SLOW_SQL_MAX_LENGTH = 500
+
+
+class QueryStats:
+    """Execute wrapper that tallies the queries issued while it is installed.
+
+    Only the parameterised SQL is kept, never the parameters, so medical data
+    does not end up in the logs. Dashboard panels running in other threads
+    share the request's instance, so the tally is locked.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql = ''
+        self.slowest_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.count += 1
+                self.duration += elapsed
+                if elapsed >= self.slowest_duration:
+                    self.slowest_duration = elapsed
+                    self.slowest_sql = sql[:SLOW_SQL_MAX_LENGTH]
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+    @property
+    def slowest_ms(self):
+        return self.slowest_duration * 1000
+
+
+def wrap_connections(wrapper):
+    """An ``ExitStack`` with ``wrapper`` installed on every connection"""
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(wrapper))
+    return stack
+
+
+async def await_wrapped(wrapper, get_response, request):
+    """Await ``get_response(request)`` with ``wrapper`` on the connections it queries.
+
+    Connections belong to threads, and an async request's queries run on the
+    thread that thread-sensitive ``sync_to_async`` hands them to, not on the
+    event loop's, so the wrapper is installed and removed on that thread.
+    """
+    stack = await sync_to_async(wrap_connections)(wrapper)
+    try:
+        return await get_response(request)
+    finally:
+        await sync_to_async(stack.close)()
+
+
+def get_query_budget(view_name):
+    """Return the (max_queries, max_sql_ms) budget configured for a view.
+
+    ``QUERY_BUDGETS`` maps view names (``'tracking:coach_dashboard'``) to either
+    a query count or a dict with ``queries`` and/or ``sql_ms`` keys. Views that
+    are not listed fall back to ``QUERY_BUDGET_DEFAULT``.
+    """
+    budgets = getattr(settings, 'QUERY_BUDGETS', {})
+    budget = budgets.get(view_name, getattr(settings, 'QUERY_BUDGET_DEFAULT', None))
+    if budget is None:
+        return None, None
+    if isinstance(budget, int):
+        return budget, None
+    return budget.get('queries'), budget.get('sql_ms')
+
+
+class QueryInstrumentationMiddleware:
+    """Record query count, SQL time and the slowest statement for every request.
+
+    The numbers are logged on the ``lancer.performance`` logger (as ``extra``
+    fields for structured handlers), exposed in a ``Server-Timing`` header and
+    checked against the per-view budgets from ``QUERY_BUDGETS``.
+
+    Like the other project middleware it runs in the handler's mode, so under
+    ASGI an async view is awaited without a hop through a thread; only
+    installing the query wrapper hops to the thread that runs the queries.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', True):
+            return self.get_response(request)
+
+        stats = QueryStats()
+        start = time.perf_counter()
+        with wrap_connections(stats):
+            response = self.get_response(request)
+        return self.record(request, response, stats, start)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', True):
+            return await self.get_response(request)
+
+        stats = QueryStats()
+        start = time.perf_counter()
+        response = await await_wrapped(stats, self.get_response, request)
+        return self.record(request, response, stats, start)
+
+    def record(self, request, response, stats, start):
+        total_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else request.path
+        request.query_stats = stats
+
+        record = {
+            'view': view_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.count,
+            'sql_ms': round(stats.duration_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'slowest_sql_ms': round(stats.slowest_ms, 2),
+            'slowest_sql': stats.slowest_sql,
+        }
+        logger.info(
+            'view=%s method=%s status=%s queries=%d sql_ms=%.2f total_ms=%.2f',
+            view_name, request.method, response.status_code,
+            stats.count, stats.duration_ms, total_ms,
+            extra=record,
+        )
+
+        max_queries, max_sql_ms = get_query_budget(view_name)
+        if (max_queries is not None and stats.count > max_queries) or \
+                (max_sql_ms is not None and stats.duration_ms > max_sql_ms):
+            logger.warning(
+                'Query budget exceeded for %s: %d queries (budget %s), %.2f ms SQL (budget %s); slowest: %s',
+                view_name, stats.count, max_queries, stats.duration_ms, max_sql_ms, stats.slowest_sql,
+                extra=dict(record, budget_queries=max_queries, budget_sql_ms=max_sql_ms),
+            )
+
+        if getattr(settings, 'QUERY_INSTRUMENTATION_SERVER_TIMING', True):
+            timing = (
+                f'db;dur={stats.duration_ms:.2f};desc="{stats.count} queries", '
+                f'app;dur={total_ms:.2f}'
+            )
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+        return response
+
+
+class NPlusOneDetectionMiddleware:
+    """Flag statements repeated with different parameters within one request.
+
+    Enabled by ``NPLUSONE_DETECTION`` (on in development). Findings are logged
+    as warnings with their Python and template call sites; with
+    ``NPLUSONE_RAISE`` (set by the test runner) they raise ``NPlusOneError`` so
+    the test exercising the view fails. ``NPLUSONE_ALLOWLIST`` silences known
+    cases by view name or call site.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'NPLUSONE_DETECTION', False):
+            return self.get_response(request)
+
+        detector = RepeatedQueryDetector()
+        with wrap_connections(detector):
+            response = self.get_response(request)
+        return self.report(request, response, detector)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'NPLUSONE_DETECTION', False):
+            return await self.get_response(request)
+
+        detector = RepeatedQueryDetector()
+        response = await await_wrapped(detector, self.get_response, request)
+        return self.report(request, response, detector)
+
+    def report(self, request, response, detector):
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else request.path
+        threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 3)
+        problems = [
+            finding for finding in detector.findings(threshold)
+            if not is_allowed(view_name, finding)
+        ]
+        for finding in problems:
+            logger.warning(describe(view_name, finding), extra=dict(finding, view=view_name))
+        if problems and getattr(settings, 'NPLUSONE_RAISE', False):
+            raise NPlusOneError('\n'.join(describe(view_name, finding) for finding in problems))
+        return response
+
+
+def is_session_exempt(path):
+    return any(path.startswith(prefix) for prefix in getattr(settings, 'SESSION_EXEMPT_PATHS', ()))
+
+
+class SessionMiddleware(session_middleware.SessionMiddleware):
+    """Django's session middleware, without sessions for ``SESSION_EXEMPT_PATHS``.
+
+    Static files and health checks get an empty session that is never loaded
+    or saved, even when the browser sends a session cookie, so they cost no
+    session lookup and their responses carry no session cookie or
+    ``Vary: Cookie``. The user on those requests is anonymous.
+    """
+
+    def process_request(self, request):
+        if is_session_exempt(request.path_info):
+            request.session = self.SessionStore()
+            request.session_exempt = True
+            return
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        if getattr(request, 'session_exempt', False):
+            return response
+        return super().process_response(request, response)
+
+
+class WriteTimeoutMiddleware(MiddlewareMixin):
+    """Answer a write the queue gave up on with a 503 instead of a 500"""
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, WriteTimeout):
+            return HttpResponse(str(exception), status=503, content_type='text/plain', headers={'Retry-After': '5'})
+        return None
@@ -0,0 +1,151 @@
+"""Repeated-query (N+1) detection for development, staging and tests.
+
+Every statement executed during a request is fingerprinted (parameters and
+literal numbers stripped, ``IN`` lists collapsed). A fingerprint that runs
+``NPLUSONE_THRESHOLD`` or more times with different parameters is reported
+together with the Python line and the template variable that triggered it.
+"""
+import re
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+
+import django
+from django.conf import settings
+
+DJANGO_DIR = str(Path(django.__file__).resolve().parent)
+# Instrumentation lives here too; its frames are never the culprit
+PROJECT_INFRA_DIR = str(Path(__file__).resolve().parent)
+
+_IN_LIST = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class NPlusOneError(AssertionError):
+    """Raised in strict mode (the test runner) when a request has an N+1."""
+
+
+def fingerprint(sql):
+    """Normalise a statement so that queries differing only by values collide"""
+    sql = _IN_LIST.sub('(...)', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _freeze(params):
+    try:
+        hash(params)
+        return params
+    except TypeError:
+        return repr(params)
+
+
+def find_call_site():
+    """Return ``(python_site, template_site)`` for the query being executed.
+
+    ``python_site`` is the innermost project line outside Django, e.g.
+    ``injury_tracking/views.py:312 in coach_dashboard``. ``template_site`` is
+    the innermost template tag/variable being rendered, e.g.
+    ``accounts/coach_dashboard.html:142 {{ player_data.total_injuries }}``.
+    """
+    base_dir = str(settings.BASE_DIR)
+    python_site = test_site = None
+    template_name = template_line = tag = variable = None
+
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(DJANGO_DIR):
+            node = frame.f_locals.get('self')
+            if variable is None and frame.f_code.co_name == '_resolve_lookup':
+                variable = getattr(node, 'var', None)
+            elif template_name is None and frame.f_code.co_name == 'render_annotated':
+                origin = getattr(node, 'origin', None)
+                token = getattr(node, 'token', None)
+                if origin is not None and token is not None:
+                    template_name = origin.template_name or origin.name
+                    template_line = token.lineno
+                    tag = token.contents
+        elif filename.startswith(base_dir) and not filename.startswith(PROJECT_INFRA_DIR) \
+                and 'site-packages' not in filename:
+            relative = Path(filename).relative_to(base_dir).as_posix()
+            site = f'{relative}:{frame.f_lineno} in {frame.f_code.co_name}'
+            # Prefer application code over the test that drove the request;
+            # the frames outside the test belong to the test runner
+            if Path(filename).name.startswith('test'):
+                test_site = site
+                break
+            if python_site is None:
+                python_site = site
+        frame = frame.f_back
+    python_site = python_site or test_site
+
+    template_site = None
+    if template_name:
+        template_site = f'{template_name}:{template_line}'
+        if variable:
+            template_site += f' {{{{ {variable} }}}}'
+        elif tag:
+            template_site += f' {{% {tag} %}}'
+    return python_site, template_site
+
+
+class RepeatedQueryDetector:
+    """Execute wrapper that groups the statements of one request by fingerprint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.params = {}
+        self.sites = {}
+        self.sql = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        site = find_call_site()
+        with self.lock:
+            self.counts[key] += 1
+            self.params.setdefault(key, set()).add(_freeze(params))
+            self.sql.setdefault(key, sql)
+            # The first execution is often a legitimate one-off (e.g. loading
+            # request.user); the site that repeats most is the one to report
+            self.sites.setdefault(key, Counter())[site] += 1
+        return execute(sql, params, many, context)
+
+    def findings(self, threshold):
+        """Statements repeated ``threshold``+ times with differing parameters"""
+        results = []
+        for key, count in self.counts.most_common():
+            if count < threshold:
+                break
+            if len(self.params[key]) < 2:
+                continue
+            (python_site, template_site), _ = self.sites[key].most_common(1)[0]
+            results.append({
+                'count': count,
+                'sql': self.sql[key][:300],
+                'python_site': python_site,
+                'template_site': template_site,
+            })
+        return results
+
+
+def is_allowed(view_name, finding):
+    """True when ``NPLUSONE_ALLOWLIST`` names the view or one of the call sites"""
+    for entry in getattr(settings, 'NPLUSONE_ALLOWLIST', []):
+        if entry == view_name:
+            return True
+        for site in (finding['python_site'], finding['template_site']):
+            if site and entry in site:
+                return True
+    return False
+
+
+def describe(view_name, finding):
+    sites = ' / '.join(site for site in (finding['python_site'], finding['template_site']) if site)
+    return (
+        f"N+1 suspected in {view_name}: {finding['count']} similar queries "
+        f"from {sites or 'unknown call site'}: {finding['sql']}"
+    )
@@ -0,0 +1,129 @@
+"""Primary/replica routing for read-heavy views.
+
+``ReplicaRoutingMiddleware`` marks GET/HEAD requests to the views named in
+``REPLICA_VIEWS`` (analytics, dashboards, feeds, exports) and
+``PrimaryReplicaRouter`` sends their reads to the ``DATABASE_REPLICA`` alias.
+Everything else, and every write, stays on the primary.
+
+Read-your-writes: any unsafe request (POST, PUT, PATCH, DELETE) sets a short
+``REPLICA_PIN_SECONDS`` cookie, and requests carrying it read from the
+primary, so a doctor who saves an injury sees it on the next dashboard even
+while the replica lags. Sessions are always read from the primary, and so is
+anything read inside a transaction.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'lancer_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Apps whose rows must never be read stale
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_read_from_replica = contextvars.ContextVar('read_from_replica', default=False)
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica"""
+    return getattr(settings, 'DATABASE_REPLICA', None)
+
+
+def replica_reads_allowed():
+    """True when the current request has been cleared to read from the replica"""
+    return _read_from_replica.get()
+
+
+@contextmanager
+def replica_reads(allowed):
+    """Carry a request's replica decision into code running in another thread"""
+    token = _read_from_replica.set(allowed)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def use_replica_for(request):
+    """True when this request's reads may be served by the replica"""
+    match = getattr(request, 'resolver_match', None)
+    return bool(
+        replica_alias()
+        and request.method in ('GET', 'HEAD')
+        and match is not None
+        and match.view_name in getattr(settings, 'REPLICA_VIEWS', ())
+        and PIN_COOKIE not in request.COOKIES
+    )
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if (
+            alias
+            and _read_from_replica.get()
+            and model._meta.app_label not in PRIMARY_ONLY_APPS
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether reads may go to the replica, and pin writers.
+
+    The decision is made in ``process_view``, once the URL has been resolved,
+    and lives in a context variable, so it is per thread (or task) and is
+    cleared when the response leaves.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _read_from_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        return self.pin_writer(request, response)
+
+    async def __acall__(self, request):
+        token = _read_from_replica.set(False)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_from_replica.reset(token)
+        return self.pin_writer(request, response)
+
+    def pin_writer(self, request, response):
+        if request.method not in SAFE_METHODS and replica_alias():
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 15),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if use_replica_for(request):
+            _read_from_replica.set(True)
+        return None
@@ -0,0 +1,95 @@
+"""Session engine that serves sessions from the shared cache and writes behind.
+
+Django's ``cached_db`` engine reads sessions from the cache but still writes
+every modified session to the database inside the request. This engine
+keeps the cache as the copy that requests read and write, and only writes
+sessions created in the current request (logins) to the database straight
+away. Later changes are
+queued in the process and written in one batch when a request finishes and
+``SESSION_WRITE_BEHIND_SECONDS`` have passed since the last batch, after the
+response has gone out.
+
+The database copy is the fallback for a session the cache has evicted, so
+it can lag by up to one interval; a change is only lost if the process dies
+before its batch and the cache evicts the session too. Deleting a session
+(logout) is immediate everywhere. ``SESSION_WRITE_BEHIND_SECONDS = 0``
+writes through on every save, as ``cached_db`` does.
+
+Use it with ``SESSION_ENGINE = 'lancer_project.sessions'``.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core.signals import request_finished
+
+from lancer_project.write_queue import run_write
+
+logger = logging.getLogger('django.contrib.sessions')
+
+_pending = {}
+_pending_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def write_behind_seconds():
+    return getattr(settings, 'SESSION_WRITE_BEHIND_SECONDS', 30)
+
+
+class SessionStore(CachedDBStore):
+    _created = False
+
+    def create(self):
+        super().create()
+        self._created = True
+
+    def save(self, must_create=False):
+        # A session created in this request (a login fills it in right after
+        # cycling the key) is written through, so logins are always durable
+        if must_create or self.session_key is None or self._created or write_behind_seconds() <= 0:
+            return super().save(must_create)
+        data = self._get_session()
+        self._cache.set(self.cache_key, data, self.get_expiry_age())
+        with _pending_lock:
+            _pending[self.session_key] = (self.encode(data), self.get_expiry_date())
+
+    def delete(self, session_key=None):
+        with _pending_lock:
+            _pending.pop(session_key or self.session_key, None)
+        super().delete(session_key)
+
+
+def flush_pending(force=False, **kwargs):
+    """Write the queued session changes to the database, if an interval has passed"""
+    global _last_flush
+    now = time.monotonic()
+    with _pending_lock:
+        if not _pending or (not force and now - _last_flush < write_behind_seconds()):
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+        _last_flush = now
+    try:
+        return run_write(_write_sessions, batch)
+    except Exception:
+        logger.exception('Writing %d sessions to the database failed; retrying later', len(batch))
+        with _pending_lock:
+            # Keep any newer change made while the batch was being written
+            for key, value in batch.items():
+                _pending.setdefault(key, value)
+        return 0
+
+
+def _write_sessions(batch):
+    model = SessionStore.get_model_class()
+    # Sessions deleted since they were queued stay deleted
+    sessions = model.objects.in_bulk(list(batch))
+    for key, session in sessions.items():
+        session.session_data, session.expire_date = batch[key]
+    model.objects.bulk_update(sessions.values(), ['session_data', 'expire_date'])
+    return len(sessions)
+
+
+request_finished.connect(flush_pending, dispatch_uid='lancer_project.sessions.flush_pending')
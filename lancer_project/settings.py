@@ -1,6 +1,8 @@
 import os
 from pathlib import Path
 
+from decouple import config
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'dev-secret-key-change-me'
@@ -23,17 +25,33 @@ INSTALLED_APPS = [
     'accounts',
     'injuries',
     'injury_tracking',
+    'api',
 ]
 
 MIDDLEWARE = [
+    'lancer_project.middleware.QueryInstrumentationMiddleware',
+    'lancer_project.middleware.NPlusOneDetectionMiddleware',
+    'api.middleware.ApiDispatchMiddleware',
+    'lancer_project.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'lancer_project.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'lancer_project.middleware.WriteTimeoutMiddleware',
+]
+
+# Requests under API_PREFIX leave MIDDLEWARE at ApiDispatchMiddleware and run
+# through API_MIDDLEWARE only: bearer-token auth, no sessions, CSRF or messages
+API_PREFIX = '/api/'
+API_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'api.middleware.TokenAuthenticationMiddleware',
 ]
+# Seconds an API token is valid; clients refresh it at /api/token/refresh/
+API_TOKEN_MAX_AGE = config('API_TOKEN_MAX_AGE', default=3600, cast=int)
 
 ROOT_URLCONF = 'lancer_project.urls'
 
@@ -55,13 +73,154 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'lancer_project.wsgi.application'
 
-DATABASES = {
+# Database profile, read from the environment or a .env file:
+# DB_ENGINE=sqlite (default) or DB_ENGINE=postgres for production.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='lancer'),
+            'USER': config('DB_USER', default='lancer'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # Persistent connections, reused across requests for up to this many
+            # seconds and health-checked before reuse
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=600, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            # PgBouncer in transaction pooling mode cannot hold the server-side
+            # cursors that exports stream through
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_PGBOUNCER', default=False, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+                'sslmode': config('DB_SSLMODE', default='prefer'),
+                'application_name': 'lancer',
+            },
+            'TEST': {
+                'NAME': config('DB_TEST_NAME', default='test_lancer'),
+            },
+        }
+    }
+    if config('DB_POOL', default=False, cast=bool):
+        # Driver-side pool instead of persistent connections; needs psycopg 3
+        # (pip install "psycopg[binary,pool]")
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+else:
+    # lancer_project.db.sqlite3 applies WAL, busy_timeout, synchronous, mmap and
+    # cache pragmas to every connection (see DEFAULT_PRAGMAS there); override
+    # them with OPTIONS['pragmas'], e.g. {'mmap_size': 0}
+    DATABASES = {
+        'default': {
+            'ENGINE': 'lancer_project.db.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                'pragmas': {
+                    'busy_timeout': config('SQLITE_BUSY_TIMEOUT_MS', default=5000, cast=int),
+                },
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+
+# Optional read replica for analytics, dashboards, feeds and exports (see
+# lancer_project.routers). On Postgres set DB_REPLICA_HOST (and DB_REPLICA_PORT /
+# DB_REPLICA_NAME if they differ from the primary). On SQLite, DB_REPLICA_NAME
+# names a second database file; that is a stand-in for trying the routing
+# locally, and it gets its own test database so tests can observe replica lag.
+DATABASE_REPLICA = None
+if DB_ENGINE == 'postgres' and config('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': config('DB_REPLICA_HOST'),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'OPTIONS': {**DATABASES['default']['OPTIONS'], 'application_name': 'lancer-replica'},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICA = 'replica'
+elif DB_ENGINE != 'postgres' and config('DB_REPLICA_NAME', default=''):
+    DATABASES['replica'] = {**DATABASES['default'], 'NAME': config('DB_REPLICA_NAME')}
+    DATABASE_REPLICA = 'replica'
+
+DATABASE_ROUTERS = ['lancer_project.routers.PrimaryReplicaRouter']
+# GET/HEAD requests to these views read from the replica
+REPLICA_VIEWS = [
+    'tracking:admin_dashboard',
+    'tracking:coach_dashboard',
+    'tracking:doctor_dashboard',
+    'tracking:player_dashboard',
+    'tracking:dashboard_panel',
+    'tracking:analytics',
+    'tracking:analytics_data',
+    'tracking:recovery_estimate',
+    'tracking:events_feed',
+    'tracking:injury_list',
+]
+# Seconds a client reads from the primary after a POST/PUT/PATCH/DELETE, so it
+# sees its own writes; keep it above the replica's usual lag
+REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=15, cast=int)
+
+# Route view mutations through one writer thread per process, serialised
+# across processes with a host-wide lock file (see lancer_project.write_queue).
+# Worth turning on for SQLite with several gunicorn workers; ignored on Postgres.
+SQLITE_WRITE_QUEUE = config('SQLITE_WRITE_QUEUE', default=False, cast=bool)
+SQLITE_WRITE_QUEUE_LOCK_FILE = f"{DATABASES['default']['NAME']}.write-lock"
+SQLITE_WRITE_QUEUE_MAX_BATCH = 50
+# Seconds a request waits for its batch to commit
+SQLITE_WRITE_QUEUE_TIMEOUT = 30
+
+# Host-wide cache shared by every worker through one SQLite file (see
+# lancer_project.cache); dashboards and lookup lists are cached there and
+# invalidated through data-version counters (injury_tracking.caching)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'lancer_project.cache.SQLiteCache',
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache.sqlite3')),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=20000, cast=int),
+            'CULL_FREQUENCY': 4,
+        },
     }
 }
 
+# Rows fetched per round trip when exports stream a queryset (a server-side
+# cursor on Postgres)
+EXPORT_CHUNK_SIZE = 2000
+
+# /api/changes/: entries per page, and how long an entry waits before it is
+# served. SQLite commits writes in sequence order; on Postgres a transaction
+# can commit after a later sequence number was served, so entries are held
+# back for longer than a write transaction takes.
+CHANGE_FEED_PAGE_SIZE = 500
+CHANGE_FEED_LAG_SECONDS = config('CHANGE_FEED_LAG_SECONDS', default=2 if DB_ENGINE == 'postgres' else 0, cast=int)
+# Days of change log kept by `manage.py prune_change_log`
+CHANGE_LOG_RETENTION_DAYS = 30
+# Live dashboard stream (tracking:change_stream): seconds between checks of
+# the change counter, seconds before an idle connection gets a keepalive,
+# seconds before a connection is closed for the browser to reconnect, and the
+# reconnect delay sent to the browser in milliseconds
+CHANGE_STREAM_POLL_SECONDS = 1
+CHANGE_STREAM_KEEPALIVE_SECONDS = 15
+CHANGE_STREAM_MAX_SECONDS = 300
+CHANGE_STREAM_RETRY_MS = 3000
+
+# Threads per process running dashboard panels (independent aggregates)
+# concurrently, each on its own connection; 1 runs them one after another
+DASHBOARD_PANEL_WORKERS = config('DASHBOARD_PANEL_WORKERS', default=4, cast=int)
+# A cached aggregate missing from the cache is computed by one request while
+# the others wait (injury_tracking.caching.single_flight): seconds before a
+# holder's lock expires, and seconds a waiter waits before computing it itself
+SINGLE_FLIGHT_LOCK_SECONDS = config('SINGLE_FLIGHT_LOCK_SECONDS', default=30, cast=int)
+SINGLE_FLIGHT_WAIT_SECONDS = config('SINGLE_FLIGHT_WAIT_SECONDS', default=10, cast=float)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -86,11 +245,72 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# Sessions live in the shared cache; changes reach the database in batches at
+# most every SESSION_WRITE_BEHIND_SECONDS (0 writes through on every save).
+# See lancer_project.sessions.
+SESSION_ENGINE = 'lancer_project.sessions'
+SESSION_WRITE_BEHIND_SECONDS = config('SESSION_WRITE_BEHIND_SECONDS', default=30, cast=int)
+# Requests under these paths never load or save a session
+SESSION_EXEMPT_PATHS = [STATIC_URL, '/healthz/', '/favicon.ico']
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Custom user model
 AUTH_USER_MODEL = 'accounts.CustomUser'
+# Loads the request user without its personal/medical columns, team joined
+AUTHENTICATION_BACKENDS = ['accounts.backends.SlimUserBackend']
 
 # Email settings (development): send password reset emails to console
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
-DEFAULT_FROM_EMAIL = 'no-reply@lancers.local'
\ No newline at end of file
+DEFAULT_FROM_EMAIL = 'no-reply@lancers.local'
+
+# Per-request query instrumentation (lancer_project.middleware)
+QUERY_INSTRUMENTATION = True
+QUERY_INSTRUMENTATION_SERVER_TIMING = True
+# Per-view budgets: a query count, or {'queries': N, 'sql_ms': M}. Exceeding one logs a warning.
+QUERY_BUDGET_DEFAULT = 50
+QUERY_BUDGETS = {
+    'tracking:admin_dashboard': {'queries': 30, 'sql_ms': 250},
+    'tracking:coach_dashboard': {'queries': 30, 'sql_ms': 250},
+    'tracking:doctor_dashboard': {'queries': 15, 'sql_ms': 150},
+    'tracking:player_dashboard': {'queries': 15, 'sql_ms': 150},
+    'tracking:dashboard_panel': {'queries': 15, 'sql_ms': 150},
+    'tracking:analytics': {'queries': 15, 'sql_ms': 150},
+    'tracking:analytics_data': {'queries': 15, 'sql_ms': 400},
+    'tracking:recovery_estimate': {'queries': 5, 'sql_ms': 400},
+    'tracking:events_feed': 10,
+    'tracking:player_injuries_api': 10,
+    'players_ajax': 10,
+}
+
+# Repeated-query (N+1) detection (lancer_project.nplusone). The test runner turns
+# findings into failures; the allowlist takes view names or call-site substrings.
+NPLUSONE_DETECTION = DEBUG
+NPLUSONE_RAISE = False
+NPLUSONE_THRESHOLD = 3
+NPLUSONE_ALLOWLIST = []
+
+TEST_RUNNER = 'lancer_project.test_runner.LancerTestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'performance': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'performance_console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'performance',
+        },
+    },
+    'loggers': {
+        'lancer.performance': {
+            'handlers': ['performance_console'],
+            'level': os.environ.get('LANCER_PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
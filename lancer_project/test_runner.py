@@ -0,0 +1,46 @@
+import logging
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class LancerTestRunner(DiscoverRunner):
+    """Test runner that turns every suspected N+1 into a test failure.
+
+    Any view exercised through the test client runs under
+    ``NPlusOneDetectionMiddleware`` in strict mode, so a newly introduced
+    repeated-query pattern fails the test that hit it. The shared cache is
+    pointed at a throwaway file so test data never mixes with the
+    development cache, and the per-request ``lancer.performance`` lines are
+    silenced; budget warnings still show, and tests that check the records
+    capture them with ``assertLogs``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.mkdtemp(prefix='lancer-cache-')
+        self._cache_override = override_settings(CACHES={
+            alias: {**config, 'LOCATION': f'{self._cache_dir}/{alias}.sqlite3'}
+            if config['BACKEND'] == 'lancer_project.cache.SQLiteCache' else config
+            for alias, config in settings.CACHES.items()
+        })
+        self._cache_override.enable()
+        self._saved_nplusone = (
+            getattr(settings, 'NPLUSONE_DETECTION', False),
+            getattr(settings, 'NPLUSONE_RAISE', False),
+        )
+        settings.NPLUSONE_DETECTION = True
+        settings.NPLUSONE_RAISE = True
+        self._performance_logger = logging.getLogger('lancer.performance')
+        self._saved_log_level = self._performance_logger.level
+        self._performance_logger.setLevel(max(self._saved_log_level, logging.WARNING))
+
+    def teardown_test_environment(self, **kwargs):
+        settings.NPLUSONE_DETECTION, settings.NPLUSONE_RAISE = self._saved_nplusone
+        self._performance_logger.setLevel(self._saved_log_level)
+        self._cache_override.disable()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -4,12 +4,18 @@ from django.views.generic import TemplateView
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .views import healthz
+
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # accounts comes first so its admin/team-requests/ pages are not shadowed by the admin site
     path('', include('accounts.urls')),
+    path('admin/', admin.site.urls),
     path('injuries/', include('injuries.urls')),
     path('tracking/', include('injury_tracking.urls', namespace='tracking')),
     path('about/', TemplateView.as_view(template_name='about.html'), name='about'),
+    path('healthz/', healthz, name='healthz'),
+    # Served through API_MIDDLEWARE (see api.middleware.ApiDispatchMiddleware)
+    path('api/', include('api.urls')),
 ]
 
 # Serve static files in development
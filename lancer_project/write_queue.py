@@ -0,0 +1,177 @@
+"""Optional single-writer queue for SQLite deployments.
+
+SQLite allows one writer at a time. With several gunicorn workers each
+running request threads, concurrent posts collide on that lock and spend
+their time in SQLite's busy handler, which polls with growing sleeps. With
+``SQLITE_WRITE_QUEUE`` on, views hand their mutation to ``run_write``:
+
+* each process runs one writer thread that drains the mutations queued by its
+  request threads and applies them in batches of up to
+  ``SQLITE_WRITE_QUEUE_MAX_BATCH``, one short transaction per batch with a
+  savepoint per mutation, so one failure never affects its neighbours;
+* the writer takes an exclusive ``flock`` on ``SQLITE_WRITE_QUEUE_LOCK_FILE``
+  around each batch, so the processes on a host take turns instead of racing
+  for the database lock (on platforms without ``fcntl`` only the threads of
+  one process are serialised).
+
+The request thread blocks until its batch commits and gets the mutation's
+return value, or its exception, back. A mutation still queued after
+``SQLITE_WRITE_QUEUE_TIMEOUT`` seconds is cancelled and ``run_write`` raises
+``WriteTimeout``, which is answered with a 503: nothing was saved, so the
+client can safely resubmit. One the writer has already started is waited
+for, since its batch is about to commit. With the setting off, which is the
+default and how tests run, ``run_write`` runs the mutation in an ordinary
+``transaction.atomic()`` block.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import connections, transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class WriteTimeout(Exception):
+    """A queued mutation was cancelled before the writer reached it"""
+
+    message = 'The database is busy and your changes were not saved. Please try again.'
+
+    def __init__(self, message=message):
+        super().__init__(message)
+
+
+class HostWriteLock:
+    """Exclusive ``flock`` on a lock file shared by every process on the host"""
+
+    def __init__(self, path):
+        self.path = str(path) if path else None
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None and self.path:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class WriteQueue:
+    """Per-process writer thread applying queued mutations in batches"""
+
+    def __init__(self, using='default', max_batch=50, lock_path=None):
+        self.using = using
+        self.max_batch = max_batch
+        self.lock = HostWriteLock(lock_path)
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` and return a ``Future`` for its result"""
+        future = Future()
+        self._ensure_started().put((future, func, args, kwargs))
+        return future
+
+    def in_writer(self):
+        return threading.current_thread() is self._thread
+
+    def _ensure_started(self):
+        # A queue created before gunicorn forks has no thread in the child
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name=f'write-queue-{self.using}', daemon=True
+                )
+                self._thread.start()
+            return self._queue
+
+    def _run(self):
+        pending = self._queue
+        while True:
+            batch = [pending.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        results = []
+        try:
+            with self.lock, transaction.atomic(using=self.using):
+                for future, func, args, kwargs in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic(using=self.using):
+                            result = func(*args, **kwargs)
+                    except Exception as exc:
+                        future.set_exception(exc)
+                    else:
+                        results.append((future, result))
+        except Exception as exc:
+            # Nothing in the batch was committed
+            for future, *_ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            # The writer keeps its connection between batches; start afresh
+            # after a failed commit
+            connections[self.using].close()
+        else:
+            for future, result in results:
+                future.set_result(result)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(using='default'):
+    with _queues_lock:
+        if using not in _queues:
+            _queues[using] = WriteQueue(
+                using,
+                max_batch=getattr(settings, 'SQLITE_WRITE_QUEUE_MAX_BATCH', 50),
+                lock_path=getattr(settings, 'SQLITE_WRITE_QUEUE_LOCK_FILE', None),
+            )
+        return _queues[using]
+
+
+def run_write(func, *args, using='default', **kwargs):
+    """Run a view's mutation in its own transaction and return its result.
+
+    Goes through the writer thread when ``SQLITE_WRITE_QUEUE`` is on and the
+    database is SQLite, except when already inside a transaction (or the
+    writer itself), where waiting on the writer would deadlock on the
+    database lock. Raises ``WriteTimeout`` when the writer has not started
+    the mutation within ``SQLITE_WRITE_QUEUE_TIMEOUT`` seconds.
+    """
+    if getattr(settings, 'SQLITE_WRITE_QUEUE', False) and connections[using].vendor == 'sqlite':
+        write_queue = get_write_queue(using)
+        if not write_queue.in_writer() and not connections[using].in_atomic_block:
+            future = write_queue.submit(func, *args, **kwargs)
+            try:
+                return future.result(timeout=getattr(settings, 'SQLITE_WRITE_QUEUE_TIMEOUT', 30))
+            except TimeoutError:
+                # Still queued: drop it, so it cannot commit after the client
+                # was told it failed and resubmitted it
+                if future.cancel():
+                    raise WriteTimeout from None
+                # Started: its batch commits or rolls back as a whole shortly
+                return future.result()
+    with transaction.atomic(using=using):
+        return func(*args, **kwargs)
@@ -0,0 +1,151 @@
+// Analytics page charts, drawn from tracking:analytics_data.
+//
+// #analytics names two queries of the data API: data-trend-url for this
+// year's monthly trend and data-breakdown-url for the all-time distributions,
+// summary and recovery-time statistics. Responses are columnar ({"label": [...], "count": [...]}) and
+// carry an ETag, so the browser revalidates them and an unchanged chart
+// costs a 304.
+(function () {
+  var root = document.getElementById('analytics');
+  var MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+  var COLORS = [
+    '#3b82f6', '#ef4444', '#10b981', '#f59e0b', '#8b5cf6',
+    '#06b6d4', '#84cc16', '#f97316', '#ec4899', '#6366f1'
+  ];
+
+  function getJSON(url) {
+    return fetch(url, {credentials: 'same-origin'}).then(function (response) {
+      if (!response.ok) {
+        throw new Error('Analytics data failed with ' + response.status);
+      }
+      return response.json();
+    });
+  }
+
+  function setText(id, value) {
+    document.getElementById(id).textContent = value === null || value === undefined ? '-' : value;
+  }
+
+  function chart(id, config) {
+    return new Chart(document.getElementById(id).getContext('2d'), config);
+  }
+
+  function failed(ids) {
+    ids.forEach(function (id) {
+      var canvas = document.getElementById(id);
+      canvas.insertAdjacentHTML('afterend', '<p class="text-center text-muted py-4">This chart could not be loaded.</p>');
+      canvas.remove();
+    });
+  }
+
+  var countScales = {y: {beginAtZero: true, ticks: {stepSize: 1}}};
+
+  function cell(text) {
+    var td = document.createElement('td');
+    td.textContent = text;
+    return td;
+  }
+
+  // One row per group of the selected dimension, most recoveries first
+  function recoveryTable(recovery) {
+    var select = document.getElementById('recoveryDimension');
+    var body = document.getElementById('recoveryTable');
+
+    function draw() {
+      var columns = recovery[select.value];
+      body.textContent = '';
+      if (!columns.label.length) {
+        var empty = cell('No recovered injuries yet.');
+        empty.colSpan = 6;
+        empty.className = 'text-center text-muted';
+        body.appendChild(document.createElement('tr')).appendChild(empty);
+        return;
+      }
+      columns.label.forEach(function (label, i) {
+        var row = document.createElement('tr');
+        [
+          label,
+          columns.n[i],
+          columns.p50[i],
+          columns.p25[i] + ' - ' + columns.p75[i],
+          columns.p90[i],
+          columns.mean[i] + ' (' + columns.ci_low[i] + ' - ' + columns.ci_high[i] + ')'
+        ].forEach(function (text) { row.appendChild(cell(text)); });
+        body.appendChild(row);
+      });
+    }
+
+    select.addEventListener('change', draw);
+    draw();
+  }
+
+  getJSON(root.dataset.trendUrl).then(function (data) {
+    var trend = data.dimensions.period;
+    setText('totalInjuries', data.summary.total);
+    chart('monthlyTrendsChart', {
+      type: 'line',
+      data: {
+        // Periods are named by their first day, "YYYY-MM-01"
+        labels: trend.period.map(function (period) { return MONTHS[Number(period.slice(5, 7)) - 1]; }),
+        datasets: [{
+          label: 'Injuries',
+          data: trend.count,
+          borderColor: '#3b82f6',
+          backgroundColor: 'rgba(59, 130, 246, 0.1)',
+          borderWidth: 3,
+          fill: true,
+          tension: 0.4
+        }]
+      },
+      options: {responsive: true, maintainAspectRatio: false, plugins: {legend: {display: false}}, scales: countScales}
+    });
+  }).catch(function () {
+    failed(['monthlyTrendsChart']);
+  });
+
+  getJSON(root.dataset.breakdownUrl).then(function (data) {
+    var dimensions = data.dimensions;
+    setText('activeInjuries', data.summary.active);
+    setText('recoveredInjuries', data.summary.recovered);
+    setText('avgRecoveryTime', data.summary.avg_recovery_days === null ? null : Math.round(data.summary.avg_recovery_days));
+    recoveryTable(data.recovery);
+
+    chart('injuryTypesChart', {
+      type: 'doughnut',
+      data: {
+        labels: dimensions.injury_type.label,
+        datasets: [{data: dimensions.injury_type.count, backgroundColor: COLORS, borderWidth: 2, borderColor: '#fff'}]
+      },
+      options: {responsive: true, maintainAspectRatio: false, plugins: {legend: {position: 'bottom'}}}
+    });
+    chart('bodyPartsChart', {
+      type: 'bar',
+      data: {
+        labels: dimensions.body_part.label,
+        datasets: [{
+          label: 'Injuries',
+          data: dimensions.body_part.count,
+          backgroundColor: '#3b82f6',
+          borderColor: '#1d4ed8',
+          borderWidth: 1
+        }]
+      },
+      options: {responsive: true, maintainAspectRatio: false, plugins: {legend: {display: false}}, scales: countScales}
+    });
+    chart('severityChart', {
+      type: 'pie',
+      data: {
+        labels: dimensions.severity.label,
+        datasets: [{
+          data: dimensions.severity.count,
+          backgroundColor: dimensions.severity.color,
+          borderWidth: 2,
+          borderColor: '#fff'
+        }]
+      },
+      options: {responsive: true, maintainAspectRatio: false, plugins: {legend: {position: 'bottom'}}}
+    });
+  }).catch(function () {
+    failed(['injuryTypesChart', 'bodyPartsChart', 'severityChart']);
+  });
+})();
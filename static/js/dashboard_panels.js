@@ -0,0 +1,77 @@
+// Lazily loaded dashboard panels (tracking:dashboard_panel).
+//
+// Each element with data-panel-url is filled with its HTML fragment once it
+// comes near the viewport, so the page shell renders without waiting for
+// them and a slow panel holds up no other. Canvases marked data-chart
+// ("doughnut" or "bar") are drawn with Chart.js from the json_script block
+// named by data-chart-data, labelled by the data-chart-label key of each row.
+// The browser revalidates fragments with their ETag, so an unchanged panel
+// costs a 304.
+(function () {
+  var COLORS = ['#3b82f6', '#ef4444', '#10b981', '#f59e0b', '#8b5cf6'];
+
+  function drawCharts(root) {
+    root.querySelectorAll('canvas[data-chart]').forEach(function (canvas) {
+      var rows = JSON.parse(document.getElementById(canvas.dataset.chartData).textContent);
+      var doughnut = canvas.dataset.chart === 'doughnut';
+      new Chart(canvas.getContext('2d'), {
+        type: canvas.dataset.chart,
+        data: {
+          labels: rows.map(function (row) { return row[canvas.dataset.chartLabel]; }),
+          datasets: [{
+            label: 'Injuries',
+            data: rows.map(function (row) { return row.count; }),
+            backgroundColor: doughnut ? COLORS : '#3b82f6',
+            borderColor: doughnut ? '#fff' : '#1d4ed8',
+            borderWidth: doughnut ? 2 : 1
+          }]
+        },
+        options: doughnut
+          ? {responsive: true, maintainAspectRatio: false, plugins: {legend: {position: 'bottom'}}}
+          : {responsive: true, maintainAspectRatio: false, scales: {y: {beginAtZero: true}}}
+      });
+    });
+  }
+
+  function load(panel) {
+    fetch(panel.dataset.panelUrl, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error('Panel failed with ' + response.status);
+        }
+        return response.text();
+      })
+      .then(function (html) {
+        panel.innerHTML = html;
+        panel.removeAttribute('aria-busy');
+        if (window.Chart) {
+          drawCharts(panel);
+        }
+      })
+      .catch(function () {
+        panel.innerHTML = '<div class="text-center text-muted py-4">This panel could not be loaded. ' +
+          '<a href="#">Try again</a></div>';
+        panel.querySelector('a').addEventListener('click', function (event) {
+          event.preventDefault();
+          load(panel);
+        });
+      });
+  }
+
+  var panels = document.querySelectorAll('[data-panel-url]');
+  if (!window.IntersectionObserver) {
+    panels.forEach(load);
+    return;
+  }
+  var observer = new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+      if (entry.isIntersecting) {
+        observer.unobserve(entry.target);
+        load(entry.target);
+      }
+    });
+  }, {rootMargin: '200px'});
+  panels.forEach(function (panel) {
+    observer.observe(panel);
+  });
+})();
@@ -0,0 +1,58 @@
+// Live dashboard updates from tracking:change_stream (server-sent events).
+//
+// Rows marked data-injury-id get their status badge (data-live-status)
+// patched in place. A row leaves a table whose tbody lists the statuses it
+// keeps (data-live-keep) once its injury has another status, is medically
+// cleared or is deleted; with data-live-follow-up-due it also leaves once no
+// follow-up is required. Changes to injuries not on the page show the
+// #live-updates banner, which offers a reload.
+(function () {
+  var banner = document.getElementById('live-updates');
+  if (!banner || !window.EventSource) {
+    return;
+  }
+
+  function showBanner() {
+    banner.classList.remove('d-none');
+  }
+
+  function patchRow(row, change) {
+    var tbody = row.parentNode;
+    var keep = tbody.dataset.liveKeep;
+    var injury = change.data;
+    if (change.deleted ||
+        (keep && (injury.medical_clearance || keep.split(' ').indexOf(injury.status) < 0)) ||
+        ('liveFollowUpDue' in tbody.dataset && !injury.follow_up_required)) {
+      row.remove();
+      return;
+    }
+    var badge = row.querySelector('[data-live-status]');
+    if (badge) {
+      badge.className = 'status-badge status-' + injury.status.toLowerCase();
+      badge.textContent = injury.status_display;
+    }
+  }
+
+  var source = new EventSource(banner.dataset.streamUrl);
+  source.addEventListener('change', function (event) {
+    var change = JSON.parse(event.data);
+    if (change.type !== 'injury') {
+      return;
+    }
+    var rows = document.querySelectorAll('tr[data-injury-id="' + change.id + '"]');
+    if (!rows.length) {
+      if (!change.deleted) {
+        showBanner();
+      }
+      return;
+    }
+    rows.forEach(function (row) {
+      patchRow(row, change);
+    });
+  });
+  // The change log was pruned past our cursor
+  source.addEventListener('resync', function () {
+    source.close();
+    showBanner();
+  });
+})();